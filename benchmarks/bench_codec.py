@@ -0,0 +1,95 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+    Benchmark of the JSON codecs on learner models and list responses of realistic sizes.
+
+    Usage: python benchmarks/bench_codec.py [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from tesla_ce_client import exception  # noqa: E402
+from tesla_ce_client.codec import CODECS, get_codec  # noqa: E402
+
+
+def get_model(num_samples, embedding_size):
+    """
+        Build a learner model with one embedding vector per enrolment sample
+    """
+    rnd = random.Random(0)
+    return {
+        'samples': [{
+            'id': idx,
+            'features': [rnd.uniform(-1, 1) for _ in range(embedding_size)],
+            'valid': True,
+        } for idx in range(num_samples)],
+        'threshold': 0.75,
+    }
+
+
+def get_list(num_results):
+    """
+        Build a list response with course learners
+    """
+    return {
+        'count': num_results,
+        'next': None,
+        'previous': None,
+        'results': [{
+            'id': idx,
+            'learner_id': '8c3e2ab0-8f7e-4a1b-9d0e-{:012d}'.format(idx),
+            'email': 'learner{}@tesla-ce.eu'.format(idx),
+            'first_name': 'Learner',
+            'last_name': str(idx),
+            'ic_status': 'VALID',
+        } for idx in range(num_results)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repetitions per measure')
+    args = parser.parse_args()
+
+    payloads = [
+        ('model 50x128', get_model(50, 128)),
+        ('model 200x512', get_model(200, 512)),
+        ('model 1000x512', get_model(1000, 512)),
+        ('list 1000', get_list(1000)),
+    ]
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except exception.TeslaConfigException:
+            print('{}: not installed'.format(name))
+
+    print('{:<16} {:<8} {:>10} {:>12} {:>12}'.format('payload', 'codec', 'size (KB)', 'dumps (ms)', 'loads (ms)'))
+    for label, payload in payloads:
+        for codec in codecs:
+            encoded = codec.dumps(payload)
+            dumps = min(timeit.repeat(lambda: codec.dumps(payload), number=1, repeat=args.repeat))
+            loads = min(timeit.repeat(lambda: codec.loads(encoded), number=1, repeat=args.repeat))
+            print('{:<16} {:<8} {:>10.0f} {:>12.2f} {:>12.2f}'.format(label, codec.name, len(encoded) / 1024,
+                                                                     dumps * 1000, loads * 1000))
+
+
+if __name__ == '__main__':
+    main()
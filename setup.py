@@ -43,4 +43,13 @@ setuptools.setup(
     },
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        'async': ['aiohttp'],
+        'orjson': ['orjson'],
+        'msgspec': ['msgspec'],
+        'zstd': ['zstandard'],
+        'brotli': ['brotli'],
+        'msgpack': ['msgpack'],
+        'numpy': ['numpy'],
+    },
 )
@@ -13,7 +13,12 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE CLient package """
-from .client import Client
+from .client import Client, AsyncClient
+from .retry import RetryPolicy
+from .breaker import CircuitBreaker
+from .cache import ResponseCache, LookupCache, BlobCache
+from .outbox import Outbox
 from . import exception
 
-__all__ = ['Client', 'exception']
+__all__ = ['Client', 'AsyncClient', 'RetryPolicy', 'CircuitBreaker', 'ResponseCache', 'LookupCache', 'BlobCache',
+           'Outbox', 'exception']
@@ -0,0 +1,156 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client circuit breaker module """
+import re
+import threading
+import time
+from urllib.parse import urlparse
+from .exception import CircuitOpenException
+
+#: Path segments that are object identifiers: numbers and UUIDs
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$')
+
+
+class CircuitBreaker():
+    """
+        Circuit breaker keyed by endpoint family. After a number of consecutive failures of an endpoint family the
+        circuit opens and requests fail fast. Once the recovery timeout expires, a limited number of probe requests
+        are allowed (half-open state): a success closes the circuit and a failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1,
+                 failure_statuses=(500, 502, 503, 504)):
+        """
+            Default constructor
+
+            :param failure_threshold: Number of consecutive failures that open the circuit
+            :type failure_threshold: int
+            :param recovery_timeout: Seconds the circuit stays open before allowing probe requests
+            :type recovery_timeout: float
+            :param half_open_max_calls: Number of simultaneous probe requests allowed in half-open state
+            :type half_open_max_calls: int
+            :param failure_statuses: HTTP status codes considered as failures. Connection errors are always failures.
+            :type failure_statuses: tuple
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = tuple(failure_statuses)
+
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    @staticmethod
+    def get_endpoint_family(url):
+        """
+            Get the endpoint family of an url, replacing object identifiers in the path. For instance,
+            https://tesla/api/v2/provider/3/enrolment/<uuid>/ belongs to /api/v2/provider/{}/enrolment/{}/
+
+            :param url: Request url
+            :type url: str
+            :return: Endpoint family
+            :rtype: str
+        """
+        path = urlparse(url).path
+        return '/'.join('{}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+    def _get_circuit(self, family):
+        if family not in self._circuits:
+            self._circuits[family] = {
+                'state': self.CLOSED,
+                'failures': 0,
+                'opened_at': None,
+                'probes': 0,
+            }
+        return self._circuits[family]
+
+    def before_request(self, url):
+        """
+            Check if a request to an url is allowed
+
+            :param url: Request url
+            :type url: str
+            :raises CircuitOpenException: If the circuit of the endpoint family is open
+        """
+        family = self.get_endpoint_family(url)
+        with self._lock:
+            circuit = self._get_circuit(family)
+            if circuit['state'] == self.OPEN:
+                if time.monotonic() - circuit['opened_at'] < self.recovery_timeout:
+                    raise CircuitOpenException('Circuit open for endpoint {}'.format(family))
+                circuit['state'] = self.HALF_OPEN
+                circuit['probes'] = 0
+            if circuit['state'] == self.HALF_OPEN:
+                if circuit['probes'] >= self.half_open_max_calls:
+                    raise CircuitOpenException('Circuit half-open for endpoint {}'.format(family))
+                circuit['probes'] += 1
+
+    def record_result(self, url, status_code=None):
+        """
+            Record the result of a request
+
+            :param url: Request url
+            :type url: str
+            :param status_code: Status code of the response or None if the request failed with a connection error
+            :type status_code: int
+        """
+        failed = status_code is None or status_code in self.failure_statuses
+        family = self.get_endpoint_family(url)
+        with self._lock:
+            circuit = self._get_circuit(family)
+            if circuit['state'] == self.HALF_OPEN:
+                circuit['probes'] = max(circuit['probes'] - 1, 0)
+            if not failed:
+                circuit['state'] = self.CLOSED
+                circuit['failures'] = 0
+                return
+            circuit['failures'] += 1
+            if circuit['state'] == self.HALF_OPEN or circuit['failures'] >= self.failure_threshold:
+                circuit['state'] = self.OPEN
+                circuit['opened_at'] = time.monotonic()
+
+    def release(self, url):
+        """
+            Release a request that ended without a result, such as a cancelled request, so it does not count as a
+            probe in progress
+
+            :param url: Request url
+            :type url: str
+        """
+        family = self.get_endpoint_family(url)
+        with self._lock:
+            circuit = self._get_circuit(family)
+            if circuit['state'] == self.HALF_OPEN:
+                circuit['probes'] = max(circuit['probes'] - 1, 0)
+
+    def get_state(self, url=None):
+        """
+            Get the state of the circuits
+
+            :param url: Url or endpoint family to get the state for. If not provided, all the circuits are returned.
+            :type url: str
+            :return: State of the circuit for given url, or a dictionary with the state of each endpoint family
+            :rtype: str | dict
+        """
+        with self._lock:
+            if url is not None:
+                family = self.get_endpoint_family(url)
+                if family not in self._circuits:
+                    return self.CLOSED
+                return self._circuits[family]['state']
+            return {family: circuit['state'] for family, circuit in self._circuits.items()}
@@ -0,0 +1,487 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client cache module """
+import collections
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+
+class ResponseCache():
+    """
+        Bounded LRU cache of GET responses, revalidated with the ETag and Last-Modified headers sent by the server.
+        Cached data is shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=256):
+        """
+            Default constructor
+
+            :param max_entries: Maximum number of cached responses
+            :type max_entries: int
+        """
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get_entry(self, url):
+        """
+            Get the conditional request headers and the data cached for an url, read at once so the data matches the
+            validators even if the entry is evicted before the server answers
+
+            :param url: Request url
+            :type url: str
+            :return: Headers to revalidate the cached response and cached data. Empty headers and None if the url is
+                not cached.
+            :rtype: tuple
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self._stats['misses'] += 1
+                return {}, None
+            headers = {}
+            if entry['etag'] is not None:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified'] is not None:
+                headers['If-Modified-Since'] = entry['last_modified']
+            return headers, entry['data']
+
+    def record_hit(self, url):
+        """
+            Record that the cached data for an url was served, once the server confirmed it is not modified
+
+            :param url: Request url
+            :type url: str
+        """
+        with self._lock:
+            if url in self._entries:
+                self._entries.move_to_end(url)
+            self._stats['hits'] += 1
+
+    def set(self, url, data, etag=None, last_modified=None):
+        """
+            Store the response for an url. Responses without validators are not cached.
+
+            :param url: Request url
+            :type url: str
+            :param data: Decoded response
+            :type data: dict
+            :param etag: Value of the ETag header
+            :type etag: str
+            :param last_modified: Value of the Last-Modified header
+            :type last_modified: str
+        """
+        with self._lock:
+            if etag is None and last_modified is None:
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = {
+                'data': data,
+                'etag': etag,
+                'last_modified': last_modified,
+            }
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, url=None):
+        """
+            Remove cached responses
+
+            :param url: Url to remove. If not provided, all the responses are removed.
+            :type url: str
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url, None)
+
+    @property
+    def stats(self):
+        """
+            Cache counters: responses served from cache after a 304, requests without cached response, evicted
+            entries and current number of entries
+
+            :return: Cache counters
+            :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+class LookupCache():
+    """
+        Bounded LRU cache with expiration for the filtered list requests used to translate VLE identifiers into TeSLA
+        objects. Empty results are cached too (negative caching). Writes to a collection invalidate the cached lookups
+        on that collection. Cached data is shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, negative_ttl=None):
+        """
+            Default constructor
+
+            :param ttl: Seconds a lookup result is valid
+            :type ttl: float
+            :param max_entries: Maximum number of cached lookups
+            :type max_entries: int
+            :param negative_ttl: Seconds an empty lookup result is valid. If not provided, ttl is used. Use 0 to
+                disable negative caching.
+            :type negative_ttl: float
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    @staticmethod
+    def _get_collection(url):
+        """
+            Get the collection path of an url, removing the query
+
+            :param url: Request url
+            :type url: str
+            :return: Collection path
+            :rtype: str
+        """
+        path = urlsplit(url).path
+        if not path.endswith('/'):
+            path += '/'
+        return path
+
+    def get(self, url):
+        """
+            Get the cached result of a lookup
+
+            :param url: Lookup url
+            :type url: str
+            :return: Cached result or None if the url is not cached or expired
+            :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry['expires'] < time.monotonic():
+                if entry is not None:
+                    del self._entries[url]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(url)
+            self._stats['hits'] += 1
+            return entry['data']
+
+    def set(self, url, data):
+        """
+            Store the result of a lookup
+
+            :param url: Lookup url
+            :type url: str
+            :param data: Filtered list returned by the lookup
+            :type data: dict
+        """
+        ttl = self.ttl
+        if isinstance(data, dict) and data.get('count') == 0:
+            ttl = self.negative_ttl
+        with self._lock:
+            if ttl <= 0:
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = {
+                'data': data,
+                'expires': time.monotonic() + ttl,
+                'collection': self._get_collection(url),
+            }
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, url=None):
+        """
+            Remove the cached lookups affected by a write on an url: lookups on the same collection or on the parent
+            collection of the written object.
+
+            :param url: Written url. If not provided, all the lookups are removed.
+            :type url: str
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                return
+            collection = self._get_collection(url)
+            collections_affected = {collection, collection.rstrip('/').rsplit('/', 1)[0] + '/'}
+            for key in [key for key, entry in self._entries.items() if entry['collection'] in collections_affected]:
+                del self._entries[key]
+                self._stats['invalidations'] += 1
+
+    @property
+    def stats(self):
+        """
+            Cache counters: lookups served from cache, lookups sent to the API, evicted entries, entries removed by
+            writes and current number of entries
+
+            :return: Cache counters
+            :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+class BlobCache():
+    """
+        Size bounded cache of downloaded files, stored in a local directory. Entries are keyed by the download url
+        without its query, so pre-signed urls of the same file share the entry, and keep the ETag of the content to
+        revalidate it. Files are written atomically and evicted by last access time, so a directory can be shared by
+        several processes. Large entries are read as memory mapped files. The size of the stored files is tracked as
+        they are written, and the directory is only scanned when the cache exceeds its maximum size or periodically,
+        to account for the files written by other processes.
+    """
+
+    def __init__(self, path, max_size=1 << 30, mmap_threshold=1 << 20, rescan_interval=300):
+        """
+            Default constructor
+
+            :param path: Directory where files are stored. It is created if it does not exist.
+            :type path: str
+            :param max_size: Maximum size in bytes of the stored files
+            :type max_size: int
+            :param mmap_threshold: Minimum size in bytes of the files returned as memory maps instead of bytes
+            :type mmap_threshold: int
+            :param rescan_interval: Maximum seconds between scans of the directory
+            :type rescan_interval: float
+        """
+        self.path = path
+        self.max_size = max_size
+        self.mmap_threshold = mmap_threshold
+        self.rescan_interval = rescan_interval
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._total_size = 0
+        self._last_scan = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'scans': 0,
+        }
+        self._evict()
+
+    @staticmethod
+    def get_key(url):
+        """
+            Get the key of a download url, removing the query and fragment with the signature of pre-signed urls
+
+            :param url: Download url
+            :type url: str
+            :return: Cache key
+            :rtype: str
+        """
+        return urlunsplit(urlsplit(url)._replace(query='', fragment=''))
+
+    def _get_path(self, key):
+        """
+            Get the path of the file storing an entry
+        """
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest[:2], digest)
+
+    def _increment_stats(self, counter, value=1):
+        with self._lock:
+            self._stats[counter] += value
+
+    def get_entry(self, key):
+        """
+            Get a cached file and its ETag
+
+            :param key: Cache key
+            :type key: str
+            :return: Content of the file and its ETag, or None if it is not cached
+            :rtype: tuple
+        """
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as blob_file:
+                header = blob_file.readline()
+                size = os.fstat(blob_file.fileno()).st_size - len(header)
+                if size >= self.mmap_threshold:
+                    content = memoryview(mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ))[len(header):]
+                else:
+                    content = blob_file.read()
+            # Update the access time used to evict least recently used entries
+            os.utime(path)
+        except FileNotFoundError:
+            self._increment_stats('misses')
+            return None
+        self._increment_stats('hits')
+        return content, header.rstrip(b'\n').decode('utf-8') or None
+
+    def get(self, key):
+        """
+            Get a cached file
+
+            :param key: Cache key
+            :type key: str
+            :return: Content of the file, or None if it is not cached
+            :rtype: bytes | memoryview
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def set(self, key, content, etag=None):
+        """
+            Store a file, replacing the previous content atomically
+
+            :param key: Cache key
+            :type key: str
+            :param content: Content of the file
+            :type content: bytes
+            :param etag: ETag of the content
+            :type etag: str
+        """
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(handle, 'wb') as blob_file:
+                blob_file.write((etag or '').encode('utf-8') + b'\n')
+                blob_file.write(content)
+                size = blob_file.tell()
+            old_size = self._get_size(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._stats['writes'] += 1
+            self._total_size += size - old_size
+            scan = self._total_size > self.max_size or time.monotonic() - self._last_scan >= self.rescan_interval
+        if scan:
+            self._evict()
+
+    def invalidate(self, key):
+        """
+            Remove a file from the cache
+
+            :param key: Cache key
+            :type key: str
+        """
+        path = self._get_path(key)
+        size = self._get_size(path)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._total_size -= size
+
+    @staticmethod
+    def _get_size(path):
+        """
+            Get the size of a stored file, or 0 if it does not exist
+        """
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _evict(self):
+        """
+            Scan the directory, updating the size of the stored files, and remove the least recently used files until
+            the cache fits its maximum size. Temporary files left by interrupted writes are removed after one hour.
+            Scans requested while another one is in progress are skipped.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._scan()
+        finally:
+            self._evict_lock.release()
+
+    def _iter_entries(self):
+        """
+            Walk the cache directory, removing temporary files older than one hour
+
+            :return: Modification time, size and path of the stored files
+            :rtype: generator
+        """
+        now = time.time()
+        for directory, _, files in os.walk(self.path):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                    if name.startswith('.tmp-'):
+                        if now - stat.st_mtime > 3600:
+                            os.unlink(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _scan(self):
+        """
+            Update the size of the stored files, removing the least recently used ones while it exceeds the maximum
+        """
+        entries = sorted(self._iter_entries())
+        total_size = sum(entry[1] for entry in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+                self._increment_stats('evictions')
+            except FileNotFoundError:
+                pass
+            total_size -= size
+        with self._lock:
+            self._total_size = total_size
+            self._last_scan = time.monotonic()
+            self._stats['scans'] += 1
+
+    @property
+    def stats(self):
+        """
+            Cache counters: files served from cache, files not found, stored files, evicted files, scans of the
+            directory and size in bytes of the stored files
+
+            :return: Cache counters
+            :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats, size=self._total_size)
@@ -15,10 +15,11 @@
 """ TeSLA CE CLient Module """
 import os
 import deprecation
-from .connector import Connector
-from .vle import VleClient
-from .provider import ProviderClient
+from .connector import Connector, AsyncConnector
+from .vle import VleClient, AsyncVleClient
+from .provider import ProviderClient, AsyncProviderClient
 from .v1 import V1
+from .exception import NotImplementedException
 
 __version__ = open(os.path.join(os.path.dirname(__file__), 'data', 'VERSION'), 'r').read()
 
@@ -45,11 +46,50 @@ class Client():
     #: Notification client -> Notification
     _notification = None
 
-    def __init__(self, api_url=None, role_id=None, secret_id=None, verify_ssl=None):
+    def __init__(self, api_url=None, role_id=None, secret_id=None, verify_ssl=None, **connector_options):
+        """
+            Default constructor. Missing values are taken from environment variables or secrets.
+
+            :param api_url: TeSLA API URL
+            :type api_url: str
+            :param role_id: RoleId to authenticate with Vault
+            :type role_id: str
+            :param secret_id: SecretId to authenticate with Vault
+            :type secret_id: str
+            :param verify_ssl: Whether to verify certificate of the server
+            :type verify_ssl: bool
+            :param connector_options: Additional options for the Connector (connection pool, ...)
+            :type connector_options: dict
+        """
 
         # Find configuration if not provided
+        api_url, role_id, secret_id, verify_ssl = self._complete_config(api_url, role_id, secret_id, verify_ssl)
+
+        # Create the connector to communicate with TeSLA CE
+        self._connector = Connector(api_url, role_id, secret_id, verify_ssl, **connector_options)
+
+    def close(self):
+        """
+            Release the connections opened with TeSLA CE
+        """
+        self._connector.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @classmethod
+    def _complete_config(cls, api_url, role_id, secret_id, verify_ssl):
+        """
+            Complete provided configuration with values from environment and secrets
+
+            :return: Tuple with API URL, RoleId, SecretId and SSL verification values
+            :rtype: tuple
+        """
         if api_url is None or role_id is None or secret_id is None:
-            conf = self._find_config()
+            conf = cls._find_config()
             if api_url is None:
                 api_url = conf['api_url']
             if role_id is None:
@@ -58,9 +98,7 @@ class Client():
                 secret_id = conf['secret_id']
             if verify_ssl is None:
                 verify_ssl = conf['verify_ssl']
-
-        # Create the connector to communicate with TeSLA CE
-        self._connector = Connector(api_url, role_id, secret_id, verify_ssl)
+        return api_url, role_id, secret_id, verify_ssl
 
     @classmethod
     def _find_config_value(cls, base_key):
@@ -181,3 +219,108 @@ class Client():
         if 'previous' in list and list['previous'] is not None:
             return self._connector.get(list['previous'])
         return None
+
+
+class AsyncClient(Client):
+    """
+        TeSLA CE asynchronous client class. All API methods return awaitables. The client must be opened before use:
+
+            async with AsyncClient() as client:
+                vle = await client.vle.get()
+    """
+
+    def __init__(self, api_url=None, role_id=None, secret_id=None, verify_ssl=None, **connector_options):
+        """
+            Default constructor. Missing values are taken from environment variables or secrets.
+
+            :param api_url: TeSLA API URL
+            :type api_url: str
+            :param role_id: RoleId to authenticate with Vault
+            :type role_id: str
+            :param secret_id: SecretId to authenticate with Vault
+            :type secret_id: str
+            :param verify_ssl: Whether to verify certificate of the server
+            :type verify_ssl: bool
+            :param connector_options: Additional options for the AsyncConnector (connection pool, ...)
+            :type connector_options: dict
+        """
+        # Find configuration if not provided
+        api_url, role_id, secret_id, verify_ssl = self._complete_config(api_url, role_id, secret_id, verify_ssl)
+
+        # Create the connector to communicate with TeSLA CE
+        self._connector = AsyncConnector(api_url, role_id, secret_id, verify_ssl, **connector_options)
+
+    async def open(self):
+        """
+            Open the connections and authenticate with TeSLA CE
+        """
+        await self._connector.open()
+
+    async def close(self):
+        """
+            Release the connections opened with TeSLA CE
+        """
+        await self._connector.close()
+
+    def __enter__(self):
+        raise TypeError('AsyncClient must be used with "async with"')
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def v1(self):
+        """
+            Old API v1 methods are not available on the asynchronous client
+        """
+        raise NotImplementedException('API v1 methods are not available on the asynchronous client')
+
+    @property
+    def vle(self):
+        """
+            Access to the VLE related methods
+            :return: VLE controller object
+            :rtype: AsyncVleClient
+        """
+        if self._vle is None:
+            self._vle = AsyncVleClient(self._connector)
+        return self._vle
+
+    @property
+    def provider(self):
+        """
+            Access to the Provider related methods
+            :return: Provider controller object
+            :rtype: AsyncProviderClient
+        """
+        if self._provider is None:
+            self._provider = AsyncProviderClient(self._connector)
+        return self._provider
+
+    async def get_next(self, list):
+        """
+            Get the next group of results from a list
+            :param list: List of results
+            :type list: dict
+            :return: Next group of results
+            :rtype: dict
+        """
+        if 'next' in list and list['next'] is not None:
+            return await self._connector.get(list['next'])
+        return None
+
+    async def get_previous(self, list):
+        """
+            Get the previous group of results from a list
+            :param list: List of results
+            :type list: dict
+            :return: Previous group of results
+            :rtype: dict
+        """
+        if 'previous' in list and list['previous'] is not None:
+            return await self._connector.get(list['previous'])
+        return None
@@ -0,0 +1,214 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client JSON codec module """
+import json
+import math
+from .exception import TeslaConfigException
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+_NUMBER_TYPES = {int, float, bool}
+
+
+def _is_finite_numbers(values):
+    """
+        Check at once a list of numbers. The sum is only non-finite if some of them is non-finite or it overflows.
+
+        :return: True if all the values are finite numbers, False if they must be checked one by one
+        :rtype: bool
+    """
+    if not set(map(type, values)) <= _NUMBER_TYPES:
+        return False
+    try:
+        return math.isfinite(sum(values))
+    except OverflowError:
+        return False
+
+
+def check_finite(obj):
+    """
+        Check that an object does not contain NaN or infinite floats, which some codecs write as null
+
+        :param obj: Object to check
+        :type obj: object
+        :raises ValueError: If the object contains NaN or infinite floats
+    """
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                raise ValueError('Out of range float values are not JSON compliant')
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)) and not _is_finite_numbers(value):
+            stack.extend(value)
+
+
+class JsonCodec():
+    """
+        JSON codec based on the standard library. Used when no faster implementation is installed. Values without a
+        standard JSON representation, such as NumPy arrays, are rejected by all the codecs. Non-finite floats are
+        always rejected by this codec, and by the others in strict mode.
+    """
+    name = 'json'
+    content_type = 'application/json'
+
+    def dumps(self, obj, strict=False):
+        """
+            Serialize an object
+
+            :param obj: Object to serialize
+            :type obj: object
+            :param strict: Whether to reject non-finite floats. The standard library always rejects them.
+            :type strict: bool
+            :return: UTF-8 encoded JSON document
+            :rtype: bytes
+        """
+        return json.dumps(obj, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+    def iterdumps(self, obj, chunk_size=65536, strict=False):
+        """
+            Serialize an object incrementally, so it can be sent before the serialization finishes
+
+            :param obj: Object to serialize
+            :type obj: object
+            :param chunk_size: Approximate size of the chunks
+            :type chunk_size: int
+            :param strict: Whether to reject non-finite floats. The standard library always rejects them.
+            :type strict: bool
+            :return: Chunks of the UTF-8 encoded JSON document
+            :rtype: generator
+        """
+        encoder = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+        buffer = []
+        size = 0
+        for part in encoder.iterencode(obj):
+            buffer.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+
+    def loads(self, data):
+        """
+            Deserialize a JSON document
+
+            :param data: JSON document
+            :type data: bytes | memoryview | str
+            :return: Deserialized object
+            :rtype: object
+        """
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+        JSON codec based on orjson. Non string dictionary keys are serialized natively. Non-finite floats are written
+        as null unless strict mode is used.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        """
+            Default constructor
+        """
+        if orjson is None:
+            raise TeslaConfigException('orjson codec requires the orjson package')
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, strict=False):
+        if strict:
+            check_finite(obj)
+        return orjson.dumps(obj, option=self._options)
+
+    def iterdumps(self, obj, chunk_size=65536, strict=False):
+        # Serialization is faster than sending the data, so the whole document is produced at once
+        yield self.dumps(obj, strict)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+        JSON codec based on msgspec. Non-finite floats are written as null unless strict mode is used.
+    """
+    name = 'msgspec'
+
+    def __init__(self):
+        """
+            Default constructor
+        """
+        if msgspec is None:
+            raise TeslaConfigException('msgspec codec requires the msgspec package')
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj, strict=False):
+        if strict:
+            check_finite(obj)
+        return self._encoder.encode(obj)
+
+    def iterdumps(self, obj, chunk_size=65536, strict=False):
+        yield self.dumps(obj, strict)
+
+    def loads(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return self._decoder.decode(data)
+
+
+CODECS = {
+    OrjsonCodec.name: OrjsonCodec,
+    MsgspecCodec.name: MsgspecCodec,
+    JsonCodec.name: JsonCodec,
+}
+
+
+def get_codec(codec=None):
+    """
+        Get a JSON codec
+
+        :param codec: Codec instance or name (orjson, msgspec, json). Default is the fastest installed one.
+        :type codec: JsonCodec | str
+        :return: Codec instance
+        :rtype: JsonCodec
+    """
+    if codec is None:
+        if orjson is not None:
+            return OrjsonCodec()
+        if msgspec is not None:
+            return MsgspecCodec()
+        return JsonCodec()
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise TeslaConfigException('Unknown codec {}'.format(codec))
+        return CODECS[codec]()
+    return codec
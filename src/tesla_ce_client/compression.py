@@ -0,0 +1,123 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client request body compression module """
+import gzip
+from .exception import TeslaConfigException
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class GzipCompressor():
+    """
+        Compression of request bodies with gzip
+    """
+    encoding = 'gzip'
+
+    def __init__(self, level=6):
+        """
+            Default constructor
+
+            :param level: Compression level, from 1 (fastest) to 9 (smallest)
+            :type level: int
+        """
+        self.level = level
+
+    def compress(self, data):
+        """
+            Compress a request body
+
+            :param data: Request body
+            :type data: bytes
+            :return: Compressed body
+            :rtype: bytes
+        """
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+
+class ZstdCompressor(GzipCompressor):
+    """
+        Compression of request bodies with Zstandard
+    """
+    encoding = 'zstd'
+
+    def __init__(self, level=3):
+        """
+            Default constructor
+
+            :param level: Compression level, from 1 (fastest) to 22 (smallest)
+            :type level: int
+        """
+        if zstandard is None:
+            raise TeslaConfigException('zstd compression requires the zstandard package')
+        super().__init__(level)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+
+class BrotliCompressor(GzipCompressor):
+    """
+        Compression of request bodies with Brotli
+    """
+    encoding = 'br'
+
+    def __init__(self, level=5):
+        """
+            Default constructor
+
+            :param level: Compression quality, from 0 (fastest) to 11 (smallest)
+            :type level: int
+        """
+        if brotli is None:
+            raise TeslaConfigException('br compression requires the brotli package')
+        super().__init__(level)
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+
+COMPRESSORS = {
+    GzipCompressor.encoding: GzipCompressor,
+    ZstdCompressor.encoding: ZstdCompressor,
+    BrotliCompressor.encoding: BrotliCompressor,
+}
+
+
+def get_compressor(compression=None):
+    """
+        Get a request body compressor
+
+        :param compression: Compressor instance or content encoding (gzip, zstd, br). If not provided, bodies are not
+            compressed.
+        :type compression: GzipCompressor | str
+        :return: Compressor instance
+        :rtype: GzipCompressor
+    """
+    if compression is None:
+        return None
+    if isinstance(compression, str):
+        if compression not in COMPRESSORS:
+            raise TeslaConfigException('Unknown compression {}'.format(compression))
+        return COMPRESSORS[compression]()
+    return compression
@@ -0,0 +1,131 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client concurrency utilities module """
+import asyncio
+import collections
+import concurrent.futures
+
+
+def _pop_completed(pending, ordered):
+    """
+        Remove completed futures from the pending queue. When ordered, it waits for the oldest future. Otherwise it
+        waits for any future to complete.
+    """
+    if ordered:
+        future = pending.popleft()
+        concurrent.futures.wait([future])
+        return [future]
+    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return list(done)
+
+
+def iter_bounded(func, items, workers, ordered=True, executor=None):
+    """
+        Apply a function to each item using a thread pool, with at most a fixed number of calls in progress. New
+        items are only consumed when results are consumed, so memory stays bounded.
+
+        :param func: Function to apply to each item
+        :type func: callable
+        :param items: Items to process
+        :type items: iterable
+        :param workers: Maximum number of calls in progress
+        :type workers: int
+        :param ordered: Whether results are returned in the order of the items or as soon as they are completed
+        :type ordered: bool
+        :param executor: Executor to run the calls. If not provided, a thread pool with given workers is used.
+        :type executor: concurrent.futures.Executor
+        :return: Completed futures for each item
+        :rtype: generator
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    pending = collections.deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            while len(pending) >= workers:
+                for future in _pop_completed(pending, ordered):
+                    yield future
+        while len(pending) > 0:
+            for future in _pop_completed(pending, ordered):
+                yield future
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+
+
+async def _apop_completed(pending, ordered):
+    """
+        Remove completed tasks from the pending queue. When ordered, it waits for the oldest task. Otherwise it waits
+        for any task to complete.
+    """
+    if ordered:
+        task = pending.popleft()
+        await asyncio.wait([task])
+        return [task]
+    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for task in done:
+        pending.remove(task)
+    return list(done)
+
+
+async def _aiter_items(items):
+    """
+        Iterate over the items of a synchronous or asynchronous iterable
+    """
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def aiter_bounded(func, items, workers, ordered=True):
+    """
+        Apply a coroutine function to each item, with at most a fixed number of calls in progress. New items are only
+        consumed when results are consumed, so memory stays bounded.
+
+        :param func: Coroutine function to apply to each item
+        :type func: callable
+        :param items: Items to process. Asynchronous iterables are consumed as calls complete.
+        :type items: iterable | async_iterable
+        :param workers: Maximum number of calls in progress
+        :type workers: int
+        :param ordered: Whether results are returned in the order of the items or as soon as they are completed
+        :type ordered: bool
+        :return: Completed tasks for each item
+        :rtype: async_generator
+    """
+    pending = collections.deque()
+    items = _aiter_items(items)
+    try:
+        async for item in items:
+            pending.append(asyncio.ensure_future(func(item)))
+            while len(pending) >= workers:
+                for task in await _apop_completed(pending, ordered):
+                    yield task
+        while len(pending) > 0:
+            for task in await _apop_completed(pending, ordered):
+                yield task
+    finally:
+        for task in pending:
+            task.cancel()
+        await items.aclose()
@@ -12,10 +12,24 @@
 #
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
 import base64
+import concurrent.futures
+import contextlib
+import ssl
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import datetime
+from .utils import set_url_params, get_page_urls
+from .codec import get_codec
+from .compression import get_compressor
+from .concurrency import iter_bounded, aiter_bounded
+from .multipart import MultipartEncoder
+from .upload import get_complete_upload_body, check_complete_upload_response
+from .streaming import JsonArrayParser, iter_json_array
 from .exception import (
     TeslaConfigException,
     ObjectNotFoundException,
@@ -23,16 +37,30 @@ from .exception import (
     NotImplementedException,
     TeslaAuthException,
     BadRequestException,
+    CircuitOpenException,
 )
 
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
 
-class Connector():
+# Result shared with the waiting requests when the request they joined is cancelled
+_CANCELLED_REQUEST = object()
+
+
+class BaseConnector():
     """
-        Connector class to manage connections with the APIs
+        Base class with the logic shared by synchronous and asynchronous connectors
     """
     _config = None
 
-    def __init__(self, api_url, role_id, secret_id, verify_ssl=True):
+    #: Module data obtained on authentication -> dict
+    _module = None
+
+    def __init__(self, api_url, role_id, secret_id, verify_ssl=True, retry_policy=None, circuit_breaker=None,
+                 http_cache=None, lookup_cache=None, coalesce_requests=False, codec=None, compression=None,
+                 compression_threshold=1024, accept_compressed=True, blob_cache=None, outbox=None):
         """
             Default constructor.
 
@@ -44,6 +72,30 @@ class Connector():
             :type secret_id: str
             :param verify_ssl: Whether to verify certificate of the server
             :type verify_ssl: bool
+            :param retry_policy: Policy to retry failed requests. If not provided, requests are not retried.
+            :type retry_policy: RetryPolicy
+            :param circuit_breaker: Circuit breaker to fail fast on failing endpoints. Disabled if not provided.
+            :type circuit_breaker: CircuitBreaker
+            :param http_cache: Cache for GET responses, revalidated with conditional requests. Disabled if not provided.
+            :type http_cache: ResponseCache
+            :param lookup_cache: Cache for identifier lookups (find_by_* methods). Disabled if not provided.
+            :type lookup_cache: LookupCache
+            :param coalesce_requests: Whether concurrent identical GET requests share a single HTTP request
+            :type coalesce_requests: bool
+            :param codec: JSON codec, or its name. If not provided, the fastest installed one is used.
+            :type codec: JsonCodec | str
+            :param compression: Compressor, or content encoding (gzip, zstd, br), for request bodies. Disabled if not
+                provided. The server must accept compressed requests.
+            :type compression: GzipCompressor | str
+            :param compression_threshold: Minimum size in bytes of the request bodies to compress
+            :type compression_threshold: int
+            :param accept_compressed: Whether to negotiate compressed responses
+            :type accept_compressed: bool
+            :param blob_cache: Local cache of files downloaded from the storage. Disabled if not provided.
+            :type blob_cache: BlobCache
+            :param outbox: Durable store of the writes sent with the write method while the API is unreachable, to
+                send them later. Disabled if not provided.
+            :type outbox: Outbox
 
         """
 
@@ -58,32 +110,330 @@ class Connector():
         self._role_id = role_id
         self._secret_id = secret_id
         self._verify_ssl = verify_ssl
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._http_cache = http_cache
+        self._lookup_cache = lookup_cache
+        self._coalesce_requests = coalesce_requests
+        self._codec = get_codec(codec)
+        self._compressor = get_compressor(compression)
+        self._compression_threshold = compression_threshold
+        self._accept_compressed = accept_compressed
+        self._blob_cache = blob_cache
+        self._outbox = outbox
+
+        # GET requests in progress when coalescing is enabled, by url
+        self._inflight = {}
 
         # Check API_URL
         if self._api_url.endswith('/'):
             self._api_url = self._api_url[:-1]
 
-        # Authenticate with the API
-        self._authenticate()
-
-    def _authenticate(self):
-        # Authenticate with the API
-        auth_resp = requests.post('{}/api/v2/auth/approle'.format(self._api_url),
-                                  verify=self._verify_ssl,
-                                  json={
-                                      'role_id': self._role_id,
-                                      'secret_id': self._secret_id
-                                  })
-        if auth_resp.status_code != 200:
-            raise TeslaAuthException('Invalid credentials')
+    def _store_authentication(self, module):
+        """
+            Store the data obtained when authenticating with the API
 
+            :param module: Authentication response
+            :type module: dict
+        """
         # Store authentication data
-        self._module = auth_resp.json()
+        self._module = module
 
         # Initialize the token
-        self._token = self._module['token']
+        self._store_token(self._module['token'])
+
+    def _store_token(self, token):
+        """
+            Store a new access token and its expiration time
+
+            :param token: Token data with access and refresh tokens
+            :type token: dict
+        """
+        self._token = token
+        self._token_iat = datetime.datetime.utcnow()
         self._token_exp = self._get_token_expiration(self._token['access_token'])
 
+    def _token_needs_refresh(self, margin=None):
+        """
+            Check if the token is about to expire
+
+            :param margin: Time before the expiration when the token must be refreshed. Default is 5 minutes.
+            :type margin: datetime.timedelta
+            :return: True if the token must be refreshed before using it
+            :rtype: bool
+        """
+        if margin is None:
+            margin = datetime.timedelta(minutes=5)
+        return self._token_exp < datetime.datetime.utcnow() + margin
+
+    def _get_token_renewal_margin(self):
+        """
+            Get the time before the expiration when the background renewal refreshes the token. It is limited to half
+            of the token lifetime to avoid continuous renewals with short lived tokens.
+
+            :return: Renewal margin
+            :rtype: datetime.timedelta
+        """
+        margin = datetime.timedelta(seconds=self._token_renewal_margin)
+        return min(margin, (self._token_exp - self._token_iat) / 2)
+
+    def _get_token_renewal_delay(self):
+        """
+            Get the number of seconds to wait before the background renewal refreshes the token
+
+            :return: Seconds to wait
+            :rtype: float
+        """
+        renewal_time = self._token_exp - self._get_token_renewal_margin()
+        return max((renewal_time - datetime.datetime.utcnow()).total_seconds(), 0)
+
+    def _get_retry_delay(self, method, attempt, start, status_code=None, retry_after=None):
+        """
+            Get the delay before retrying a failed request
+
+            :param method: HTTP method of the request
+            :type method: str
+            :param attempt: Number of attempts already done
+            :type attempt: int
+            :param start: Monotonic time when the first attempt started
+            :type start: float
+            :param status_code: Status code of the response, or None if the request failed with a connection error
+            :type status_code: int
+            :param retry_after: Value of the Retry-After header of the response
+            :type retry_after: str
+            :return: Seconds to wait before retrying, or None if the request must not be retried
+            :rtype: float
+        """
+        if self._retry_policy is None:
+            return None
+        return self._retry_policy.get_delay(method, attempt, time.monotonic() - start, status_code, retry_after)
+
+    def _before_request(self, request_url):
+        """
+            Check that the circuit breaker allows a request
+
+            :param request_url: Absolute url of the request
+            :type request_url: str
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.before_request(request_url)
+
+    def _record_result(self, request_url, status_code=None):
+        """
+            Record the result of a request in the circuit breaker
+
+            :param request_url: Absolute url of the request
+            :type request_url: str
+            :param status_code: Status code of the response, or None if the request failed with a connection error
+            :type status_code: int
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_result(request_url, status_code)
+
+    def _release_request(self, request_url):
+        """
+            Release in the circuit breaker a request that ended without a result
+
+            :param request_url: Absolute url of the request
+            :type request_url: str
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.release(request_url)
+
+    def _encode_body(self, body):
+        """
+            Serialize the body of a request, compressing it when it is large enough
+
+            :param body: Data to include in the request. Bytes are considered already serialized with the codec.
+            :type body: dict | bytes
+            :return: Serialized body and the headers describing it
+            :rtype: tuple
+        """
+        headers = {}
+        if not self._accept_compressed:
+            headers['Accept-Encoding'] = 'identity'
+        if body is None:
+            return None, headers
+        data = body if isinstance(body, bytes) else self._codec.dumps(body)
+        headers['Content-Type'] = self._codec.content_type
+        if self._compressor is not None and len(data) >= self._compression_threshold:
+            compressed = self._compressor.compress(data)
+            if len(compressed) < len(data):
+                data = compressed
+                headers['Content-Encoding'] = self._compressor.encoding
+        return data, headers
+
+    def _get_cached_response(self, method, request_url):
+        """
+            Get the conditional request headers for a request, with the cached data they validate
+
+            :param method: HTTP method of the request
+            :type method: str
+            :param request_url: Absolute url of the request
+            :type request_url: str
+            :return: Conditional request headers and cached data
+            :rtype: tuple
+        """
+        if self._http_cache is None or method.lower() != 'get':
+            return {}, None
+        return self._http_cache.get_entry(request_url)
+
+    def _update_cache(self, method, request_url, data, headers):
+        """
+            Update the cache with a response. Writes to an url invalidate the cached response for this url.
+
+            :param method: HTTP method of the request
+            :type method: str
+            :param request_url: Absolute url of the request
+            :type request_url: str
+            :param data: Decoded response
+            :type data: dict
+            :param headers: Response headers
+            :type headers: dict
+        """
+        if method.lower() != 'get' and self._lookup_cache is not None:
+            self._lookup_cache.invalidate(request_url)
+        if self._http_cache is None:
+            return
+        if method.lower() == 'get':
+            self._http_cache.set(request_url, data, headers.get('ETag'), headers.get('Last-Modified'))
+        else:
+            self._http_cache.invalidate(request_url)
+
+    @property
+    def codec(self):
+        """
+            JSON codec used for request bodies and responses
+            :return: Codec
+            :rtype: JsonCodec
+        """
+        return self._codec
+
+    @property
+    def blob_cache(self):
+        """
+            Access to the downloaded files cache
+            :return: Files cache
+            :rtype: BlobCache
+        """
+        return self._blob_cache
+
+    @property
+    def outbox(self):
+        """
+            Access to the durable store of writes not sent yet
+            :return: Outbox
+            :rtype: Outbox
+        """
+        return self._outbox
+
+    @staticmethod
+    def _is_unreachable(exc):
+        """
+            Check if an error means that the API is unreachable, so a write can be sent later
+
+            :param exc: Error raised sending a request
+            :type exc: Exception
+            :return: True for connection errors, timeouts, open circuits and server errors
+            :rtype: bool
+        """
+        if isinstance(exc, InternalException):
+            return exc.status_code is not None and exc.status_code >= 500
+        if isinstance(exc, (CircuitOpenException, requests.ConnectionError, requests.Timeout)):
+            return True
+        return aiohttp is not None and isinstance(exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+    def _get_replay_error(self, write_id, exc):
+        """
+            Get the result of a stored write that could not be sent during the replay
+
+            :param write_id: Identifier of the write
+            :type write_id: int
+            :param exc: Error raised sending the write
+            :type exc: Exception
+            :return: Failed and retried writes, with the error, and whether the API is unreachable
+            :rtype: tuple
+        """
+        if not self._is_unreachable(exc):
+            return [(write_id, exc)], [], False
+        if isinstance(exc, InternalException):
+            # The API answered with a server error, which counts as an attempt
+            return [], [(write_id, exc)], True
+        return [], [], True
+
+    @staticmethod
+    def _merge_replay(results):
+        """
+            Merge the results of the replay of each resource
+
+            :param results: Writes sent, failed and retried and whether the API is unreachable, as returned by
+                _replay_writes
+            :type results: list
+            :return: Writes sent, failed and retried, and whether the API is still unreachable
+            :rtype: tuple
+        """
+        sent, failed, retried = [], [], []
+        for url_sent, url_failed, url_retried, _ in results:
+            sent.extend(url_sent)
+            failed.extend(url_failed)
+            retried.extend(url_retried)
+        return sent, failed, retried, any(result[3] for result in results)
+
+    def _get_download_headers(self, entry, immutable):
+        """
+            Get the headers to revalidate a cached file
+
+            :param entry: Cached content and ETag, or None if the file is not cached
+            :type entry: tuple
+            :param immutable: Whether the content of the url never changes
+            :type immutable: bool
+            :return: Headers to include in the request, or None if the cached content can be used without a request
+            :rtype: dict
+        """
+        if entry is None:
+            return {}
+        if immutable:
+            return None
+        if entry[1] is None:
+            return {}
+        return {'If-None-Match': entry[1]}
+
+    @property
+    def lookup_cache(self):
+        """
+            Access to the identifier lookups cache
+            :return: Lookups cache
+            :rtype: LookupCache
+        """
+        return self._lookup_cache
+
+    @property
+    def http_cache(self):
+        """
+            Access to the HTTP responses cache
+            :return: Responses cache
+            :rtype: ResponseCache
+        """
+        return self._http_cache
+
+    @property
+    def circuit_breaker(self):
+        """
+            Access to the circuit breaker, which reports the state of each endpoint family
+            :return: Circuit breaker
+            :rtype: CircuitBreaker
+        """
+        return self._circuit_breaker
+
+    @property
+    def retry_policy(self):
+        """
+            Access to the retry policy, which exposes retry counters
+            :return: Retry policy
+            :rtype: RetryPolicy
+        """
+        return self._retry_policy
+
     def get_vle_id(self):
         """
             Obtain the vle ID for current VLE
@@ -91,7 +441,7 @@ class Connector():
             :return: VLE ID if current module is a VLE, or None if provided credentials are not for a VLE
             :rtype: int
         """
-        if 'vle_id' in self._module:
+        if 'vle_id' in self.module:
             return self._module['vle_id']
         return None
 
@@ -102,7 +452,7 @@ class Connector():
             :return: Provider ID if current module is a Provider, or None if provided credentials are not for a Provider
             :rtype: int
         """
-        if 'provider_id' in self._module:
+        if 'provider_id' in self.module:
             return self._module['provider_id']
         return None
 
@@ -121,13 +471,248 @@ class Connector():
             :type status_code: int
         """
         if status_code == 400:
-            raise BadRequestException("HTTP 400, Bad Request: {}".format(content))
+            raise BadRequestException("HTTP 400, Bad Request: {}".format(content), status_code)
         if status_code == 404:
             raise ObjectNotFoundException("HTTP 404, Not Found")
         if status_code == 501:
             raise NotImplementedException("HTTP 501, Not implemented")
         if status_code >= 300:
-            raise InternalException("Something Wrong: HTTP " + str(status_code))
+            raise InternalException("Something Wrong: HTTP " + str(status_code), status_code)
+
+    def _build_url(self, url):
+        """
+            Build the absolute url for a request
+
+            :param url: Absolute or relative url
+            :type url: str
+            :return: Absolute url
+            :rtype: str
+        """
+        if url.startswith(self._api_url):
+            # Absolute url
+            return url
+
+        # Relative url
+        if url.startswith('/'):
+            request_url = '{}{}'.format(self._api_url, url)
+        else:
+            request_url = '{}/{}'.format(self._api_url, url)
+        request_url = request_url.replace('//', '/')
+        return request_url.replace(':/', '://')
+
+    @property
+    def config(self):
+        """
+            Access to module configuration
+            :return: Module configuration
+            :rtype: dict
+        """
+        return self.module['config']
+
+    @property
+    def module(self):
+        """
+            Access to module data
+            :return: Module configuration
+            :rtype: dict
+        """
+        if self._module is None:
+            raise TeslaAuthException('Connector is not authenticated')
+        return self._module
+
+
+class Connector(BaseConnector):
+    """
+        Connector class to manage connections with the APIs
+    """
+    #: HTTP session used to reuse connections -> requests.Session
+    _session = None
+
+    #: Background token renewal thread -> threading.Thread
+    _token_renewal = None
+
+    def __init__(self, api_url, role_id, secret_id, verify_ssl=True, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keepalive_timeout=None, token_renewal=False, token_renewal_margin=600,
+                 retry_policy=None, circuit_breaker=None, http_cache=None, lookup_cache=None,
+                 coalesce_requests=False, codec=None, compression=None, compression_threshold=1024,
+                 accept_compressed=True, blob_cache=None, outbox=None):
+        """
+            Default constructor.
+
+            :param api_url: TeSLA API URL
+            :type api_url: str
+            :param role_id: RoleId to authenticate with Vault
+            :type role_id: str
+            :param secret_id: SecretId to authenticate with Vault
+            :type secret_id: str
+            :param verify_ssl: Whether to verify certificate of the server
+            :type verify_ssl: bool
+            :param pool_connections: Number of hosts (API, storage, ...) to keep a connection pool for
+            :type pool_connections: int
+            :param pool_maxsize: Maximum number of connections kept alive for each host
+            :type pool_maxsize: int
+            :param pool_block: Whether to wait for a free connection when the pool of a host is exhausted
+            :type pool_block: bool
+            :param keepalive_timeout: Seconds a pool can stay idle before its connections are discarded. If not
+                provided, idle connections are kept until the server closes them.
+            :type keepalive_timeout: float
+            :param token_renewal: Whether to refresh the token in a background thread before it expires
+            :type token_renewal: bool
+            :param token_renewal_margin: Seconds before the token expiration when background renewal takes place
+            :type token_renewal_margin: float
+            :param retry_policy: Policy to retry failed requests. If not provided, requests are not retried.
+            :type retry_policy: RetryPolicy
+            :param circuit_breaker: Circuit breaker to fail fast on failing endpoints. Disabled if not provided.
+            :type circuit_breaker: CircuitBreaker
+            :param http_cache: Cache for GET responses, revalidated with conditional requests. Disabled if not provided.
+            :type http_cache: ResponseCache
+            :param lookup_cache: Cache for identifier lookups (find_by_* methods). Disabled if not provided.
+            :type lookup_cache: LookupCache
+            :param coalesce_requests: Whether concurrent identical GET requests share a single HTTP request
+            :type coalesce_requests: bool
+            :param codec: JSON codec, or its name. If not provided, the fastest installed one is used.
+            :type codec: JsonCodec | str
+            :param compression: Compressor, or content encoding (gzip, zstd, br), for request bodies. Disabled if not
+                provided. The server must accept compressed requests.
+            :type compression: GzipCompressor | str
+            :param compression_threshold: Minimum size in bytes of the request bodies to compress
+            :type compression_threshold: int
+            :param accept_compressed: Whether to negotiate compressed responses
+            :type accept_compressed: bool
+            :param blob_cache: Local cache of files downloaded from the storage. Disabled if not provided.
+            :type blob_cache: BlobCache
+            :param outbox: Durable store of the writes sent with the write method while the API is unreachable, to
+                send them later. Disabled if not provided.
+            :type outbox: Outbox
+
+        """
+        super().__init__(api_url, role_id, secret_id, verify_ssl, retry_policy, circuit_breaker, http_cache,
+                         lookup_cache, coalesce_requests, codec, compression, compression_threshold,
+                         accept_compressed, blob_cache, outbox)
+
+        # Connection pool configuration
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keepalive_timeout = keepalive_timeout
+        self._session_lock = threading.Lock()
+        self._session = self._create_session()
+        self._last_used = time.monotonic()
+
+        # Only one thread is allowed to refresh the token at the same time
+        self._token_lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+        self._token_renewal_margin = token_renewal_margin
+        self._token_renewal_stop = threading.Event()
+
+        # Authenticate with the API
+        try:
+            self._authenticate()
+        except Exception:
+            self.close()
+            raise
+
+        if token_renewal:
+            self.start_token_renewal()
+
+    def _create_session(self):
+        """
+            Create a new HTTP session with a pooled adapter for each protocol
+
+            :return: HTTP session
+            :rtype: requests.Session
+        """
+        session = requests.Session()
+        if self._verify_ssl is not None:
+            session.verify = self._verify_ssl
+        for prefix in ['https://', 'http://']:
+            session.mount(prefix, HTTPAdapter(pool_connections=self._pool_connections,
+                                              pool_maxsize=self._pool_maxsize,
+                                              pool_block=self._pool_block))
+        return session
+
+    @property
+    def session(self):
+        """
+            Access to the pooled HTTP session. Connections idle for longer than the keep-alive timeout are discarded
+            before the session is returned.
+
+            :return: HTTP session
+            :rtype: requests.Session
+        """
+        with self._session_lock:
+            if self._session is None:
+                raise TeslaConfigException('Connector is closed')
+            now = time.monotonic()
+            if self._keepalive_timeout is not None and now - self._last_used > self._keepalive_timeout:
+                for adapter in self._session.adapters.values():
+                    adapter.close()
+            self._last_used = now
+            return self._session
+
+    def start_token_renewal(self):
+        """
+            Start a background thread refreshing the token before it expires, so requests never wait for it
+        """
+        if self._token_renewal is not None and self._token_renewal.is_alive():
+            return
+        self._token_renewal_stop.clear()
+        self._token_renewal = threading.Thread(target=self._token_renewal_loop, name='tesla-ce-token-renewal',
+                                               daemon=True)
+        self._token_renewal.start()
+
+    def stop_token_renewal(self):
+        """
+            Stop the background token renewal thread
+        """
+        self._token_renewal_stop.set()
+        if self._token_renewal is not None:
+            if self._token_renewal is not threading.current_thread():
+                self._token_renewal.join()
+            self._token_renewal = None
+
+    def _token_renewal_loop(self):
+        """
+            Background token renewal loop. On failure it retries later, and requests fall back to the lazy refresh.
+        """
+        delay = self._get_token_renewal_delay()
+        while not self._token_renewal_stop.wait(delay):
+            try:
+                with self._token_lock:
+                    if self._token_needs_refresh(self._get_token_renewal_margin()):
+                        self._refresh_token()
+                delay = self._get_token_renewal_delay()
+            except Exception:
+                delay = 30
+
+    def close(self):
+        """
+            Close all the pooled connections. The connector cannot be used after closing it.
+        """
+        self.stop_token_renewal()
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _authenticate(self):
+        # Authenticate with the API
+        auth_resp = self.session.post('{}/api/v2/auth/approle'.format(self._api_url),
+                                      json={
+                                          'role_id': self._role_id,
+                                          'secret_id': self._secret_id
+                                      })
+        if auth_resp.status_code != 200:
+            raise TeslaAuthException('Invalid credentials')
+
+        # Store authentication data
+        self._store_authentication(auth_resp.json())
 
     def _get_token(self):
         """
@@ -136,24 +721,31 @@ class Connector():
             :rtype: str
         """
         # Check the validity of the token
-        if self._token_exp < datetime.datetime.utcnow() + datetime.timedelta(minutes=5):
-            headers = {'Authorization': 'JWT {}'.format(self._token['refresh_token'])}
-            # Refresh the token
-            refresh_resp = requests.post('{}/api/v2/auth/token/refresh'.format(self._api_url),
-                                         headers=headers,
-                                         verify=self._verify_ssl,
-                                         json={'token': self._token['access_token']})
-            if refresh_resp.status_code == 200:
-                self._token = refresh_resp.json()['token']
-                self._token_exp = self._get_token_expiration(self._token['access_token'])
-            else:
-                try:
-                    self._authenticate()
-                except TeslaAuthException:
-                    raise TeslaAuthException('Authentication failed during token refresh')
+        if self._token_needs_refresh():
+            with self._token_lock:
+                # Other threads waiting for the lock will find the token already refreshed
+                if self._token_needs_refresh():
+                    self._refresh_token()
 
         return self._token['access_token']
 
+    def _refresh_token(self):
+        """
+            Refresh the JWT token, authenticating again if the refresh token is not accepted
+        """
+        headers = {'Authorization': 'JWT {}'.format(self._token['refresh_token'])}
+        # Refresh the token
+        refresh_resp = self.session.post('{}/api/v2/auth/token/refresh'.format(self._api_url),
+                                         headers=headers,
+                                         json={'token': self._token['access_token']})
+        if refresh_resp.status_code == 200:
+            self._store_token(refresh_resp.json()['token'])
+        else:
+            try:
+                self._authenticate()
+            except TeslaAuthException:
+                raise TeslaAuthException('Authentication failed during token refresh')
+
     def executor(self, method, url, body=None):
         """
             Execute an HTTP request
@@ -168,60 +760,354 @@ class Connector():
             :rtype: dict
         """
         # Build the request url
-        if url.startswith(self._api_url):
-            # Absolute url
-            request_url = url
+        request_url = self._build_url(url)
+
+        if self._coalesce_requests and method.lower() == 'get':
+            return self._execute_coalesced(request_url)
+        return self._execute(method, request_url, body)
+
+    def _execute_coalesced(self, request_url):
+        """
+            Execute a GET request, sharing the result with identical requests started while it is in progress
+
+            :param request_url: Absolute url to send the request
+            :type request_url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(request_url)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._inflight[request_url] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            data = self._execute('get', request_url)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
         else:
-            # Relative url
-            if url.startswith('/'):
-                request_url = '{}{}'.format(self._api_url, url)
-            else:
-                request_url = '{}/{}'.format(self._api_url, url)
-            request_url = request_url.replace('//', '/')
-            request_url = request_url.replace(':/', '://')
+            future.set_result(data)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[request_url]
+        return data
+
+    def _execute(self, method, request_url, body=None):
+        """
+            Execute an HTTP request
 
+            :param method: Method to be used (get, post, put, delete, patch)
+            :type method: str
+            :param request_url: Absolute url to send the request
+            :type request_url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
+            :rtype: dict
+        """
         # Call the method
-        headers = {'Authorization': 'JWT {}'.format(self._get_token())}
-        resp = requests.request(method=method, url=request_url, json=body, headers=headers, verify=self._verify_ssl)
+        cache_headers, cached_data = self._get_cached_response(method, request_url)
+        resp = self._send(method, request_url, body, cache_headers)
+
+        # Serve not modified responses from the cache
+        if resp.status_code == 304 and cache_headers:
+            self._http_cache.record_hit(request_url)
+            return cached_data
 
         # Take actions with the response
         self._check_response_status(resp.status_code, resp.content)
 
         # Consider the no content response
         if resp.status_code == 204:
+            self._update_cache(method, request_url, None, {})
             return None
 
-        return resp.json()
+        data = self._codec.loads(resp.content)
+        self._update_cache(method, request_url, data, resp.headers)
+        return data
 
-    def get(self, url):
+    def _send(self, method, request_url, body=None, headers=None, stream=False):
         """
-            Execute a GET HTTP request
-            :param url: Url to send the request
-            :type url: str
-            :return: The response to the request
-            :rtype: dict
+            Send an authenticated request, retrying failed attempts according to the retry policy
+
+            :param method: Method to be used (get, post, put, delete, patch)
+            :type method: str
+            :param request_url: Absolute url to send the request
+            :type request_url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :param headers: Additional headers to include in the request
+            :type headers: dict
+            :param stream: Whether to defer downloading the response content
+            :type stream: bool
+            :return: The response of the last attempt
+            :rtype: requests.Response
         """
-        return self.executor('get', url=url)
+        data, body_headers = self._encode_body(body)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            request_headers = dict(headers or {}, Authorization='JWT {}'.format(self._get_token()))
+            request_headers.update(body_headers)
+            self._before_request(request_url)
+            try:
+                resp = self.session.request(method=method, url=request_url, data=data, headers=request_headers,
+                                            stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record_result(request_url)
+                delay = self._get_retry_delay(method, attempt, start)
+                if delay is None:
+                    raise
+            except Exception:
+                self._record_result(request_url)
+                raise
+            except BaseException:
+                # Interrupted requests have no result
+                self._release_request(request_url)
+                raise
+            else:
+                self._record_result(request_url, resp.status_code)
+                delay = self._get_retry_delay(method, attempt, start, resp.status_code,
+                                              resp.headers.get('Retry-After'))
+                if delay is None:
+                    return resp
+                resp.close()
+            time.sleep(delay)
 
-    def delete(self, url):
+    def upload(self, url, fields, files, chunk_size=65536):
         """
-            Execute a DELETE HTTP request
-            :param url: Url to send the request
+            Upload files to the storage using a form POST request, as required by pre-signed upload URLs. Files are
+            streamed while the request is sent. The request is chunked if the size of some file is not known.
+
+            :param url: Upload url
             :type url: str
+            :param fields: Form fields to include in the request
+            :type fields: dict
+            :param files: Files to upload, as bytes, open files, memory mapped files or iterables of chunks
+            :type files: dict
+            :param chunk_size: Number of bytes read at once from files
+            :type chunk_size: int
             :return: The response to the request
-            :rtype: dict
+            :rtype: requests.Response
         """
-        return self.executor('delete', url=url)
+        data = MultipartEncoder(fields, files, chunk_size)
+        resp = self.session.post(url, data=data, headers={'Content-Type': data.content_type})
 
-    def post(self, url, body=None):
+        # Check given response
+        self._check_response_status(resp.status_code, resp.content)
+
+        return resp
+
+    def download(self, url, immutable=False):
         """
-            Execute a POST HTTP request
-            :param url: Url to send the request
+            Download a file from the storage, as required by pre-signed download URLs. When the files cache is enabled,
+            cached files are revalidated with their ETag, or used directly if they are immutable.
+
+            :param url: Download url
             :type url: str
-            :param body: Data to include in the request
-            :type body: dict
-            :return: The response to the request
-            :rtype: dict
+            :param immutable: Whether the content of the url never changes
+            :type immutable: bool
+            :return: The content of the file
+            :rtype: bytes | memoryview
+        """
+        entry = None
+        if self._blob_cache is not None:
+            entry = self._blob_cache.get_entry(self._blob_cache.get_key(url))
+        headers = self._get_download_headers(entry, immutable)
+        if headers is None:
+            return entry[0]
+
+        resp = self.session.get(url, headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            return entry[0]
+
+        # Check given response
+        self._check_response_status(resp.status_code, resp.content)
+
+        if self._blob_cache is not None:
+            self._blob_cache.set(self._blob_cache.get_key(url), resp.content, resp.headers.get('ETag'))
+        return resp.content
+
+    def upload_part(self, url, data):
+        """
+            Upload a part of a multipart upload to its pre-signed url
+
+            :param url: Upload url of the part
+            :type url: str
+            :param data: Content of the part
+            :type data: bytes
+            :return: ETag of the uploaded part
+            :rtype: str
+        """
+        resp = self.session.put(url, data=data)
+
+        # Check given response
+        self._check_response_status(resp.status_code, resp.content)
+
+        return resp.headers.get('ETag')
+
+    def complete_upload(self, url, etags):
+        """
+            Complete a multipart upload, joining the uploaded parts
+
+            :param url: Pre-signed url to complete the upload
+            :type url: str
+            :param etags: ETag of each part, by part number
+            :type etags: dict
+            :return: The content of the response
+            :rtype: bytes
+        """
+        resp = self.session.post(url, data=get_complete_upload_body(etags))
+
+        # Check given response
+        self._check_response_status(resp.status_code, resp.content)
+        check_complete_upload_response(resp.content)
+
+        return resp.content
+
+    def get(self, url):
+        """
+            Execute a GET HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        return self.executor('get', url=url)
+
+    def lookup(self, url):
+        """
+            Execute a GET HTTP request to find objects by their identifiers, using the lookup cache if enabled
+            :param url: Url to send the request
+            :type url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        if self._lookup_cache is None:
+            return self.get(url)
+        request_url = self._build_url(url)
+        data = self._lookup_cache.get(request_url)
+        if data is None:
+            data = self.get(request_url)
+            self._lookup_cache.set(request_url, data)
+        return data
+
+    def iter_pages(self, url, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over the pages of a paginated list. By default each page is requested when the previous one is
+            consumed. With workers, the urls of the remaining pages are computed from the first page and requested
+            concurrently. With prefetch, next page is requested while current one is consumed. Pages are always
+            returned in order.
+            :param url: Url of the list
+            :type url: str
+            :param page_size: Number of elements per page. If not provided, the API default is used.
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Pages of the list
+            :rtype: generator
+        """
+        page = self.get(set_url_params(url, limit=page_size))
+
+        page_urls = None
+        if workers is not None and workers > 1:
+            page_urls = get_page_urls(page)
+        if page_urls is not None:
+            yield page
+            for future in iter_bounded(self.get, page_urls, workers):
+                yield future.result()
+            return
+
+        if not prefetch and (workers is None or workers <= 1):
+            yield page
+            while page.get('next') is not None:
+                page = self.get(page['next'])
+                yield page
+            return
+
+        # Request next page in background while current one is consumed
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            while True:
+                future = None
+                if page.get('next') is not None:
+                    future = executor.submit(self.get, page['next'])
+                yield page
+                if future is None:
+                    return
+                page = future.result()
+
+    def iter_results(self, url, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over the elements of a paginated list, requesting each page when the previous one is consumed
+            :param url: Url of the list
+            :type url: str
+            :param page_size: Number of elements per page. If not provided, the API default is used.
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Elements of the list
+            :rtype: generator
+        """
+        for page in self.iter_pages(url, page_size, workers, prefetch):
+            for item in page['results']:
+                yield item
+
+    def stream_results(self, url, page_size=None, key='results', chunk_size=65536):
+        """
+            Iterate over the elements of a list, decoding each response incrementally while it is received. Memory
+            usage does not depend on the size of the response. Pages of paginated lists are requested sequentially.
+            :param url: Url of the list
+            :type url: str
+            :param page_size: Number of elements per page. If not provided, the API default is used.
+            :type page_size: int
+            :param key: Field of the response containing the elements
+            :type key: str
+            :param chunk_size: Number of bytes read from the connection at once
+            :type chunk_size: int
+            :return: Elements of the list
+            :rtype: generator
+        """
+        request_url = set_url_params(self._build_url(url), limit=page_size)
+        while request_url is not None:
+            fields = {}
+            with contextlib.closing(self._send('get', request_url, stream=True)) as resp:
+                if resp.status_code >= 300:
+                    self._check_response_status(resp.status_code, resp.content)
+                if resp.status_code == 204:
+                    return
+                for item in iter_json_array(resp.iter_content(chunk_size), key, fields):
+                    yield item
+            request_url = fields.get('next')
+
+    def delete(self, url):
+        """
+            Execute a DELETE HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        return self.executor('delete', url=url)
+
+    def post(self, url, body=None):
+        """
+            Execute a POST HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
+            :rtype: dict
         """
         return self.executor('post', url=url, body=body)
 
@@ -249,20 +1135,818 @@ class Connector():
         """
         return self.executor('put', url=url, body=body)
 
-    @property
-    def config(self):
+    def write(self, method, url, body=None, key=None):
         """
-            Access to module configuration
-            :return: Module configuration
+            Execute a write request. When an outbox is configured and the API is unreachable, the write is stored in
+            the outbox to be sent later. Writes of a resource with stored writes are stored after them, to keep the
+            order.
+
+            :param method: Method to be used (post, put, patch, delete)
+            :type method: str
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :param key: Url of the resource the write belongs to, such as a request or a sample. Writes of the same
+                resource are sent in order. Default is the url of the write.
+            :type key: str
+            :return: The response to the request, or None if the write is stored in the outbox
             :rtype: dict
         """
-        return self._module['config']
+        if self._outbox is None:
+            return self.executor(method, url=url, body=body)
+        request_url = self._build_url(url)
+        key = self._build_url(key or url)
+        data = None if body is None else self._codec.dumps(body)
+        if self._outbox.replay_due():
+            self.replay_outbox()
+        if not self._outbox.has_pending(key):
+            try:
+                return self._execute(method, request_url, data)
+            except Exception as exc:
+                if not self._is_unreachable(exc):
+                    raise
+        self._outbox.add(method, request_url, data, key)
+        return None
+
+    def _replay_writes(self, writes):
+        """
+            Send stored writes of the same resource, one after the other, until the API is unreachable
+
+            :param writes: Stored (id, method, url, body) writes
+            :type writes: list
+            :return: Identifiers of the writes sent, failed and retried writes with the error, and whether the API is
+                unreachable
+            :rtype: tuple
+        """
+        sent, failed = [], []
+        for write_id, method, request_url, body in writes:
+            try:
+                self._execute(method, request_url, body)
+            except Exception as exc:
+                write_failed, retried, unreachable = self._get_replay_error(write_id, exc)
+                failed.extend(write_failed)
+                if unreachable:
+                    return sent, failed, retried, True
+            else:
+                sent.append(write_id)
+        return sent, failed, [], False
+
+    def replay_outbox(self):
+        """
+            Send the writes stored in the outbox, in batches. Writes of the same resource are sent in the order they
+            were stored, and writes of different resources are sent in parallel. It stops when the API is still
+            unreachable.
+
+            :return: Number of writes sent
+            :rtype: int
+        """
+        if self._outbox is None or not self._outbox.replay_lock.acquire(blocking=False):
+            return 0
+        try:
+            total = 0
+            while True:
+                groups = self._outbox.get_batch()
+                if len(groups) == 0:
+                    return total
+                sent, failed, retried, unreachable = self._merge_replay(
+                    [future.result() for future in iter_bounded(self._replay_writes, groups, self._outbox.workers)])
+                self._outbox.record_replay(sent, failed, retried)
+                total += len(sent)
+                if unreachable:
+                    return total
+        finally:
+            self._outbox.replay_lock.release()
+
+
+class AsyncConnector(BaseConnector):
+    """
+        Asynchronous connector class to manage connections with the APIs. It must be opened before use, either with
+        the open method or as an asynchronous context manager.
+    """
+    #: HTTP session used to reuse connections -> aiohttp.ClientSession
+    _session = None
+
+    #: Background token renewal task -> asyncio.Task
+    _token_renewal = None
+
+    def __init__(self, api_url, role_id, secret_id, verify_ssl=True, pool_maxsize=100, pool_maxsize_per_host=0,
+                 keepalive_timeout=15, token_renewal=False, token_renewal_margin=600, retry_policy=None,
+                 circuit_breaker=None, http_cache=None, lookup_cache=None, coalesce_requests=False,
+                 codec=None, compression=None, compression_threshold=1024, accept_compressed=True,
+                 blob_cache=None, outbox=None):
+        """
+            Default constructor.
+
+            :param api_url: TeSLA API URL
+            :type api_url: str
+            :param role_id: RoleId to authenticate with Vault
+            :type role_id: str
+            :param secret_id: SecretId to authenticate with Vault
+            :type secret_id: str
+            :param verify_ssl: Whether to verify certificate of the server
+            :type verify_ssl: bool
+            :param pool_maxsize: Maximum number of simultaneous connections. Zero for no limit.
+            :type pool_maxsize: int
+            :param pool_maxsize_per_host: Maximum number of simultaneous connections to each host. Zero for no limit.
+            :type pool_maxsize_per_host: int
+            :param keepalive_timeout: Seconds an idle connection is kept alive
+            :type keepalive_timeout: float
+            :param token_renewal: Whether to refresh the token in a background task before it expires
+            :type token_renewal: bool
+            :param token_renewal_margin: Seconds before the token expiration when background renewal takes place
+            :type token_renewal_margin: float
+            :param retry_policy: Policy to retry failed requests. If not provided, requests are not retried.
+            :type retry_policy: RetryPolicy
+            :param circuit_breaker: Circuit breaker to fail fast on failing endpoints. Disabled if not provided.
+            :type circuit_breaker: CircuitBreaker
+            :param http_cache: Cache for GET responses, revalidated with conditional requests. Disabled if not provided.
+            :type http_cache: ResponseCache
+            :param lookup_cache: Cache for identifier lookups (find_by_* methods). Disabled if not provided.
+            :type lookup_cache: LookupCache
+            :param coalesce_requests: Whether concurrent identical GET requests share a single HTTP request
+            :type coalesce_requests: bool
+            :param codec: JSON codec, or its name. If not provided, the fastest installed one is used.
+            :type codec: JsonCodec | str
+            :param compression: Compressor, or content encoding (gzip, zstd, br), for request bodies. Disabled if not
+                provided. The server must accept compressed requests.
+            :type compression: GzipCompressor | str
+            :param compression_threshold: Minimum size in bytes of the request bodies to compress
+            :type compression_threshold: int
+            :param accept_compressed: Whether to negotiate compressed responses
+            :type accept_compressed: bool
+            :param blob_cache: Local cache of files downloaded from the storage. Disabled if not provided.
+            :type blob_cache: BlobCache
+            :param outbox: Durable store of the writes sent with the write method while the API is unreachable, to
+                send them later. Disabled if not provided.
+            :type outbox: Outbox
+
+        """
+        if aiohttp is None:
+            raise TeslaConfigException('Package aiohttp is required to use the asynchronous connector')
+
+        super().__init__(api_url, role_id, secret_id, verify_ssl, retry_policy, circuit_breaker, http_cache,
+                         lookup_cache, coalesce_requests, codec, compression, compression_threshold,
+                         accept_compressed, blob_cache, outbox)
+
+        # Connection pool configuration
+        self._pool_maxsize = pool_maxsize
+        self._pool_maxsize_per_host = pool_maxsize_per_host
+        self._keepalive_timeout = keepalive_timeout
+
+        # Only one task is allowed to refresh the token at the same time. Created on open to bind it to the loop.
+        self._token_lock = None
+        self._token_renewal_enabled = token_renewal
+        self._token_renewal_margin = token_renewal_margin
+
+    def _get_ssl(self):
+        """
+            Get the SSL configuration for aiohttp from the verify_ssl value
+
+            :return: SSL configuration
+            :rtype: bool | ssl.SSLContext
+        """
+        if self._verify_ssl is False:
+            return False
+        if isinstance(self._verify_ssl, str):
+            return ssl.create_default_context(cafile=self._verify_ssl)
+        return True
+
+    async def open(self):
+        """
+            Create the connection pool and authenticate with the API
+        """
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+                limit=self._pool_maxsize,
+                limit_per_host=self._pool_maxsize_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+                ssl=self._get_ssl()
+            ))
+        try:
+            await self._authenticate()
+        except Exception:
+            await self.close()
+            raise
+
+        if self._token_renewal_enabled:
+            self.start_token_renewal()
+
+    def start_token_renewal(self):
+        """
+            Start a background task refreshing the token before it expires, so requests never wait for it
+        """
+        if self._token_renewal is None or self._token_renewal.done():
+            self._token_renewal = asyncio.ensure_future(self._token_renewal_loop())
+
+    async def stop_token_renewal(self):
+        """
+            Stop the background token renewal task
+        """
+        if self._token_renewal is not None:
+            self._token_renewal.cancel()
+            try:
+                await self._token_renewal
+            except asyncio.CancelledError:
+                pass
+            self._token_renewal = None
+
+    async def _token_renewal_loop(self):
+        """
+            Background token renewal loop. On failure it retries later, and requests fall back to the lazy refresh.
+        """
+        delay = self._get_token_renewal_delay()
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                async with self._token_lock:
+                    if self._token_needs_refresh(self._get_token_renewal_margin()):
+                        await self._refresh_token()
+                delay = self._get_token_renewal_delay()
+            except Exception:
+                delay = 30
+
+    async def close(self):
+        """
+            Close all the pooled connections
+        """
+        await self.stop_token_renewal()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
     @property
-    def module(self):
+    def session(self):
         """
-            Access to module data
-            :return: Module configuration
+            Access to the pooled HTTP session
+
+            :return: HTTP session
+            :rtype: aiohttp.ClientSession
+        """
+        if self._session is None:
+            raise TeslaConfigException('Connector is not open')
+        return self._session
+
+    async def _authenticate(self):
+        # Authenticate with the API
+        async with self.session.post('{}/api/v2/auth/approle'.format(self._api_url),
+                                     json={
+                                         'role_id': self._role_id,
+                                         'secret_id': self._secret_id
+                                     }) as auth_resp:
+            if auth_resp.status != 200:
+                raise TeslaAuthException('Invalid credentials')
+
+            # Store authentication data
+            self._store_authentication(await auth_resp.json(content_type=None))
+
+    async def _get_token(self):
+        """
+            Get the JWT token to authenticate with the API
+            :return: JWT token
+            :rtype: str
+        """
+        # Check the validity of the token
+        if self._token_needs_refresh():
+            async with self._token_lock:
+                # Other tasks waiting for the lock will find the token already refreshed
+                if self._token_needs_refresh():
+                    await self._refresh_token()
+
+        return self._token['access_token']
+
+    async def _refresh_token(self):
+        """
+            Refresh the JWT token, authenticating again if the refresh token is not accepted
+        """
+        headers = {'Authorization': 'JWT {}'.format(self._token['refresh_token'])}
+        # Refresh the token
+        async with self.session.post('{}/api/v2/auth/token/refresh'.format(self._api_url),
+                                     headers=headers,
+                                     json={'token': self._token['access_token']}) as refresh_resp:
+            if refresh_resp.status == 200:
+                self._store_token((await refresh_resp.json(content_type=None))['token'])
+                return
+        try:
+            await self._authenticate()
+        except TeslaAuthException:
+            raise TeslaAuthException('Authentication failed during token refresh')
+
+    async def executor(self, method, url, body=None):
+        """
+            Execute an HTTP request
+
+            :param method: Method to be used (get, post, put, delete, patch)
+            :type method: str
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
             :rtype: dict
         """
-        return self._module
+        # Build the request url
+        request_url = self._build_url(url)
+
+        if self._coalesce_requests and method.lower() == 'get':
+            return await self._execute_coalesced(request_url)
+        return await self._execute(method, request_url, body)
+
+    async def _execute_coalesced(self, request_url):
+        """
+            Execute a GET request, sharing the result with identical requests started while it is in progress
+
+            :param request_url: Absolute url to send the request
+            :type request_url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        future = self._inflight.get(request_url)
+        while future is not None:
+            data = await asyncio.shield(future)
+            if data is not _CANCELLED_REQUEST:
+                return data
+            # The task sending the request was cancelled. The first waiting task sends it again.
+            future = self._inflight.get(request_url)
+
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[request_url] = future
+        try:
+            data = await self._execute('get', request_url)
+        except asyncio.CancelledError:
+            future.set_result(_CANCELLED_REQUEST)
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved, as there may be no other task waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+        finally:
+            del self._inflight[request_url]
+        return data
+
+    async def _execute(self, method, request_url, body=None):
+        """
+            Execute an HTTP request
+
+            :param method: Method to be used (get, post, put, delete, patch)
+            :type method: str
+            :param request_url: Absolute url to send the request
+            :type request_url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
+            :rtype: dict
+        """
+        # Call the method
+        cache_headers, cached_data = self._get_cached_response(method, request_url)
+        resp, content = await self._send(method, request_url, body, cache_headers)
+
+        # Serve not modified responses from the cache
+        if resp.status == 304 and cache_headers:
+            self._http_cache.record_hit(request_url)
+            return cached_data
+
+        # Take actions with the response
+        self._check_response_status(resp.status, content)
+
+        # Consider the no content response
+        if resp.status == 204:
+            self._update_cache(method, request_url, None, {})
+            return None
+
+        data = self._codec.loads(content)
+        self._update_cache(method, request_url, data, resp.headers)
+        return data
+
+    async def _send(self, method, request_url, body=None, headers=None, stream=False):
+        """
+            Send an authenticated request, retrying failed attempts according to the retry policy
+
+            :param method: Method to be used (get, post, put, delete, patch)
+            :type method: str
+            :param request_url: Absolute url to send the request
+            :type request_url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :param headers: Additional headers to include in the request
+            :type headers: dict
+            :param stream: Whether to defer downloading the response content. The caller must release the response.
+            :type stream: bool
+            :return: The response of the last attempt and its content, which is None when streaming
+            :rtype: tuple
+        """
+        data, body_headers = self._encode_body(body)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            request_headers = dict(headers or {}, Authorization='JWT {}'.format(await self._get_token()))
+            request_headers.update(body_headers)
+            self._before_request(request_url)
+            try:
+                resp = await self.session.request(method, request_url, data=data, headers=request_headers)
+                content = None
+                if not stream:
+                    try:
+                        content = await resp.read()
+                    finally:
+                        resp.release()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self._record_result(request_url)
+                delay = self._get_retry_delay(method, attempt, start)
+                if delay is None:
+                    raise
+            except Exception:
+                self._record_result(request_url)
+                raise
+            except BaseException:
+                # Interrupted requests have no result
+                self._release_request(request_url)
+                raise
+            else:
+                self._record_result(request_url, resp.status)
+                delay = self._get_retry_delay(method, attempt, start, resp.status, resp.headers.get('Retry-After'))
+                if delay is None:
+                    return resp, content
+                resp.release()
+            await asyncio.sleep(delay)
+
+    async def upload(self, url, fields, files, chunk_size=65536):
+        """
+            Upload files to the storage using a form POST request, as required by pre-signed upload URLs. Files are
+            streamed while the request is sent. The request is chunked if the size of some file is not known.
+
+            :param url: Upload url
+            :type url: str
+            :param fields: Form fields to include in the request
+            :type fields: dict
+            :param files: Files to upload, as bytes, open files, memory mapped files or iterables of chunks
+            :type files: dict
+            :param chunk_size: Number of bytes read at once from files
+            :type chunk_size: int
+            :return: The content of the response
+            :rtype: bytes
+        """
+        data = MultipartEncoder(fields, files, chunk_size)
+        headers = {'Content-Type': data.content_type}
+        if data.len is not None:
+            headers['Content-Length'] = str(data.len)
+
+        async with self.session.post(url, data=data, headers=headers) as resp:
+            content = await resp.read()
+
+        # Check given response
+        self._check_response_status(resp.status, content)
+
+        return content
+
+    async def download(self, url, immutable=False):
+        """
+            Download a file from the storage, as required by pre-signed download URLs. When the files cache is enabled,
+            cached files are revalidated with their ETag, or used directly if they are immutable.
+
+            :param url: Download url
+            :type url: str
+            :param immutable: Whether the content of the url never changes
+            :type immutable: bool
+            :return: The content of the file
+            :rtype: bytes | memoryview
+        """
+        entry = None
+        if self._blob_cache is not None:
+            entry = self._blob_cache.get_entry(self._blob_cache.get_key(url))
+        headers = self._get_download_headers(entry, immutable)
+        if headers is None:
+            return entry[0]
+
+        async with self.session.get(url, headers=headers) as resp:
+            content = await resp.read()
+        if resp.status == 304 and entry is not None:
+            return entry[0]
+
+        # Check given response
+        self._check_response_status(resp.status, content)
+
+        if self._blob_cache is not None:
+            self._blob_cache.set(self._blob_cache.get_key(url), content, resp.headers.get('ETag'))
+        return content
+
+    async def upload_part(self, url, data):
+        """
+            Upload a part of a multipart upload to its pre-signed url
+
+            :param url: Upload url of the part
+            :type url: str
+            :param data: Content of the part
+            :type data: bytes
+            :return: ETag of the uploaded part
+            :rtype: str
+        """
+        async with self.session.put(url, data=data) as resp:
+            content = await resp.read()
+
+        # Check given response
+        self._check_response_status(resp.status, content)
+
+        return resp.headers.get('ETag')
+
+    async def complete_upload(self, url, etags):
+        """
+            Complete a multipart upload, joining the uploaded parts
+
+            :param url: Pre-signed url to complete the upload
+            :type url: str
+            :param etags: ETag of each part, by part number
+            :type etags: dict
+            :return: The content of the response
+            :rtype: bytes
+        """
+        async with self.session.post(url, data=get_complete_upload_body(etags)) as resp:
+            content = await resp.read()
+
+        # Check given response
+        self._check_response_status(resp.status, content)
+        check_complete_upload_response(content)
+
+        return content
+
+    async def get(self, url):
+        """
+            Execute a GET HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        return await self.executor('get', url=url)
+
+    async def lookup(self, url):
+        """
+            Execute a GET HTTP request to find objects by their identifiers, using the lookup cache if enabled
+            :param url: Url to send the request
+            :type url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        if self._lookup_cache is None:
+            return await self.get(url)
+        request_url = self._build_url(url)
+        data = self._lookup_cache.get(request_url)
+        if data is None:
+            data = await self.get(request_url)
+            self._lookup_cache.set(request_url, data)
+        return data
+
+    async def iter_pages(self, url, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over the pages of a paginated list. By default each page is requested when the previous one is
+            consumed. With workers, the urls of the remaining pages are computed from the first page and requested
+            concurrently. With prefetch, next page is requested while current one is consumed. Pages are always
+            returned in order.
+            :param url: Url of the list
+            :type url: str
+            :param page_size: Number of elements per page. If not provided, the API default is used.
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Pages of the list
+            :rtype: async_generator
+        """
+        page = await self.get(set_url_params(url, limit=page_size))
+
+        page_urls = None
+        if workers is not None and workers > 1:
+            page_urls = get_page_urls(page)
+        if page_urls is not None:
+            yield page
+            async for task in aiter_bounded(self.get, page_urls, workers):
+                yield task.result()
+            return
+
+        if not prefetch and (workers is None or workers <= 1):
+            yield page
+            while page.get('next') is not None:
+                page = await self.get(page['next'])
+                yield page
+            return
+
+        # Request next page in background while current one is consumed
+        task = None
+        try:
+            while True:
+                task = None
+                if page.get('next') is not None:
+                    task = asyncio.ensure_future(self.get(page['next']))
+                yield page
+                if task is None:
+                    return
+                page = await task
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def iter_results(self, url, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over the elements of a paginated list, requesting each page when the previous one is consumed
+            :param url: Url of the list
+            :type url: str
+            :param page_size: Number of elements per page. If not provided, the API default is used.
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Elements of the list
+            :rtype: async_generator
+        """
+        async for page in self.iter_pages(url, page_size, workers, prefetch):
+            for item in page['results']:
+                yield item
+
+    async def stream_results(self, url, page_size=None, key='results', chunk_size=65536):
+        """
+            Iterate over the elements of a list, decoding each response incrementally while it is received. Memory
+            usage does not depend on the size of the response. Pages of paginated lists are requested sequentially.
+            :param url: Url of the list
+            :type url: str
+            :param page_size: Number of elements per page. If not provided, the API default is used.
+            :type page_size: int
+            :param key: Field of the response containing the elements
+            :type key: str
+            :param chunk_size: Number of bytes read from the connection at once
+            :type chunk_size: int
+            :return: Elements of the list
+            :rtype: async_generator
+        """
+        request_url = set_url_params(self._build_url(url), limit=page_size)
+        while request_url is not None:
+            resp, _ = await self._send('get', request_url, stream=True)
+            try:
+                if resp.status >= 300:
+                    self._check_response_status(resp.status, await resp.read())
+                if resp.status == 204:
+                    return
+                parser = JsonArrayParser(key)
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    for item in parser.feed(chunk):
+                        yield item
+                for item in parser.close():
+                    yield item
+            finally:
+                resp.release()
+            request_url = parser.fields.get('next')
+
+    async def delete(self, url):
+        """
+            Execute a DELETE HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :return: The response to the request
+            :rtype: dict
+        """
+        return await self.executor('delete', url=url)
+
+    async def post(self, url, body=None):
+        """
+            Execute a POST HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
+            :rtype: dict
+        """
+        return await self.executor('post', url=url, body=body)
+
+    async def patch(self, url, body=None):
+        """
+            Execute a PATCH HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
+            :rtype: dict
+        """
+        return await self.executor('patch', url=url, body=body)
+
+    async def put(self, url, body=None):
+        """
+            Execute a PUT HTTP request
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :return: The response to the request
+            :rtype: dict
+        """
+        return await self.executor('put', url=url, body=body)
+
+    async def write(self, method, url, body=None, key=None):
+        """
+            Execute a write request. When an outbox is configured and the API is unreachable, the write is stored in
+            the outbox to be sent later. Writes of a resource with stored writes are stored after them, to keep the
+            order.
+
+            :param method: Method to be used (post, put, patch, delete)
+            :type method: str
+            :param url: Url to send the request
+            :type url: str
+            :param body: Data to include in the request
+            :type body: dict
+            :param key: Url of the resource the write belongs to, such as a request or a sample. Writes of the same
+                resource are sent in order. Default is the url of the write.
+            :type key: str
+            :return: The response to the request, or None if the write is stored in the outbox
+            :rtype: dict
+        """
+        if self._outbox is None:
+            return await self.executor(method, url=url, body=body)
+        request_url = self._build_url(url)
+        key = self._build_url(key or url)
+        data = None if body is None else self._codec.dumps(body)
+        if await self._run_outbox(self._outbox.replay_due):
+            await self.replay_outbox()
+        if not await self._run_outbox(self._outbox.has_pending, key):
+            try:
+                return await self._execute(method, request_url, data)
+            except Exception as exc:
+                if not self._is_unreachable(exc):
+                    raise
+        await self._run_outbox(self._outbox.add, method, request_url, data, key)
+        return None
+
+    @staticmethod
+    async def _run_outbox(func, *args):
+        """
+            Call a method of the outbox in the default executor, so database access does not block the event loop
+
+            :param func: Outbox method
+            :type func: callable
+            :return: Result of the method
+            :rtype: object
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _replay_writes(self, writes):
+        """
+            Send stored writes of the same resource, one after the other, until the API is unreachable
+
+            :param writes: Stored (id, method, url, body) writes
+            :type writes: list
+            :return: Identifiers of the writes sent, failed and retried writes with the error, and whether the API is
+                unreachable
+            :rtype: tuple
+        """
+        sent, failed = [], []
+        for write_id, method, request_url, body in writes:
+            try:
+                await self._execute(method, request_url, body)
+            except Exception as exc:
+                write_failed, retried, unreachable = self._get_replay_error(write_id, exc)
+                failed.extend(write_failed)
+                if unreachable:
+                    return sent, failed, retried, True
+            else:
+                sent.append(write_id)
+        return sent, failed, [], False
+
+    async def replay_outbox(self):
+        """
+            Send the writes stored in the outbox, in batches. Writes of the same resource are sent in the order they
+            were stored, and writes of different resources are sent in parallel. It stops when the API is still
+            unreachable.
+
+            :return: Number of writes sent
+            :rtype: int
+        """
+        if self._outbox is None or not self._outbox.replay_lock.acquire(blocking=False):
+            return 0
+        try:
+            total = 0
+            while True:
+                groups = await self._run_outbox(self._outbox.get_batch)
+                if len(groups) == 0:
+                    return total
+                sent, failed, retried, unreachable = self._merge_replay(
+                    [task.result() async for task in aiter_bounded(self._replay_writes, groups, self._outbox.workers)])
+                await self._run_outbox(self._outbox.record_replay, sent, failed, retried)
+                total += len(sent)
+                if unreachable:
+                    return total
+        finally:
+            self._outbox.replay_lock.release()
@@ -71,8 +71,9 @@ class TeslaNotFoundException(TeslaException):
 # Exceptions used by LTI.
 class InternalException(TeslaException):
     """ Class raises when an unexpected error is found accessing the API """
-    def __init__(self, value):
+    def __init__(self, value, status_code=None):
         self.value = value
+        self.status_code = status_code
 
     def __str__(self):
         return repr(self.value)
@@ -108,3 +109,22 @@ class LockedResourceException(TeslaException):
 
     def __str__(self):
         return repr(self.value)
+
+
+class CircuitOpenException(TeslaException):
+    """ Class raises when a request is rejected because the circuit of its endpoint is open """
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
+
+
+class UploadException(TeslaException):
+    """ Class raises when some parts of a multipart upload fail. The upload can be resumed with the pending parts """
+    def __init__(self, value, upload=None):
+        self.value = value
+        self.upload = upload
+
+    def __str__(self):
+        return repr(self.value)
@@ -0,0 +1,237 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client streaming multipart encoder module """
+import asyncio
+import io
+import mmap
+import uuid
+
+_BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def get_source_length(source):
+    """
+        Get the number of bytes remaining in a file source
+
+        :param source: Data to upload
+        :type source: bytes | file | mmap.mmap | list | iterable
+        :return: Number of bytes, or None if it is not known in advance
+        :rtype: int
+    """
+    if isinstance(source, _BUFFER_TYPES):
+        return memoryview(source).nbytes
+    if isinstance(source, (list, tuple)):
+        lengths = [get_source_length(buffer) for buffer in source]
+        if None in lengths:
+            return None
+        return sum(lengths)
+    if hasattr(source, 'read') and not isinstance(source, io.TextIOBase):
+        try:
+            position = source.tell()
+            end = source.seek(0, io.SEEK_END)
+            source.seek(position)
+        except (AttributeError, OSError, ValueError):
+            return None
+        return end - position
+    return None
+
+
+def _to_bytes(chunk):
+    """
+        Encode text chunks as UTF-8
+
+        :param chunk: Chunk read from a source
+        :type chunk: bytes | str
+        :return: Chunk of data
+        :rtype: bytes
+    """
+    if isinstance(chunk, str):
+        return chunk.encode('utf-8')
+    return chunk
+
+
+def _iter_buffer(source, chunk_size):
+    """
+        Iterate over an in-memory buffer, slicing it without copies
+
+        :param source: Buffer to upload
+        :type source: bytes | bytearray | memoryview | mmap.mmap
+        :param chunk_size: Number of bytes in each slice
+        :type chunk_size: int
+        :return: Chunks of data
+        :rtype: generator
+    """
+    with memoryview(source) as view:
+        view = view.cast('B')
+        for pos in range(0, view.nbytes, chunk_size):
+            yield view[pos:pos + chunk_size]
+
+
+def _iter_file(source, chunk_size):
+    """
+        Iterate over the content of an open file
+
+        :param source: File to upload
+        :type source: file
+        :param chunk_size: Number of bytes read at once
+        :type chunk_size: int
+        :return: Chunks of data
+        :rtype: generator
+    """
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield _to_bytes(chunk)
+
+
+def iter_source(source, chunk_size):
+    """
+        Iterate over the content of a file source without loading it in memory. Buffers are sliced without copies.
+
+        :param source: Data to upload. Lists and tuples are sequences of sources sent one after the other.
+        :type source: bytes | file | mmap.mmap | list | iterable
+        :param chunk_size: Number of bytes read at once from files and buffers
+        :type chunk_size: int
+        :return: Chunks of data
+        :rtype: generator
+    """
+    if isinstance(source, _BUFFER_TYPES):
+        for chunk in _iter_buffer(source, chunk_size):
+            yield chunk
+    elif isinstance(source, (list, tuple)):
+        for buffer in source:
+            for chunk in iter_source(buffer, chunk_size):
+                yield chunk
+    elif hasattr(source, 'read'):
+        for chunk in _iter_file(source, chunk_size):
+            yield chunk
+    else:
+        for chunk in source:
+            yield _to_bytes(chunk)
+
+
+async def aiter_source(source, chunk_size):
+    """
+        Asynchronous version of iter_source. Files are read in the default executor, so the event loop is not
+        blocked by disk access.
+
+        :param source: Data to upload. Lists and tuples are sequences of sources sent one after the other.
+        :type source: bytes | file | mmap.mmap | list | iterable
+        :param chunk_size: Number of bytes read at once from files and buffers
+        :type chunk_size: int
+        :return: Chunks of data
+        :rtype: async_generator
+    """
+    if isinstance(source, (list, tuple)):
+        for buffer in source:
+            async for chunk in aiter_source(buffer, chunk_size):
+                yield chunk
+    elif hasattr(source, 'read') and not isinstance(source, _BUFFER_TYPES):
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await loop.run_in_executor(None, source.read, chunk_size)
+            if not chunk:
+                break
+            yield _to_bytes(chunk)
+    else:
+        for chunk in iter_source(source, chunk_size):
+            yield chunk
+
+
+class MultipartEncoder():
+    """
+        Streaming multipart/form-data encoder. Files can be given as bytes, open files, memory mapped files or
+        iterables of chunks, and are read while the request is sent. The total length is available in the len
+        attribute when all files have a known size, and is None otherwise, so the body is sent chunked.
+    """
+
+    def __init__(self, fields, files, chunk_size=65536, boundary=None):
+        """
+            Default constructor
+
+            :param fields: Form fields, sent before the files
+            :type fields: dict
+            :param files: Files to upload, by field name
+            :type files: dict
+            :param chunk_size: Number of bytes read at once from files and buffers
+            :type chunk_size: int
+            :param boundary: Boundary between parts. A random one is used if not provided.
+            :type boundary: str
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+
+        self._parts = []
+        for name, value in (fields or {}).items():
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            self._parts.append((self._get_header(name), value))
+        for name, source in (files or {}).items():
+            if isinstance(source, str):
+                source = source.encode('utf-8')
+            self._parts.append((self._get_header(name, name), source))
+        self._footer = '--{}--\r\n'.format(self.boundary).encode()
+
+        self.len = len(self._footer)
+        for header, source in self._parts:
+            length = get_source_length(source)
+            if length is None:
+                self.len = None
+                break
+            self.len += len(header) + length + 2
+
+    @property
+    def content_type(self):
+        """
+            Value of the Content-Type header of the request
+            :return: Content type with the boundary
+            :rtype: str
+        """
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def _get_header(self, name, filename=None):
+        """
+            Build the header of a part
+
+            :param name: Name of the form field
+            :type name: str
+            :param filename: Name of the file, for file parts
+            :type filename: str
+            :return: Encoded header, including the boundary
+            :rtype: bytes
+        """
+        header = '--{}\r\nContent-Disposition: form-data; name="{}"'.format(self.boundary, name)
+        if filename is not None:
+            header += '; filename="{}"\r\nContent-Type: application/octet-stream'.format(filename)
+        return (header + '\r\n\r\n').encode('utf-8')
+
+    def __iter__(self):
+        for header, source in self._parts:
+            yield header
+            for chunk in iter_source(source, self.chunk_size):
+                if len(chunk) > 0:
+                    yield chunk
+            yield b'\r\n'
+        yield self._footer
+
+    async def __aiter__(self):
+        for header, source in self._parts:
+            yield header
+            async for chunk in aiter_source(source, self.chunk_size):
+                if len(chunk) > 0:
+                    yield chunk
+            yield b'\r\n'
+        yield self._footer
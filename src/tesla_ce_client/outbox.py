@@ -0,0 +1,217 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client durable outbox module """
+import collections
+import sqlite3
+import threading
+import time
+
+
+class Outbox():
+    """
+        Durable local store of the writes that could not be sent because the API was unreachable. Writes are stored
+        in a SQLite database, with the body serialized by the connector codec, and replayed by the connector in the
+        order they were stored once the API is back. Writes rejected by the API during the replay, or answered with a
+        server error too many times, are kept apart as failed writes. The database can be shared by several processes.
+    """
+
+    def __init__(self, path, batch_size=100, workers=4, replay_interval=30, max_attempts=10):
+        """
+            Default constructor
+
+            :param path: Path of the SQLite database file
+            :type path: str
+            :param batch_size: Number of writes read at once from the database during the replay
+            :type batch_size: int
+            :param workers: Number of writes sent at the same time during the replay. Writes with the same key are
+                always sent one after the other.
+            :type workers: int
+            :param replay_interval: Minimum seconds between automatic replays, done before sending new writes
+            :type replay_interval: float
+            :param max_attempts: Number of server errors received replaying a write before it is failed, so it does
+                not block the writes of its resource. Connection errors are not counted.
+            :type max_attempts: int
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.workers = workers
+        self.replay_interval = replay_interval
+        self.max_attempts = max_attempts
+
+        # Only one replay is done at the same time
+        self.replay_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'method TEXT NOT NULL, url TEXT NOT NULL, key TEXT NOT NULL, body BLOB, '
+                         'created REAL NOT NULL, '
+                         'attempts INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, error TEXT)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS outbox_key ON outbox (key, failed)')
+        self._last_replay = None
+        self._stats = {
+            'stored': 0,
+            'replayed': 0,
+            'failed': 0,
+        }
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM outbox WHERE failed = 0').fetchone()[0]
+
+    def add(self, method, url, body=None, key=None):
+        """
+            Store a write
+
+            :param method: HTTP method of the write
+            :type method: str
+            :param url: Absolute url of the write
+            :type url: str
+            :param body: Serialized body of the write
+            :type body: bytes
+            :param key: Absolute url of the resource the write belongs to. Default is the url of the write.
+            :type key: str
+            :return: Identifier of the stored write
+            :rtype: int
+        """
+        with self._lock:
+            cursor = self._db.execute('INSERT INTO outbox (method, url, key, body, created) VALUES (?, ?, ?, ?, ?)',
+                                      (method, url, key or url, body, time.time()))
+            self._stats['stored'] += 1
+            return cursor.lastrowid
+
+    def has_pending(self, key):
+        """
+            Check if there are stored writes of a resource not sent yet, including the writes stored by other processes
+
+            :param key: Absolute url of the resource
+            :type key: str
+            :return: True if some writes of the resource are stored
+            :rtype: bool
+        """
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM outbox WHERE key = ? AND failed = 0 LIMIT 1',
+                                    (key, )).fetchone() is not None
+
+    def replay_due(self):
+        """
+            Check if an automatic replay must be done: there are stored writes, and the last replay was done more than
+            replay_interval seconds ago
+
+            :return: True if a replay must be done
+            :rtype: bool
+        """
+        if self._last_replay is not None and time.monotonic() - self._last_replay < self.replay_interval:
+            return False
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM outbox WHERE failed = 0 LIMIT 1').fetchone() is not None
+
+    def get_batch(self):
+        """
+            Get the oldest stored writes not sent yet, grouped by resource
+
+            :return: Lists of (id, method, url, body) writes of the same resource, in the order they were stored
+            :rtype: list
+        """
+        with self._lock:
+            self._last_replay = time.monotonic()
+            rows = self._db.execute('SELECT id, method, url, key, body FROM outbox WHERE failed = 0 ORDER BY id '
+                                    'LIMIT ?', (self.batch_size, )).fetchall()
+        groups = collections.OrderedDict()
+        for write_id, method, url, key, body in rows:
+            groups.setdefault(key, []).append((write_id, method, url, body))
+        return list(groups.values())
+
+    def record_replay(self, sent, failed, retried):
+        """
+            Record the result of the replay of a batch. Writes answered with a server error are kept to be sent again,
+            until they reach the maximum number of attempts.
+
+            :param sent: Identifiers of the writes sent
+            :type sent: list
+            :param failed: Identifiers of the writes rejected by the API, with the error
+            :type failed: list
+            :param retried: Identifiers of the writes answered with a server error, with the error
+            :type retried: list
+        """
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany('DELETE FROM outbox WHERE id = ?', [(write_id, ) for write_id in sent])
+                self._db.executemany('UPDATE outbox SET attempts = attempts + 1, failed = 1, error = ? WHERE id = ?',
+                                     [(str(error), write_id) for write_id, error in failed])
+                self._db.executemany('UPDATE outbox SET attempts = attempts + 1, error = ? WHERE id = ?',
+                                     [(str(error), write_id) for write_id, error in retried])
+                exhausted = self._db.execute('UPDATE outbox SET failed = 1 WHERE failed = 0 AND attempts >= ?',
+                                             (self.max_attempts, )).rowcount
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._stats['replayed'] += len(sent)
+            self._stats['failed'] += len(failed) + exhausted
+
+    def get_failed(self):
+        """
+            Get the writes rejected by the API during the replay
+
+            :return: List of failed writes, with their id, method, url, serialized body, attempts and error
+            :rtype: list
+        """
+        with self._lock:
+            rows = self._db.execute('SELECT id, method, url, body, attempts, error FROM outbox WHERE failed = 1 '
+                                    'ORDER BY id').fetchall()
+        return [{
+            'id': write_id,
+            'method': method,
+            'url': url,
+            'body': body,
+            'attempts': attempts,
+            'error': error,
+        } for write_id, method, url, body, attempts, error in rows]
+
+    def remove_failed(self, ids=None):
+        """
+            Remove failed writes
+
+            :param ids: Identifiers of the writes to remove. If not provided, all the failed writes are removed.
+            :type ids: list
+        """
+        with self._lock:
+            if ids is None:
+                self._db.execute('DELETE FROM outbox WHERE failed = 1')
+            else:
+                self._db.executemany('DELETE FROM outbox WHERE id = ? AND failed = 1',
+                                     [(write_id, ) for write_id in ids])
+
+    @property
+    def stats(self):
+        """
+            Outbox counters: stored writes, writes sent and rejected during the replay, and writes not sent yet
+
+            :return: Outbox counters
+            :rtype: dict
+        """
+        pending = len(self)
+        with self._lock:
+            return dict(self._stats, pending=pending)
+
+    def close(self):
+        """
+            Close the database
+        """
+        with self._lock:
+            self._db.close()
@@ -13,8 +13,12 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Activities cLient package """
-from .client import ProviderClient
+from .client import ProviderClient, AsyncProviderClient
+from .worker import VerificationWorker, ValidationWorker
 
 __all__ = [
     "ProviderClient",
+    "AsyncProviderClient",
+    "VerificationWorker",
+    "ValidationWorker",
 ]
@@ -13,9 +13,9 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE client module """
-from .enrolment import Enrolment
-from .verification import Verification
-from .notification import Notification
+from .enrolment import Enrolment, AsyncEnrolment
+from .verification import Verification, AsyncVerification
+from .notification import Notification, AsyncNotification
 
 
 class ProviderClient():
@@ -75,6 +75,15 @@ class ProviderClient():
             self._notification = Notification(self._connector)
         return self._notification
 
+    def get_provider_id(self):
+        """
+            Get the provider ID of current credentials
+
+            :return: Provider ID, or None if provided credentials are not for a Provider
+            :rtype: int
+        """
+        return self._connector.get_provider_id()
+
     def get(self, provider_id=None):
         """
             Get a VLE
@@ -85,5 +94,45 @@ class ProviderClient():
             :rtype: dict
         """
         if provider_id is None:
-            provider_id = self._connector.get_provider_id()
+            provider_id = self.get_provider_id()
         return self._connector.get('/api/v2/provider/{}/'.format(provider_id))
+
+
+class AsyncProviderClient(ProviderClient):
+    """
+        Provider asynchronous client class. Methods not redefined here are inherited from the synchronous client and
+        return the awaitables provided by the AsyncConnector.
+    """
+
+    @property
+    def enrolment(self):
+        """
+            Access to the Provider enrolment related methods
+            :return: Enrolment controller object
+            :rtype: AsyncEnrolment
+        """
+        if self._enrolment is None:
+            self._enrolment = AsyncEnrolment(self._connector)
+        return self._enrolment
+
+    @property
+    def verification(self):
+        """
+            Access to the Provider verification related methods
+            :return: Verification controller object
+            :rtype: AsyncVerification
+        """
+        if self._verification is None:
+            self._verification = AsyncVerification(self._connector)
+        return self._verification
+
+    @property
+    def notification(self):
+        """
+            Access to the Provider notification related methods
+            :return: Notification controller object
+            :rtype: AsyncNotification
+        """
+        if self._notification is None:
+            self._notification = AsyncNotification(self._connector)
+        return self._notification
@@ -13,11 +13,20 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE Enrolment Client module """
-import io
-import simplejson
-import requests
+import asyncio
 from enum import Enum
+import requests
 from tesla_ce_client import exception
+from tesla_ce_client.concurrency import iter_bounded, aiter_bounded
+from tesla_ce_client.upload import MultipartUpload, AsyncMultipartUpload
+from .lock import ModelLock, AsyncModelLock
+from .serializer import get_model_serializer
+from .submitter import ValidationSubmitter, AsyncValidationSubmitter
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
 
 
 class SampleValidationStatus(Enum):
@@ -67,6 +76,27 @@ class Enrolment:
             if 'Model is locked' in exc.value:
                 raise exception.LockedResourceException("Model is locked")
 
+    def model_lock(self, provider_id, learner_id, task_id, timeout=300, renew_interval=None):
+        """
+            Get a context manager holding the lock of the learner model. While the model is locked by other tasks,
+            it waits with exponential backoff up to the timeout. The lock is always released on exit, and the seconds
+            waited to acquire it are available in its wait_time attribute.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param task_id: Task UUID value. It will allow to update the model.
+            :type task_id: str
+            :param timeout: Maximum seconds to wait for the lock
+            :type timeout: float
+            :param renew_interval: Seconds between lock renewals while it is held. Disabled if not provided.
+            :type renew_interval: float
+            :return: Model lock, with the locked model in its model attribute
+            :rtype: ModelLock
+        """
+        return ModelLock(self, provider_id, learner_id, task_id, timeout=timeout, renew_interval=renew_interval)
+
     def get_model(self, provider_id, learner_id):
         """
             Get learner model for a provider.
@@ -91,12 +121,12 @@ class Enrolment:
             :param task_id: Task UUID value. It will allow to update the model.
             :type task_id: str
         """
-        self._connector.post('/api/v2/provider/{}/enrolment/{}/unlock/'.format(provider_id, str(learner_id)),
-                             body={
-                                 'token': task_id
-                             })
+        return self._connector.post('/api/v2/provider/{}/enrolment/{}/unlock/'.format(provider_id, str(learner_id)),
+                                    body={
+                                        'token': task_id
+                                    })
 
-    def save_model(self, provider_id, learner_id, task_id, model):
+    def save_model(self, provider_id, learner_id, task_id, model, data=None, serializer=None, workers=4):
         """
             Get learner model for a provider ready to be modified.
 
@@ -106,33 +136,107 @@ class Enrolment:
             :type learner_id: str
             :param task_id: Task UUID value. It will allow to update the model.
             :type task_id: str
+            :param model: Learner model
+            :type model: dict
+            :param data: Serialized model to upload instead of model['model'], as bytes, an open file, a memory mapped
+                file or an iterable of chunks, which is sent chunked while it is produced. The iterdumps
+                method of the connector codec streams the serialization of large models.
+            :type data: bytes | file | mmap.mmap | iterable
+            :param serializer: Serializer of model['model'], or its name (json, msgpack, numpy). Default is json.
+            :type serializer: JsonModelSerializer | str
+            :param workers: Number of parts uploaded in parallel, when the storage provides a multipart upload. If it
+                fails, the UploadException raised contains the upload, which can be given as data to resume it.
+            :type workers: int
             :return: Learner model
             :rtype: dict
         """
+        if isinstance(data, AsyncMultipartUpload):
+            raise exception.TeslaConfigException('Asynchronous uploads require the asynchronous client')
         try:
             # Upload the new model to storage
-            if not self._connector._verify_ssl:
-                resp = requests.post(model['model_upload_url']['url'], data=model['model_upload_url']['fields'],
-                                     files={'file': io.StringIO(simplejson.dumps(model['model']))}, verify=False)
+            data = self._get_model_data(model, data, serializer)
+            if isinstance(data, MultipartUpload):
+                data.upload(self._connector)
+            elif 'multipart' in model['model_upload_url']:
+                MultipartUpload(model['model_upload_url']['multipart'], data, workers).upload(self._connector)
             else:
-                resp = requests.post(model['model_upload_url']['url'], data=model['model_upload_url']['fields'],
-                                     files={'file': io.StringIO(simplejson.dumps(model['model']))})
-
-            # Check given response
-            self._connector._check_response_status(resp.status_code, resp.content)
+                self._connector.upload(model['model_upload_url']['url'], fields=model['model_upload_url']['fields'],
+                                       files={'file': data})
 
             return self._connector.put('/api/v2/provider/{}/enrolment/{}/'.format(provider_id, str(learner_id)),
-                                        body={
-                                            'learner_id': str(learner_id),
-                                            'task_id': task_id,
-                                            'percentage': model['percentage'],
-                                            'can_analyse': model['can_analyse'],
-                                            'used_samples': model['used_samples']
-                                        })
+                                       body={
+                                           'learner_id': str(learner_id),
+                                           'task_id': task_id,
+                                           'percentage': model['percentage'],
+                                           'can_analyse': model['can_analyse'],
+                                           'used_samples': model['used_samples']
+                                       })
         except exception.BadRequestException as exc:
             if 'Model is locked' in exc.value:
                 raise exception.LockedResourceException("Model is locked")
 
+    def _get_model_data(self, model, data=None, serializer=None):
+        """
+            Get the data to upload when saving a model
+
+            :param model: Learner model
+            :type model: dict
+            :param data: Serialized model provided by the caller
+            :type data: bytes | file | mmap.mmap | iterable
+            :param serializer: Serializer of the model, or its name
+            :type serializer: JsonModelSerializer | str
+            :return: Data to upload
+            :rtype: bytes | file | mmap.mmap | list | iterable
+        """
+        if data is not None:
+            return data
+        return get_model_serializer(serializer, self._connector.codec).dumps(model['model'])
+
+    def load_model(self, model, serializer=None):
+        """
+            Get the content of a learner model obtained with get_model or get_model_lock. Stored models referenced by
+            their download url are downloaded and deserialized. If the connector has a files cache, models already
+            downloaded are only revalidated.
+
+            :param model: Learner model
+            :type model: dict
+            :param serializer: Serializer of the model, or its name (json, msgpack, numpy). Default is json.
+            :type serializer: JsonModelSerializer | str
+            :return: Content of the model
+            :rtype: object
+        """
+        data = model.get('model')
+        if self._is_file_url(data):
+            data = self._connector.download(data)
+        return self._load_model_data(data, serializer)
+
+    @staticmethod
+    def _is_file_url(data):
+        """
+            Check if the content of a model or sample is the url of the stored file
+
+            :param data: Model content
+            :type data: object
+            :return: True if the model must be downloaded
+            :rtype: bool
+        """
+        return isinstance(data, str) and data.startswith(('http://', 'https://'))
+
+    def _load_model_data(self, data, serializer=None):
+        """
+            Deserialize the content of a model. Content already decoded with the API response is returned as is.
+
+            :param data: Model content
+            :type data: object
+            :param serializer: Serializer of the model, or its name
+            :type serializer: JsonModelSerializer | str
+            :return: Content of the model
+            :rtype: object
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return get_model_serializer(serializer, self._connector.codec).loads(data)
+        return data
+
     def get_sample(self, provider_id, learner_id, sample_id):
         """
             Get enrolment sample
@@ -150,6 +254,22 @@ class Enrolment:
                                                                                         str(learner_id),
                                                                                         sample_id))
 
+    def load_sample(self, sample):
+        """
+            Get the content of an enrolment sample obtained with get_sample or get_model_samples. Stored samples
+            referenced by their download url are downloaded and decoded. Samples do not change, so if the connector has
+            a files cache, samples already downloaded are not requested again.
+
+            :param sample: Enrolment sample
+            :type sample: dict
+            :return: Content of the sample
+            :rtype: dict
+        """
+        data = sample.get('data')
+        if self._is_file_url(data):
+            return self._connector.codec.loads(self._connector.download(data, immutable=True))
+        return data
+
     def get_sample_validation(self, provider_id, learner_id, sample_id, validation_id):
         """
             Get validation result for an enrolment sample
@@ -170,7 +290,8 @@ class Enrolment:
 
     def set_sample_validation(self, provider_id, learner_id, sample_id, validation_id, result):
         """
-            Store validation result for an enrolment sample
+            Store validation result for an enrolment sample. If the API is unreachable and the connector has
+            an outbox, the write is stored to be sent later.
 
             :param provider_id: Provider ID
             :type provider_id: int
@@ -183,8 +304,9 @@ class Enrolment:
             :param result: Validation result
             :type result: dict
         """
-        return self._connector.put('/api/v2/provider/{}/enrolment/{}/sample/{}/validation/{}/'.format(
-            provider_id, str(learner_id), sample_id, validation_id), body=result)
+        sample_url = '/api/v2/provider/{}/enrolment/{}/sample/{}/'.format(provider_id, str(learner_id), sample_id)
+        return self._connector.write('put', '{}validation/{}/'.format(sample_url, validation_id), body=result,
+                                     key=sample_url)
 
     def get_sample_validation_list(self, provider_id, learner_id, sample_id):
         """
@@ -230,9 +352,81 @@ class Enrolment:
         return self._connector.get('/api/v2/provider/{}/enrolment/{}/available_samples/'.format(
             provider_id, str(learner_id)))
 
+    def _get_samples_url(self, provider_id, learner_id, used=False):
+        """
+            Get the url of the list of available or used samples
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param used: Whether to get the list of samples used in current model
+            :type used: bool
+            :return: Url of the list
+            :rtype: str
+        """
+        return '/api/v2/provider/{}/enrolment/{}/{}/'.format(provider_id, str(learner_id),
+                                                             'used_samples' if used else 'available_samples')
+
+    def fetch_sample(self, provider_id, learner_id, sample_id, validations=True, load=False):
+        """
+            Get an enrolment sample with its validations and content
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param sample_id: Sample id
+            :type sample_id: int
+            :param validations: Whether to include the validations of the sample
+            :type validations: bool
+            :param load: Whether to include the content of the sample
+            :type load: bool
+            :return: Enrolment sample
+            :rtype: dict
+        """
+        # Copy the sample, as cached responses are shared
+        sample = dict(self.get_sample(provider_id, learner_id, sample_id))
+        if validations:
+            sample['validations'] = self.get_sample_validation_list(provider_id, learner_id, sample_id)
+        if load:
+            sample['content'] = self.load_sample(sample)
+        return sample
+
+    def iter_samples(self, provider_id, learner_id, used=False, workers=8, validations=True, load=False,
+                     ordered=False):
+        """
+            Iterate over the enrolment samples of a learner, fetching each sample and its validations concurrently.
+            Samples are yielded as soon as they are ready, and new samples are only fetched when yielded ones are
+            consumed, so at most a fixed number of samples are kept in memory.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param used: Whether to iterate over the samples used in current model instead of the available ones
+            :type used: bool
+            :param workers: Maximum number of samples fetched at the same time
+            :type workers: int
+            :param validations: Whether to include the validations of each sample, in its validations field
+            :type validations: bool
+            :param load: Whether to include the content of each sample, in its content field
+            :type load: bool
+            :param ordered: Whether samples are yielded in the order of the list
+            :type ordered: bool
+            :return: Enrolment samples
+            :rtype: generator
+        """
+        for future in iter_bounded(
+                lambda item: self.fetch_sample(provider_id, learner_id, item['id'], validations, load),
+                self._connector.iter_results(self._get_samples_url(provider_id, learner_id, used)),
+                workers, ordered):
+            yield future.result()
+
     def set_sample_validation_status(self, provider_id, learner_id, sample_id, validation_id, status):
         """
-            Change sample validation status
+            Change sample validation status. If the API is unreachable and the connector has an outbox, the write
+            is stored to be sent later, after the stored writes of the sample.
 
             :param provider_id: Provider ID
             :type provider_id: int
@@ -248,8 +442,89 @@ class Enrolment:
 
             :return:
         """
-        return self._connector.post('/api/v2/provider/{}/enrolment/{}/sample/{}/validation/{}/status/'.format(
-            provider_id, str(learner_id), sample_id, validation_id), body={"status": status.value})
+        sample_url = '/api/v2/provider/{}/enrolment/{}/sample/{}/'.format(provider_id, str(learner_id), sample_id)
+        return self._connector.write('post', '{}validation/{}/status/'.format(sample_url, validation_id),
+                                     body={"status": status.value}, key=sample_url)
+
+    def _store_sample_validation(self, provider_id, validation):
+        """
+            Store the result and then the status of a sample validation. API and connection errors are recorded in
+            the outcome.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param validation: Validation as a (learner_id, sample_id, validation_id, result, status) tuple
+            :type validation: tuple
+            :return: Outcome of the validation
+            :rtype: dict
+        """
+        learner_id, sample_id, validation_id, result, status = validation
+        outcome = self._get_validation_outcome(validation)
+        try:
+            outcome['result'] = self.set_sample_validation(provider_id, learner_id, sample_id, validation_id, result)
+            if status is not None:
+                outcome['status'] = self.set_sample_validation_status(provider_id, learner_id, sample_id,
+                                                                      validation_id, status)
+        except (exception.TeslaException, requests.RequestException) as exc:
+            outcome['error'] = exc
+        return outcome
+
+    @staticmethod
+    def _get_validation_outcome(validation):
+        """
+            Get an empty outcome for a sample validation
+
+            :param validation: Validation as a (learner_id, sample_id, validation_id, result, status) tuple
+            :type validation: tuple
+            :return: Outcome of the validation
+            :rtype: dict
+        """
+        return {
+            'learner_id': validation[0],
+            'sample_id': validation[1],
+            'validation_id': validation[2],
+            'result': None,
+            'status': None,
+            'error': None,
+        }
+
+    def set_sample_validations(self, provider_id, validations, workers=8):
+        """
+            Store the results of many sample validations concurrently. For each validation, the result is stored before
+            changing its status, and the status is not changed if storing the result fails. Errors do not stop the
+            other validations and are reported in the outcomes.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param validations: Validations to store, as (learner_id, sample_id, validation_id, result, status) tuples.
+                If status is None, only the result is stored.
+            :type validations: iterable
+            :param workers: Maximum number of validations stored at the same time
+            :type workers: int
+            :return: Outcome of each validation, in the same order, with the identifiers of the validation, the
+                responses to the result and status requests and the error raised, if any
+            :rtype: list
+        """
+        return [future.result() for future in iter_bounded(
+            lambda validation: self._store_sample_validation(provider_id, validation), validations, workers)]
+
+    def submitter(self, workers=4, max_queue=1000, coalesce_window=None):
+        """
+            Get a write-behind submitter, which sends sample validation results and status changes from background
+            threads. Writes of the same validation are sent in the order they are submitted. Close it to send pending
+            writes.
+
+            :param workers: Number of writes sent at the same time
+            :type workers: int
+            :param max_queue: Maximum number of queued writes. When it is reached, submissions wait for free space.
+            :type max_queue: int
+            :param coalesce_window: Seconds status changes are held, so a later status change of the same validation
+                replaces them. Terminal status are never replaced. Disabled if not provided.
+            :type coalesce_window: float
+            :return: Submitter
+            :rtype: ValidationSubmitter
+        """
+        return ValidationSubmitter(self, workers=workers, max_queue=max_queue, coalesce_window=coalesce_window)
 
     def set_sample_status(self, provider_id, learner_id, sample_id, status):
         """
@@ -273,3 +548,256 @@ class Enrolment:
         return self._connector.post('/api/v2/provider/{}/enrolment/{}/sample/{}/status/'.format(
             provider_id, learner_id, sample_id), body={"status": status.value})
             '''
+
+
+class AsyncEnrolment(Enrolment):
+    """
+        Enrolment asynchronous client class. Methods not redefined here are inherited from the synchronous client and
+        return the awaitables provided by the AsyncConnector.
+    """
+
+    async def get_model_lock(self, provider_id, learner_id, task_id):
+        """
+            Get learner model for a provider ready to be modified.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param task_id: Task UUID value. It will allow to update the model.
+            :type task_id: str
+            :return: Learner model
+            :rtype: dict
+        """
+        try:
+            return await self._connector.post('/api/v2/provider/{}/enrolment/'.format(provider_id),
+                                              body={
+                                                  'learner_id': str(learner_id),
+                                                  'task_id': task_id
+                                              })
+        except exception.BadRequestException as exc:
+            if 'Model is locked' in exc.value:
+                raise exception.LockedResourceException("Model is locked")
+
+    def model_lock(self, provider_id, learner_id, task_id, timeout=300, renew_interval=None):
+        """
+            Get a context manager holding the lock of the learner model. While the model is locked by other tasks,
+            it waits with exponential backoff up to the timeout. The lock is always released on exit, and the seconds
+            waited to acquire it are available in its wait_time attribute.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param task_id: Task UUID value. It will allow to update the model.
+            :type task_id: str
+            :param timeout: Maximum seconds to wait for the lock
+            :type timeout: float
+            :param renew_interval: Seconds between lock renewals while it is held. Disabled if not provided.
+            :type renew_interval: float
+            :return: Model lock, with the locked model in its model attribute
+            :rtype: AsyncModelLock
+        """
+        return AsyncModelLock(self, provider_id, learner_id, task_id, timeout=timeout, renew_interval=renew_interval)
+
+    async def save_model(self, provider_id, learner_id, task_id, model, data=None, serializer=None, workers=4):
+        """
+            Get learner model for a provider ready to be modified.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param task_id: Task UUID value. It will allow to update the model.
+            :type task_id: str
+            :param model: Learner model
+            :type model: dict
+            :param data: Serialized model to upload instead of model['model'], as bytes, an open file, a memory mapped
+                file or an iterable of chunks, which is sent chunked while it is produced. The iterdumps
+                method of the connector codec streams the serialization of large models.
+            :type data: bytes | file | mmap.mmap | iterable
+            :param serializer: Serializer of model['model'], or its name (json, msgpack, numpy). Default is json.
+            :type serializer: JsonModelSerializer | str
+            :param workers: Number of parts uploaded in parallel, when the storage provides a multipart upload. If it
+                fails, the UploadException raised contains the upload, which can be given as data to resume it.
+            :type workers: int
+            :return: Learner model
+            :rtype: dict
+        """
+        if isinstance(data, MultipartUpload) and not isinstance(data, AsyncMultipartUpload):
+            raise exception.TeslaConfigException('Synchronous uploads require the synchronous client')
+        try:
+            # Upload the new model to storage
+            data = self._get_model_data(model, data, serializer)
+            if isinstance(data, MultipartUpload):
+                await data.upload(self._connector)
+            elif 'multipart' in model['model_upload_url']:
+                await AsyncMultipartUpload(model['model_upload_url']['multipart'], data,
+                                           workers).upload(self._connector)
+            else:
+                await self._connector.upload(model['model_upload_url']['url'],
+                                             fields=model['model_upload_url']['fields'], files={'file': data})
+
+            return await self._connector.put('/api/v2/provider/{}/enrolment/{}/'.format(provider_id,
+                                                                                        str(learner_id)),
+                                             body={
+                                                 'learner_id': str(learner_id),
+                                                 'task_id': task_id,
+                                                 'percentage': model['percentage'],
+                                                 'can_analyse': model['can_analyse'],
+                                                 'used_samples': model['used_samples']
+                                             })
+        except exception.BadRequestException as exc:
+            if 'Model is locked' in exc.value:
+                raise exception.LockedResourceException("Model is locked")
+
+    async def load_model(self, model, serializer=None):
+        """
+            Get the content of a learner model obtained with get_model or get_model_lock. Stored models referenced by
+            their download url are downloaded and deserialized. If the connector has a files cache, models already
+            downloaded are only revalidated.
+
+            :param model: Learner model
+            :type model: dict
+            :param serializer: Serializer of the model, or its name (json, msgpack, numpy). Default is json.
+            :type serializer: JsonModelSerializer | str
+            :return: Content of the model
+            :rtype: object
+        """
+        data = model.get('model')
+        if self._is_file_url(data):
+            data = await self._connector.download(data)
+        return self._load_model_data(data, serializer)
+
+    async def load_sample(self, sample):
+        """
+            Get the content of an enrolment sample obtained with get_sample or get_model_samples. Stored samples
+            referenced by their download url are downloaded and decoded. Samples do not change, so if the connector has
+            a files cache, samples already downloaded are not requested again.
+
+            :param sample: Enrolment sample
+            :type sample: dict
+            :return: Content of the sample
+            :rtype: dict
+        """
+        data = sample.get('data')
+        if self._is_file_url(data):
+            return self._connector.codec.loads(await self._connector.download(data, immutable=True))
+        return data
+
+    async def fetch_sample(self, provider_id, learner_id, sample_id, validations=True, load=False):
+        """
+            Get an enrolment sample with its validations and content
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param sample_id: Sample id
+            :type sample_id: int
+            :param validations: Whether to include the validations of the sample
+            :type validations: bool
+            :param load: Whether to include the content of the sample
+            :type load: bool
+            :return: Enrolment sample
+            :rtype: dict
+        """
+        # Copy the sample, as cached responses are shared
+        sample = dict(await self.get_sample(provider_id, learner_id, sample_id))
+        if validations:
+            sample['validations'] = await self.get_sample_validation_list(provider_id, learner_id, sample_id)
+        if load:
+            sample['content'] = await self.load_sample(sample)
+        return sample
+
+    async def iter_samples(self, provider_id, learner_id, used=False, workers=8, validations=True, load=False,
+                           ordered=False):
+        """
+            Iterate over the enrolment samples of a learner, fetching each sample and its validations concurrently.
+            Samples are yielded as soon as they are ready, and new samples are only fetched when yielded ones are
+            consumed, so at most a fixed number of samples are kept in memory.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param used: Whether to iterate over the samples used in current model instead of the available ones
+            :type used: bool
+            :param workers: Maximum number of samples fetched at the same time
+            :type workers: int
+            :param validations: Whether to include the validations of each sample, in its validations field
+            :type validations: bool
+            :param load: Whether to include the content of each sample, in its content field
+            :type load: bool
+            :param ordered: Whether samples are yielded in the order of the list
+            :type ordered: bool
+            :return: Enrolment samples
+            :rtype: async_generator
+        """
+        items = self._connector.iter_results(self._get_samples_url(provider_id, learner_id, used))
+        async for task in aiter_bounded(
+                lambda item: self.fetch_sample(provider_id, learner_id, item['id'], validations, load),
+                items, workers, ordered):
+            yield task.result()
+
+    async def _store_sample_validation(self, provider_id, validation):
+        """
+            Store the result and then the status of a sample validation. API and connection errors are recorded in
+            the outcome.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param validation: Validation as a (learner_id, sample_id, validation_id, result, status) tuple
+            :type validation: tuple
+            :return: Outcome of the validation
+            :rtype: dict
+        """
+        learner_id, sample_id, validation_id, result, status = validation
+        outcome = self._get_validation_outcome(validation)
+        try:
+            outcome['result'] = await self.set_sample_validation(provider_id, learner_id, sample_id, validation_id,
+                                                                 result)
+            if status is not None:
+                outcome['status'] = await self.set_sample_validation_status(provider_id, learner_id, sample_id,
+                                                                            validation_id, status)
+        except (exception.TeslaException, aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            outcome['error'] = exc
+        return outcome
+
+    async def set_sample_validations(self, provider_id, validations, workers=8):
+        """
+            Store the results of many sample validations concurrently. For each validation, the result is stored before
+            changing its status, and the status is not changed if storing the result fails. Errors do not stop the
+            other validations and are reported in the outcomes.
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param validations: Validations to store, as (learner_id, sample_id, validation_id, result, status) tuples.
+                If status is None, only the result is stored.
+            :type validations: iterable
+            :param workers: Maximum number of validations stored at the same time
+            :type workers: int
+            :return: Outcome of each validation, in the same order, with the identifiers of the validation, the
+                responses to the result and status requests and the error raised, if any
+            :rtype: list
+        """
+        return [task.result() async for task in aiter_bounded(
+            lambda validation: self._store_sample_validation(provider_id, validation), validations, workers)]
+
+    def submitter(self, workers=4, max_queue=1000, coalesce_window=None):
+        """
+            Get a write-behind submitter, which sends sample validation results and status changes from background
+            tasks. Writes of the same validation are sent in the order they are submitted. Close it to send pending
+            writes.
+
+            :param workers: Number of writes sent at the same time
+            :type workers: int
+            :param max_queue: Maximum number of queued writes. When it is reached, submissions wait for free space.
+            :type max_queue: int
+            :param coalesce_window: Seconds status changes are held, so a later status change of the same validation
+                replaces them. Terminal status are never replaced. Disabled if not provided.
+            :type coalesce_window: float
+            :return: Submitter
+            :rtype: AsyncValidationSubmitter
+        """
+        return AsyncValidationSubmitter(self, workers=workers, max_queue=max_queue, coalesce_window=coalesce_window)
@@ -0,0 +1,227 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE learner model lock module """
+import asyncio
+import threading
+import time
+from tesla_ce_client import exception
+from tesla_ce_client.retry import RetryPolicy
+
+
+class ModelLock():
+    """
+        Context manager holding the lock of a learner model. The lock is acquired waiting with backoff while the
+        model is locked by other tasks, optionally renewed while it is held, and always released on exit.
+    """
+
+    def __init__(self, enrolment, provider_id, learner_id, task_id, timeout=300, backoff_factor=0.5, max_backoff=30,
+                 renew_interval=None):
+        """
+            Default constructor
+
+            :param enrolment: Enrolment client
+            :type enrolment: Enrolment
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param task_id: Task UUID value. It will allow to update the model.
+            :type task_id: str
+            :param timeout: Maximum seconds to wait for the lock
+            :type timeout: float
+            :param backoff_factor: Base delay in seconds between attempts, doubled after each attempt
+            :type backoff_factor: float
+            :param max_backoff: Maximum delay in seconds between attempts
+            :type max_backoff: float
+            :param renew_interval: Seconds between lock renewals while it is held. Disabled if not provided.
+            :type renew_interval: float
+        """
+        self.enrolment = enrolment
+        self.provider_id = provider_id
+        self.learner_id = learner_id
+        self.task_id = task_id
+        self.timeout = timeout
+        self.renew_interval = renew_interval
+        self.retry_policy = RetryPolicy(backoff_factor=backoff_factor, max_backoff=max_backoff)
+
+        # Locked model, as returned by get_model_lock
+        self.model = None
+        # Seconds waited to acquire the lock and number of attempts
+        self.wait_time = None
+        self.attempts = 0
+        # Last error renewing the lock
+        self.renewal_error = None
+
+        self._renewal = None
+        self._renewal_stop = None
+
+    def _get_delay(self, start):
+        """
+            Get the delay before the next attempt to acquire the lock
+
+            :param start: Monotonic time of the first attempt
+            :type start: float
+            :return: Seconds to wait, or None if the timeout is exhausted
+            :rtype: float
+        """
+        delay = self.retry_policy.get_backoff(self.attempts)
+        remaining = self.timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            return None
+        return min(delay, remaining)
+
+    def _lock(self):
+        return self.enrolment.get_model_lock(self.provider_id, self.learner_id, self.task_id)
+
+    @staticmethod
+    def _check_model(model):
+        """
+            Check that the lock returned the model. Bad requests other than a locked model return no model.
+
+            :param model: Model returned by get_model_lock
+            :type model: dict
+            :return: Locked model
+            :rtype: dict
+        """
+        if model is None:
+            raise exception.BadRequestException('Model lock rejected', status_code=400)
+        return model
+
+    def _unlock(self):
+        return self.enrolment.unlock_model(self.provider_id, self.learner_id, self.task_id)
+
+    def acquire(self):
+        """
+            Acquire the lock, waiting while the model is locked by other tasks
+
+            :return: Locked model
+            :rtype: dict
+        """
+        start = time.monotonic()
+        while True:
+            self.attempts += 1
+            try:
+                self.model = self._check_model(self._lock())
+                break
+            except exception.LockedResourceException:
+                delay = self._get_delay(start)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+        self.wait_time = time.monotonic() - start
+
+        if self.renew_interval is not None:
+            self._renewal_stop = threading.Event()
+            self._renewal = threading.Thread(target=self._renewal_loop, daemon=True)
+            self._renewal.start()
+        return self.model
+
+    def _renewal_loop(self):
+        """
+            Renew the lock periodically until it is released
+        """
+        while not self._renewal_stop.wait(self.renew_interval):
+            try:
+                self._check_model(self._lock())
+            except Exception as exc:
+                self.renewal_error = exc
+
+    def release(self):
+        """
+            Stop renewing the lock and unlock the model
+        """
+        if self._renewal is not None:
+            self._renewal_stop.set()
+            self._renewal.join()
+            self._renewal = None
+        self._unlock()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.release()
+        except exception.TeslaException:
+            # Do not hide the error raised while the lock was held
+            if exc_type is None:
+                raise
+
+
+class AsyncModelLock(ModelLock):
+    """
+        Asynchronous context manager holding the lock of a learner model, for the asynchronous Enrolment client
+    """
+
+    async def acquire(self):
+        """
+            Acquire the lock, waiting while the model is locked by other tasks
+
+            :return: Locked model
+            :rtype: dict
+        """
+        start = time.monotonic()
+        while True:
+            self.attempts += 1
+            try:
+                self.model = self._check_model(await self._lock())
+                break
+            except exception.LockedResourceException:
+                delay = self._get_delay(start)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+        self.wait_time = time.monotonic() - start
+
+        if self.renew_interval is not None:
+            self._renewal = asyncio.ensure_future(self._renewal_loop())
+        return self.model
+
+    async def _renewal_loop(self):
+        """
+            Renew the lock periodically until it is released
+        """
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                self._check_model(await self._lock())
+            except Exception as exc:
+                self.renewal_error = exc
+
+    async def release(self):
+        """
+            Stop renewing the lock and unlock the model
+        """
+        if self._renewal is not None:
+            self._renewal.cancel()
+            try:
+                await self._renewal
+            except asyncio.CancelledError:
+                pass
+            self._renewal = None
+        await self._unlock()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self.release()
+        except exception.TeslaException:
+            # Do not hide the error raised while the lock was held
+            if exc_type is None:
+                raise
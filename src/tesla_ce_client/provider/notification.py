@@ -43,7 +43,8 @@ class Notification():
 
     def update_or_create(self, provider_id, key, when, info=None):
         """
-            Updates or create a notification for a given provider
+            Updates or create a notification for a given provider. If the API is unreachable and the
+            connector has an outbox, the write is stored to be sent later.
 
             :param provider_id: Identifier of the provider
             :type provider_id: int
@@ -52,12 +53,12 @@ class Notification():
             :return: Created or updated Notification
             :rtype: Notification
         """
-        return self._connector.post('/api/v2/provider/{}/notification/'.format(provider_id),
-                                    body={
-                                        'key': key,
-                                        'when': when.isoformat(),
-                                        'info': info
-                                    })
+        return self._connector.write('post', '/api/v2/provider/{}/notification/'.format(provider_id),
+                                     body={
+                                         'key': key,
+                                         'when': when.isoformat(),
+                                         'info': info
+                                     })
 
     def delete(self, provider_id, notification_id):
         """
@@ -68,4 +69,11 @@ class Notification():
             :param notification_id: Id of the notification
             :type notification_id: int
         """
-        self._connector.delete('/api/v2/provider/{}/notification/{}/'.format(provider_id, notification_id))
+        return self._connector.delete('/api/v2/provider/{}/notification/{}/'.format(provider_id, notification_id))
+
+
+class AsyncNotification(Notification):
+    """
+        Notifications asynchronous client class. Methods are inherited from the synchronous client and return the
+        awaitables provided by the AsyncConnector.
+    """
@@ -0,0 +1,160 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE learner model serializers module """
+import io
+from tesla_ce_client.codec import get_codec
+from tesla_ce_client.exception import TeslaConfigException
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class JsonModelSerializer():
+    """
+        Serialization of learner models as JSON documents. This is the format expected by default. Models with NaN or
+        infinite values are rejected with every codec.
+    """
+    name = 'json'
+
+    def __init__(self, codec=None):
+        """
+            Default constructor
+
+            :param codec: JSON codec, or its name. If not provided, the fastest installed one is used.
+            :type codec: JsonCodec | str
+        """
+        self._codec = get_codec(codec)
+
+    def dumps(self, model):
+        """
+            Serialize a model
+
+            :param model: Learner model
+            :type model: object
+            :return: Data to upload, as bytes or a list of buffers sent one after the other
+            :rtype: bytes | list
+        """
+        return self._codec.dumps(model, strict=True)
+
+    def loads(self, data):
+        """
+            Deserialize a model
+
+            :param data: Serialized model
+            :type data: bytes
+            :return: Learner model
+            :rtype: object
+        """
+        return self._codec.loads(data)
+
+
+class MsgpackModelSerializer(JsonModelSerializer):
+    """
+        Serialization of learner models with MessagePack. NumPy arrays are stored as lists.
+    """
+    name = 'msgpack'
+
+    def __init__(self, codec=None):
+        """
+            Default constructor
+
+            :param codec: Not used
+            :type codec: JsonCodec | str
+        """
+        if msgpack is None:
+            raise TeslaConfigException('msgpack serializer requires the msgpack package')
+
+    @staticmethod
+    def _default(obj):
+        if numpy is not None and isinstance(obj, (numpy.ndarray, numpy.generic)):
+            return obj.tolist()
+        raise TypeError('Object of type {} is not serializable'.format(type(obj).__name__))
+
+    def dumps(self, model):
+        return msgpack.packb(model, use_bin_type=True, default=self._default)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+class NumpyModelSerializer(JsonModelSerializer):
+    """
+        Serialization of learner models as NumPy arrays. A single array is stored in .npy format, and its data is
+        uploaded from the array buffer without copies. A dictionary of arrays is stored in .npz format.
+    """
+    name = 'numpy'
+
+    def __init__(self, codec=None):
+        """
+            Default constructor
+
+            :param codec: Not used
+            :type codec: JsonCodec | str
+        """
+        if numpy is None:
+            raise TeslaConfigException('numpy serializer requires the numpy package')
+
+    def dumps(self, model):
+        buffer = io.BytesIO()
+        if isinstance(model, dict):
+            numpy.savez(buffer, **model)
+            return buffer.getvalue()
+        model = numpy.asarray(model)
+        if model.dtype.hasobject or model.ndim == 0 or not model.flags.c_contiguous:
+            numpy.save(buffer, model, allow_pickle=False)
+            return buffer.getvalue()
+        numpy.lib.format.write_array_header_1_0(buffer, numpy.lib.format.header_data_from_array_1_0(model))
+        return [buffer.getvalue(), memoryview(model).cast('B')]
+
+    def loads(self, data):
+        model = numpy.load(io.BytesIO(data), allow_pickle=False)
+        if isinstance(model, numpy.lib.npyio.NpzFile):
+            with model:
+                return {key: model[key] for key in model.files}
+        return model
+
+
+SERIALIZERS = {
+    JsonModelSerializer.name: JsonModelSerializer,
+    MsgpackModelSerializer.name: MsgpackModelSerializer,
+    NumpyModelSerializer.name: NumpyModelSerializer,
+}
+
+
+def get_model_serializer(serializer=None, codec=None):
+    """
+        Get a learner model serializer
+
+        :param serializer: Serializer instance or name (json, msgpack, numpy). Default is json.
+        :type serializer: JsonModelSerializer | str
+        :param codec: JSON codec used by the json serializer
+        :type codec: JsonCodec | str
+        :return: Serializer instance
+        :rtype: JsonModelSerializer
+    """
+    if serializer is None:
+        serializer = JsonModelSerializer.name
+    if isinstance(serializer, str):
+        if serializer not in SERIALIZERS:
+            raise TeslaConfigException('Unknown model serializer {}'.format(serializer))
+        return SERIALIZERS[serializer](codec)
+    return serializer
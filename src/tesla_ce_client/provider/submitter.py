@@ -0,0 +1,625 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE provider write-behind submitters module """
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import time
+from tesla_ce_client import exception
+
+# Names of the request and sample validation status that can be replaced by a later status
+NON_TERMINAL_STATUS = ('PENDING', 'PROCESSING', 'VALIDATING', 'WAITING_EXTERNAL_SERVICE')
+
+
+def is_terminal_status(status):
+    """
+        Check if a request or sample validation status is terminal. Unknown status are considered terminal.
+
+        :param status: Request or sample validation status
+        :type status: RequestResultStatus | SampleValidationStatus
+        :return: True if the status is terminal
+        :rtype: bool
+    """
+    return getattr(status, 'name', None) not in NON_TERMINAL_STATUS
+
+
+class BaseSubmitter():
+    """
+        Write-behind submission of writes to the API. Writes are queued and sent by background workers, so the caller
+        does not wait for the API. Writes with the same key are sent in order by the same worker. When the queue of a
+        worker is full, new submissions wait for free space.
+
+        With a coalesce window, status changes are held during the window, and a later status change with the same
+        key replaces the held one, so only the latest is sent. Terminal status are never replaced. Futures of replaced
+        status changes get the response of the write that replaced them.
+    """
+
+    def __init__(self, client, workers=4, max_queue=1000, coalesce_window=None):
+        """
+            Default constructor
+
+            :param client: Client used to send the writes
+            :type client: Verification | Enrolment
+            :param workers: Number of writes sent at the same time
+            :type workers: int
+            :param max_queue: Maximum number of queued writes
+            :type max_queue: int
+            :param coalesce_window: Seconds status changes are held to be replaced by later ones. Disabled if not
+                provided.
+            :type coalesce_window: float
+        """
+        self._client = client
+        self.workers = workers
+        self.max_queue = max_queue
+        self.coalesce_window = coalesce_window
+
+        self._closed = False
+        self._lock = threading.Condition()
+        self._pending = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'coalesced': 0,
+        }
+        self._queues = []
+        self._workers = []
+        # Status changes held by the coalesce window, by key, as [deadline, futures, method, args]
+        self._held = {}
+        self._coalescer = None
+        self._start()
+
+    def _start(self):
+        """
+            Create the queues and start the workers
+        """
+        self._queues = [queue.Queue(max(1, self.max_queue // self.workers)) for _ in range(self.workers)]
+        self._workers = [threading.Thread(target=self._worker_loop, args=(worker_queue, ), daemon=True)
+                         for worker_queue in self._queues]
+        for worker in self._workers:
+            worker.start()
+        if self.coalesce_window is not None:
+            self._held_lock = threading.Condition()
+            self._coalescer = threading.Thread(target=self._coalescer_loop, daemon=True)
+            self._coalescer.start()
+
+    def _get_queue(self, key):
+        """
+            Get the queue of the worker sending the writes of a key
+        """
+        return self._queues[hash(key) % self.workers]
+
+    def _add_pending(self):
+        """
+            Count a new submitted write
+        """
+        with self._lock:
+            if self._closed:
+                raise exception.TeslaConfigException('Submitter is closed')
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+    def _record_done(self, error=None, count=1):
+        """
+            Count completed writes
+        """
+        with self._lock:
+            self._pending -= count
+            self._stats['completed'] += count
+            if error is not None:
+                self._stats['failed'] += count
+            self._lock.notify_all()
+
+    def _new_future(self):
+        """
+            Count a new submitted write and create its future
+        """
+        self._add_pending()
+        return concurrent.futures.Future()
+
+    def _hold(self, key, future, method, args):
+        """
+            Hold a status change, replacing the held one with the same key if it is not terminal
+
+            :return: Held status change released to keep the order, or None
+            :rtype: list
+        """
+        held = self._held.get(key)
+        if held is not None and not is_terminal_status(held[3][-1]):
+            held[1].append(future)
+            held[2] = method
+            held[3] = args
+            with self._lock:
+                self._stats['coalesced'] += 1
+            return None
+        released = self._held.pop(key, None)
+        self._held[key] = [time.monotonic() + self.coalesce_window, [future], method, args]
+        return released
+
+    def _pop_expired(self, now=None):
+        """
+            Remove the held status changes whose window expired
+
+            :param now: Monotonic time. If not provided, all the held status changes are removed.
+            :type now: float
+            :return: List of removed (key, held) pairs, and the deadline of the next one
+            :rtype: tuple
+        """
+        expired = []
+        deadline = None
+        for key, held in self._held.items():
+            if now is not None and held[0] > now:
+                deadline = held[0]
+                break
+            expired.append(key)
+        return [(key, self._held.pop(key)) for key in expired], deadline
+
+    def _put(self, key, item):
+        self._get_queue(key).put(tuple(item[-3:]))
+
+    def _submit(self, key, method, *args):
+        """
+            Queue a write, waiting while the queue of its worker is full. A held status change with the same key is
+            queued first.
+
+            :return: Future with the response to the write
+            :rtype: concurrent.futures.Future
+        """
+        future = self._new_future()
+        item = ([future], method, key + args)
+        if self.coalesce_window is None:
+            self._put(key, item)
+            return future
+        with self._held_lock:
+            held = self._held.pop(key, None)
+            if held is not None:
+                self._put(key, held)
+            self._put(key, item)
+        return future
+
+    def _submit_status(self, key, method, status):
+        """
+            Queue a status change, holding it during the coalesce window when enabled
+
+            :return: Future with the response to the write
+            :rtype: concurrent.futures.Future
+        """
+        if self.coalesce_window is None:
+            return self._submit(key, method, status)
+        future = self._new_future()
+        with self._held_lock:
+            released = self._hold(key, future, method, key + (status, ))
+            if released is not None:
+                self._put(key, released)
+            self._held_lock.notify()
+        return future
+
+    def _coalescer_loop(self):
+        """
+            Queue the held status changes when their window expires, until the submitter is closed
+        """
+        with self._held_lock:
+            while not self._closed or len(self._held) > 0:
+                expired, deadline = self._pop_expired(time.monotonic())
+                for key, held in expired:
+                    self._put(key, held)
+                self._held_lock.wait(None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def _worker_loop(self, worker_queue):
+        """
+            Send the queued writes of a worker until it is closed
+        """
+        while True:
+            item = worker_queue.get()
+            if item is None:
+                return
+            futures, method, args = item
+            running = [future for future in futures if future.set_running_or_notify_cancel()]
+            error = None
+            if len(running) > 0:
+                try:
+                    response = method(*args)
+                except Exception as exc:
+                    error = exc
+                    for future in running:
+                        future.set_exception(exc)
+                else:
+                    for future in running:
+                        future.set_result(response)
+            self._record_done(error, len(futures))
+
+    def flush(self, timeout=None):
+        """
+            Send the held status changes without waiting for their window, and wait until all the submitted writes
+            are sent
+
+            :param timeout: Maximum seconds to wait. If not provided, it waits until all writes are sent.
+            :type timeout: float
+            :return: True if all the writes are sent, False if the timeout expired
+            :rtype: bool
+        """
+        if self.coalesce_window is not None:
+            with self._held_lock:
+                for key, held in self._pop_expired()[0]:
+                    self._put(key, held)
+        with self._lock:
+            return self._lock.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        """
+            Reject new writes, send the queued ones and stop the workers
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush()
+        if self._coalescer is not None:
+            with self._held_lock:
+                self._held_lock.notify()
+            self._coalescer.join()
+        for worker_queue in self._queues:
+            worker_queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    @property
+    def stats(self):
+        """
+            Submitter counters: submitted writes, completed writes, failed writes, status changes replaced by later
+            ones and writes not sent yet
+
+            :return: Submitter counters
+            :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats, pending=self._pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ResultSubmitter(BaseSubmitter):
+    """
+        Write-behind submission of verification results and status changes. Writes of the same request are sent in
+        order by the same worker.
+    """
+
+    def submit_result(self, provider_id, request_id, result):
+        """
+            Queue the result of a verification request
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param request_id: Request result id
+            :type request_id: int
+            :param result: Verification result
+            :type result: dict
+            :return: Future with the response to the write
+            :rtype: concurrent.futures.Future
+        """
+        return self._submit((provider_id, request_id), self._client.set_provider_request_result, result)
+
+    def submit_status(self, provider_id, request_id, status):
+        """
+            Queue a status change of a verification request
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param request_id: Request result id
+            :type request_id: int
+            :param status: Request's status
+            :type status: RequestResultStatus
+            :return: Future with the response to the write
+            :rtype: concurrent.futures.Future
+        """
+        return self._submit_status((provider_id, request_id), self._client.set_provider_request_status, status)
+
+
+class ValidationSubmitter(BaseSubmitter):
+    """
+        Write-behind submission of sample validation results and status changes. Writes of the same validation are
+        sent in order by the same worker.
+    """
+
+    def submit_validation(self, provider_id, learner_id, sample_id, validation_id, result):
+        """
+            Queue the result of a sample validation
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param sample_id: Sample id
+            :type sample_id: int
+            :param validation_id: Validation id
+            :type validation_id: int
+            :param result: Validation result
+            :type result: dict
+            :return: Future with the response to the write
+            :rtype: concurrent.futures.Future
+        """
+        return self._submit((provider_id, learner_id, sample_id, validation_id), self._client.set_sample_validation,
+                            result)
+
+    def submit_validation_status(self, provider_id, learner_id, sample_id, validation_id, status):
+        """
+            Queue a status change of a sample validation
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param sample_id: Sample id
+            :type sample_id: int
+            :param validation_id: Validation id
+            :type validation_id: int
+            :param status: Sample's status
+            :type status: SampleValidationStatus
+            :return: Future with the response to the write
+            :rtype: concurrent.futures.Future
+        """
+        return self._submit_status((provider_id, learner_id, sample_id, validation_id),
+                                   self._client.set_sample_validation_status, status)
+
+
+class AsyncBaseSubmitter(BaseSubmitter):
+    """
+        Write-behind submission of writes for the asynchronous clients. Workers are tasks of the running event loop,
+        started with the first submission.
+    """
+
+    def _start(self):
+        """
+            Workers are started with the first submission, from the event loop
+        """
+        self._pending_done = None
+
+    def _start_tasks(self):
+        """
+            Create the queues and start the workers in the running event loop
+        """
+        self._pending_done = asyncio.Event()
+        self._queues = [asyncio.Queue(max(1, self.max_queue // self.workers)) for _ in range(self.workers)]
+        self._workers = [asyncio.ensure_future(self._worker_loop(worker_queue)) for worker_queue in self._queues]
+        if self.coalesce_window is not None:
+            self._held_lock = asyncio.Lock()
+            self._held_changed = asyncio.Event()
+            self._coalescer = asyncio.ensure_future(self._coalescer_loop())
+
+    def _record_done(self, error=None, count=1):
+        super()._record_done(error, count)
+        if self._pending == 0:
+            self._pending_done.set()
+
+    def _new_future(self):
+        """
+            Count a new submitted write and create its future
+        """
+        if len(self._workers) == 0:
+            self._start_tasks()
+        self._add_pending()
+        self._pending_done.clear()
+        return asyncio.get_running_loop().create_future()
+
+    async def _put(self, key, item):
+        await self._get_queue(key).put(tuple(item[-3:]))
+
+    async def _submit(self, key, method, *args):
+        """
+            Queue a write, waiting while the queue of its worker is full. A held status change with the same key is
+            queued first.
+
+            :return: Future with the response to the write
+            :rtype: asyncio.Future
+        """
+        future = self._new_future()
+        item = ([future], method, key + args)
+        if self.coalesce_window is None:
+            await self._put(key, item)
+            return future
+        async with self._held_lock:
+            held = self._held.pop(key, None)
+            if held is not None:
+                await self._put(key, held)
+            await self._put(key, item)
+        return future
+
+    async def _submit_status(self, key, method, status):
+        """
+            Queue a status change, holding it during the coalesce window when enabled
+
+            :return: Future with the response to the write
+            :rtype: asyncio.Future
+        """
+        if self.coalesce_window is None:
+            return await self._submit(key, method, status)
+        future = self._new_future()
+        async with self._held_lock:
+            released = self._hold(key, future, method, key + (status, ))
+            if released is not None:
+                await self._put(key, released)
+        self._held_changed.set()
+        return future
+
+    async def _coalescer_loop(self):
+        """
+            Queue the held status changes when their window expires
+        """
+        while True:
+            self._held_changed.clear()
+            async with self._held_lock:
+                expired, deadline = self._pop_expired(time.monotonic())
+                for key, held in expired:
+                    await self._put(key, held)
+            try:
+                await asyncio.wait_for(self._held_changed.wait(),
+                                       None if deadline is None else max(0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker_loop(self, worker_queue):
+        """
+            Send the queued writes of a worker until it is closed
+        """
+        while True:
+            futures, method, args = await worker_queue.get()
+            running = [future for future in futures if not future.cancelled()]
+            error = None
+            if len(running) > 0:
+                try:
+                    response = await method(*args)
+                except asyncio.CancelledError:
+                    for future in running:
+                        future.cancel()
+                    raise
+                except Exception as exc:
+                    error = exc
+                    for future in running:
+                        future.set_exception(exc)
+                else:
+                    for future in running:
+                        future.set_result(response)
+            self._record_done(error, len(futures))
+
+    async def flush(self, timeout=None):
+        """
+            Send the held status changes without waiting for their window, and wait until all the submitted writes
+            are sent
+
+            :param timeout: Maximum seconds to wait. If not provided, it waits until all writes are sent.
+            :type timeout: float
+            :return: True if all the writes are sent, False if the timeout expired
+            :rtype: bool
+        """
+        if self._pending_done is None:
+            return True
+        if self._coalescer is not None:
+            async with self._held_lock:
+                for key, held in self._pop_expired()[0]:
+                    await self._put(key, held)
+        try:
+            await asyncio.wait_for(self._pending_done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self):
+        """
+            Reject new writes, send the queued ones and stop the workers
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        await self.flush()
+        tasks = list(self._workers)
+        if self._coalescer is not None:
+            tasks.append(self._coalescer)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AsyncResultSubmitter(AsyncBaseSubmitter):
+    """
+        Write-behind submission of verification results and status changes for the asynchronous Verification client
+    """
+
+    async def submit_result(self, provider_id, request_id, result):
+        """
+            Queue the result of a verification request
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param request_id: Request result id
+            :type request_id: int
+            :param result: Verification result
+            :type result: dict
+            :return: Future with the response to the write
+            :rtype: asyncio.Future
+        """
+        return await self._submit((provider_id, request_id), self._client.set_provider_request_result, result)
+
+    async def submit_status(self, provider_id, request_id, status):
+        """
+            Queue a status change of a verification request
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param request_id: Request result id
+            :type request_id: int
+            :param status: Request's status
+            :type status: RequestResultStatus
+            :return: Future with the response to the write
+            :rtype: asyncio.Future
+        """
+        return await self._submit_status((provider_id, request_id), self._client.set_provider_request_status, status)
+
+
+class AsyncValidationSubmitter(AsyncBaseSubmitter):
+    """
+        Write-behind submission of sample validation results and status changes for the asynchronous Enrolment client
+    """
+
+    async def submit_validation(self, provider_id, learner_id, sample_id, validation_id, result):
+        """
+            Queue the result of a sample validation
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param sample_id: Sample id
+            :type sample_id: int
+            :param validation_id: Validation id
+            :type validation_id: int
+            :param result: Validation result
+            :type result: dict
+            :return: Future with the response to the write
+            :rtype: asyncio.Future
+        """
+        return await self._submit((provider_id, learner_id, sample_id, validation_id),
+                                  self._client.set_sample_validation, result)
+
+    async def submit_validation_status(self, provider_id, learner_id, sample_id, validation_id, status):
+        """
+            Queue a status change of a sample validation
+
+            :param provider_id: Provider ID
+            :type provider_id: int
+            :param learner_id: The learner UUID
+            :type learner_id: str
+            :param sample_id: Sample id
+            :type sample_id: int
+            :param validation_id: Validation id
+            :type validation_id: int
+            :param status: Sample's status
+            :type status: SampleValidationStatus
+            :return: Future with the response to the write
+            :rtype: asyncio.Future
+        """
+        return await self._submit_status((provider_id, learner_id, sample_id, validation_id),
+                                         self._client.set_sample_validation_status, status)
@@ -18,6 +18,7 @@ import simplejson
 import requests
 from enum import Enum
 from tesla_ce_client import exception
+from .submitter import ResultSubmitter, AsyncResultSubmitter
 
 
 class RequestResultStatus(Enum):
@@ -61,7 +62,8 @@ class Verification:
 
     def set_provider_request_result(self, provider_id, request_id, result):
         """
-            Store validation result for a verification request for a provider
+            Store validation result for a verification request for a provider. If the API is unreachable and
+            the connector has an outbox, the write is stored to be sent later.
 
             :param provider_id: Provider ID
             :type provider_id: int
@@ -73,11 +75,13 @@ class Verification:
         if 'audit' in result:
             result['audit_data'] = result['audit']
             del result['audit']
-        return self._connector.put('/api/v2/provider/{}/request/{}/'.format(provider_id, request_id), body=result)
+        return self._connector.write('put', '/api/v2/provider/{}/request/{}/'.format(provider_id, request_id),
+                                     body=result)
 
     def set_provider_request_status(self, provider_id, request_id, status):
         """
-            Change provider request status
+            Change provider request status. If the API is unreachable and the connector has an outbox, the write is
+            stored to be sent later, after the stored writes of the request.
 
             :param provider_id: Provider ID
             :type provider_id: int
@@ -89,5 +93,46 @@ class Verification:
 
             :return:
         """
-        return self._connector.post('/api/v2/provider/{}/request/{}/status/'.format(provider_id, request_id),
-                                    body={"status": status.value})
+        request_url = '/api/v2/provider/{}/request/{}/'.format(provider_id, request_id)
+        return self._connector.write('post', request_url + 'status/', body={"status": status.value}, key=request_url)
+
+    def submitter(self, workers=4, max_queue=1000, coalesce_window=None):
+        """
+            Get a write-behind submitter, which sends verification results and status changes from background threads.
+            Writes of the same request are sent in the order they are submitted. Close it to send pending writes.
+
+            :param workers: Number of writes sent at the same time
+            :type workers: int
+            :param max_queue: Maximum number of queued writes. When it is reached, submissions wait for free space.
+            :type max_queue: int
+            :param coalesce_window: Seconds status changes are held, so a later status change of the same request
+                replaces them. Terminal status are never replaced. Disabled if not provided.
+            :type coalesce_window: float
+            :return: Submitter
+            :rtype: ResultSubmitter
+        """
+        return ResultSubmitter(self, workers=workers, max_queue=max_queue, coalesce_window=coalesce_window)
+
+
+class AsyncVerification(Verification):
+    """
+        Verification asynchronous client class. Methods not redefined here are inherited from the synchronous client
+        and return the awaitables provided by the AsyncConnector.
+    """
+
+    def submitter(self, workers=4, max_queue=1000, coalesce_window=None):
+        """
+            Get a write-behind submitter, which sends verification results and status changes from background tasks.
+            Writes of the same request are sent in the order they are submitted. Close it to send pending writes.
+
+            :param workers: Number of writes sent at the same time
+            :type workers: int
+            :param max_queue: Maximum number of queued writes. When it is reached, submissions wait for free space.
+            :type max_queue: int
+            :param coalesce_window: Seconds status changes are held, so a later status change of the same request
+                replaces them. Terminal status are never replaced. Disabled if not provided.
+            :type coalesce_window: float
+            :return: Submitter
+            :rtype: AsyncResultSubmitter
+        """
+        return AsyncResultSubmitter(self, workers=workers, max_queue=max_queue, coalesce_window=coalesce_window)
@@ -0,0 +1,300 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE provider worker runtime module """
+import abc
+import concurrent.futures
+import functools
+import os
+import threading
+import time
+from tesla_ce_client.concurrency import iter_bounded
+from tesla_ce_client.exception import TeslaConfigException
+from .enrolment import SampleValidationStatus
+from .verification import RequestResultStatus
+
+
+def run_handler(handler, task):
+    """
+        Run a handler on the data of a task, measuring its duration. Errors are returned instead of raised, so they
+        can be related to the task when the handler runs in another process.
+
+        :param handler: Function analysing the data
+        :type handler: callable
+        :param task: Key and data of the task
+        :type task: tuple
+        :return: Key of the task, result of the handler, error raised and seconds spent
+        :rtype: tuple
+    """
+    key, data = task
+    start = time.monotonic()
+    try:
+        return key, handler(data), None, time.monotonic() - start
+    except Exception as exc:
+        return key, None, exc, time.monotonic() - start
+
+
+class BaseWorker(abc.ABC):
+    """
+        Processing loop of a provider. Tasks are fetched from the API in advance while previous tasks are analysed by
+        the handler in a thread or process pool, and their status changes and results are sent by a write-behind
+        submitter.
+    """
+
+    #: Status sent when a task starts, ends and fails
+    processing_status = None
+    processed_status = None
+    error_status = None
+
+    def __init__(self, provider, handler, provider_id=None, workers=None, executor='thread', prefetch=None,
+                 submit_workers=4, coalesce_window=None):
+        """
+            Default constructor
+
+            :param provider: Provider client
+            :type provider: ProviderClient
+            :param handler: Function called with the data of each task, returning its result. With the process
+                executor it must be defined at module level, so it can be sent to other processes.
+            :type handler: callable
+            :param provider_id: Provider ID. If not provided take it from module configuration
+            :type provider_id: int
+            :param workers: Number of tasks analysed at the same time. Default is the number of CPUs.
+            :type workers: int
+            :param executor: Pool running the handler: thread, process, or an executor instance
+            :type executor: str | concurrent.futures.Executor
+            :param prefetch: Number of tasks fetched in advance. Default is the number of workers.
+            :type prefetch: int
+            :param submit_workers: Number of status changes and results sent at the same time
+            :type submit_workers: int
+            :param coalesce_window: Seconds status changes are held to be replaced by later ones. Disabled if not
+                provided.
+            :type coalesce_window: float
+        """
+        if not isinstance(executor, concurrent.futures.Executor) and executor not in ('thread', 'process'):
+            raise TeslaConfigException('Unknown executor {}'.format(executor))
+        self.provider = provider
+        self.handler = handler
+        self.provider_id = provider_id
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.prefetch = prefetch or self.workers
+        self.submit_workers = submit_workers
+        self.coalesce_window = coalesce_window
+
+        # Last error raised by the handler
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'fetched': 0,
+            'fetch_errors': 0,
+            'processed': 0,
+            'failed': 0,
+            'submit_errors': 0,
+            'seconds': 0.0,
+            'handler_seconds': 0.0,
+            'max_latency': 0.0,
+        }
+
+    def _get_executor(self):
+        """
+            Get the executor running the handler
+
+            :return: Executor, and whether it must be shut down after the run
+            :rtype: tuple
+        """
+        if self.executor == 'thread':
+            return concurrent.futures.ThreadPoolExecutor(self.workers), True
+        if self.executor == 'process':
+            return concurrent.futures.ProcessPoolExecutor(self.workers), True
+        return self.executor, False
+
+    @abc.abstractmethod
+    def _get_submitter(self):
+        """
+            Get the write-behind submitter sending the status changes and results
+        """
+
+    @abc.abstractmethod
+    def _get_key(self, item):
+        """
+            Get the key identifying the task of an item
+        """
+
+    @abc.abstractmethod
+    def _fetch(self, key):
+        """
+            Get the data of a task, given to the handler
+        """
+
+    @abc.abstractmethod
+    def _submit_result(self, submitter, key, result):
+        """
+            Send the result of a task, returning the future of the write
+        """
+
+    @abc.abstractmethod
+    def _submit_status(self, submitter, key, status):
+        """
+            Send a status change of a task, returning the future of the write
+        """
+
+    def _fetch_task(self, key):
+        """
+            Get the data of a task. Errors are returned instead of raised, so they can be related to the task.
+
+            :return: Key of the task, data and error raised
+            :rtype: tuple
+        """
+        try:
+            return key, self._fetch(key), None
+        except Exception as exc:
+            return key, None, exc
+
+    def _track_submit(self, future):
+        """
+            Count the writes of the submitter that fail, once they are completed
+        """
+        future.add_done_callback(self._record_submit)
+
+    def _record_submit(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self._stats['submit_errors'] += 1
+
+    def _iter_tasks(self, items, submitter):
+        """
+            Fetch the tasks in advance, sending the processing status of each fetched task and the error status of
+            each task that cannot be fetched
+
+            :return: Key and data of each task
+            :rtype: generator
+        """
+        for future in iter_bounded(self._fetch_task, (self._get_key(item) for item in items), self.prefetch,
+                                   ordered=False):
+            key, data, error = future.result()
+            with self._lock:
+                self._stats['fetch_errors' if error is not None else 'fetched'] += 1
+            if error is not None:
+                self._track_submit(self._submit_status(submitter, key, self.error_status))
+                continue
+            self._track_submit(self._submit_status(submitter, key, self.processing_status))
+            yield key, data
+
+    def _record_task(self, seconds, error):
+        with self._lock:
+            if error is not None:
+                self.last_error = error
+            self._stats['failed' if error is not None else 'processed'] += 1
+            self._stats['handler_seconds'] += seconds
+            self._stats['max_latency'] = max(self._stats['max_latency'], seconds)
+
+    def run(self, items):
+        """
+            Process tasks until the items are exhausted. Items can be a generator reading new tasks from a queue.
+
+            :param items: Tasks to process
+            :type items: iterable
+            :return: Statistics of the worker
+            :rtype: dict
+        """
+        if self.provider_id is None:
+            self.provider_id = self.provider.get_provider_id()
+        executor, own_executor = self._get_executor()
+        start = time.monotonic()
+        try:
+            with self._get_submitter() as submitter:
+                for future in iter_bounded(functools.partial(run_handler, self.handler),
+                                           self._iter_tasks(items, submitter), self.workers, ordered=False,
+                                           executor=executor):
+                    key, result, error, seconds = future.result()
+                    if error is None:
+                        self._track_submit(self._submit_result(submitter, key, result))
+                        self._track_submit(self._submit_status(submitter, key, self.processed_status))
+                    else:
+                        self._track_submit(self._submit_status(submitter, key, self.error_status))
+                    self._record_task(seconds, error)
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+            with self._lock:
+                self._stats['seconds'] += time.monotonic() - start
+        return self.stats
+
+    @property
+    def stats(self):
+        """
+            Statistics of the worker: fetched tasks and fetch errors, processed and failed tasks, failed writes, seconds
+            running, throughput in tasks per second and average and maximum seconds spent by the handler
+
+            :return: Statistics
+            :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        done = stats['processed'] + stats['failed']
+        stats['throughput'] = done / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        stats['avg_latency'] = stats['handler_seconds'] / done if done > 0 else 0.0
+        return stats
+
+
+class VerificationWorker(BaseWorker):
+    """
+        Processing loop of verification requests. Items are request ids, and the handler is called with the
+        verification request, returning the verification result.
+    """
+    processing_status = RequestResultStatus.PROCESSING
+    processed_status = RequestResultStatus.PROCESSED
+    error_status = RequestResultStatus.ERROR
+
+    def _get_submitter(self):
+        return self.provider.verification.submitter(workers=self.submit_workers,
+                                                    coalesce_window=self.coalesce_window)
+
+    def _get_key(self, item):
+        return self.provider_id, item
+
+    def _fetch(self, key):
+        return self.provider.verification.get_provider_request_result(*key)
+
+    def _submit_result(self, submitter, key, result):
+        return submitter.submit_result(*key, result)
+
+    def _submit_status(self, submitter, key, status):
+        return submitter.submit_status(*key, status)
+
+
+class ValidationWorker(BaseWorker):
+    """
+        Processing loop of enrolment sample validations. Items are (learner_id, sample_id, validation_id) tuples, and
+        the handler is called with the sample, including its content, returning the validation result.
+    """
+    processing_status = SampleValidationStatus.VALIDATING
+    processed_status = SampleValidationStatus.VALID
+    error_status = SampleValidationStatus.ERROR
+
+    def _get_submitter(self):
+        return self.provider.enrolment.submitter(workers=self.submit_workers, coalesce_window=self.coalesce_window)
+
+    def _get_key(self, item):
+        return (self.provider_id, ) + tuple(item)
+
+    def _fetch(self, key):
+        return self.provider.enrolment.fetch_sample(key[0], key[1], key[2], validations=False, load=True)
+
+    def _submit_result(self, submitter, key, result):
+        return submitter.submit_validation(*key, result)
+
+    def _submit_status(self, submitter, key, status):
+        return submitter.submit_validation_status(*key, status)
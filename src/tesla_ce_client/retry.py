@@ -0,0 +1,170 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client retry policy module """
+import datetime
+import email.utils
+import random
+import threading
+
+
+class RetryPolicy():
+    """
+        Policy deciding if and when a failed request is retried. Retries use exponential backoff with full jitter,
+        and honour the Retry-After header sent with 429 and 503 responses.
+    """
+
+    #: Methods that can be safely repeated
+    IDEMPOTENT_METHODS = ('get', 'head', 'options', 'put', 'delete')
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30, jitter=True, total_timeout=None,
+                 retry_statuses=(429, 502, 503, 504), retry_methods=IDEMPOTENT_METHODS, always_retry_statuses=(429,),
+                 respect_retry_after=True):
+        """
+            Default constructor
+
+            :param max_attempts: Maximum number of attempts for a request, including the first one
+            :type max_attempts: int
+            :param backoff_factor: Base delay in seconds. Delay for attempt n is backoff_factor * 2 ^ (n - 1)
+            :type backoff_factor: float
+            :param max_backoff: Maximum delay in seconds between two attempts
+            :type max_backoff: float
+            :param jitter: Whether to randomize the delay between zero and the computed backoff
+            :type jitter: bool
+            :param total_timeout: Maximum number of seconds spent on a request including all the attempts
+            :type total_timeout: float
+            :param retry_statuses: HTTP status codes that are retried
+            :type retry_statuses: tuple
+            :param retry_methods: HTTP methods that are retried on connection errors and retry_statuses
+            :type retry_methods: tuple
+            :param always_retry_statuses: HTTP status codes that are retried for any method, because the server
+                guarantees the request was not processed
+            :type always_retry_statuses: tuple
+            :param respect_retry_after: Whether to wait the time requested by the server in the Retry-After header
+            :type respect_retry_after: bool
+        """
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.total_timeout = total_timeout
+        self.retry_statuses = tuple(retry_statuses)
+        self.retry_methods = tuple(method.lower() for method in retry_methods)
+        self.always_retry_statuses = tuple(always_retry_statuses)
+        self.respect_retry_after = respect_retry_after
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'retries': 0,
+            'retried_requests': 0,
+            'exhausted': 0,
+        }
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+            Parse the value of a Retry-After header
+
+            :param value: Header value, either a number of seconds or an HTTP date
+            :type value: str
+            :return: Number of seconds to wait or None if the value is not valid
+            :rtype: float
+        """
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date is None:
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return max((date - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0)
+
+    def get_backoff(self, attempt):
+        """
+            Get the delay before next attempt
+
+            :param attempt: Number of attempts already done
+            :type attempt: int
+            :return: Seconds to wait
+            :rtype: float
+        """
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        if self.jitter:
+            return random.uniform(0, backoff)
+        return backoff
+
+    def get_delay(self, method, attempt, elapsed, status_code=None, retry_after=None):
+        """
+            Decide if a failed request must be retried
+
+            :param method: HTTP method of the request
+            :type method: str
+            :param attempt: Number of attempts already done
+            :type attempt: int
+            :param elapsed: Seconds since the first attempt started
+            :type elapsed: float
+            :param status_code: Status code of the response, or None if the request failed with a connection error
+            :type status_code: int
+            :param retry_after: Value of the Retry-After header of the response
+            :type retry_after: str
+            :return: Seconds to wait before retrying, or None if the request must not be retried
+            :rtype: float
+        """
+        if status_code is None:
+            retryable = method.lower() in self.retry_methods
+        elif status_code in self.always_retry_statuses:
+            retryable = True
+        else:
+            retryable = status_code in self.retry_statuses and method.lower() in self.retry_methods
+        if not retryable:
+            return None
+
+        if attempt >= self.max_attempts:
+            self._increment_stats(exhausted=1)
+            return None
+
+        delay = self.get_backoff(attempt)
+        if self.respect_retry_after and status_code in (429, 503):
+            delay = max(delay, self.parse_retry_after(retry_after) or 0)
+
+        if self.total_timeout is not None and elapsed + delay > self.total_timeout:
+            self._increment_stats(exhausted=1)
+            return None
+
+        self._increment_stats(retries=1, retried_requests=1 if attempt == 1 else 0)
+        return delay
+
+    def _increment_stats(self, **values):
+        with self._stats_lock:
+            for key, value in values.items():
+                self._stats[key] += value
+
+    @property
+    def stats(self):
+        """
+            Retry counters for monitoring: total retries, requests retried at least once and requests that failed
+            after exhausting the attempts or the time budget
+
+            :return: Retry counters
+            :rtype: dict
+        """
+        with self._stats_lock:
+            return dict(self._stats)
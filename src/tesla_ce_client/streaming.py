@@ -0,0 +1,322 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client streaming JSON decoding module """
+import codecs
+import json
+import re
+from .exception import InternalException
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]}'
+
+#: Characters changing the nesting of a value, and characters ending a string
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+
+#: Marker returned when the buffer does not contain a complete value
+_NEED_DATA = object()
+
+#: Marker returned when a parsing step does not complete an item
+_NO_ITEM = object()
+
+
+class _ValueScanner():
+    """
+        Find the end of a JSON string, array or object received in several chunks, scanning each chunk once without
+        decoding it
+    """
+
+    def __init__(self, opening):
+        """
+            Default constructor
+
+            :param opening: First character of the value
+            :type opening: str
+        """
+        self.in_string = opening == '"'
+        self.depth = 0 if self.in_string else 1
+        self.escape = False
+        self.complete = False
+
+    def scan(self, text, pos=0):
+        """
+            Scan the next part of the value
+
+            :param text: Next part of the value
+            :type text: str
+            :param pos: Position where the scan starts
+            :type pos: int
+            :return: True if the value ends in this part
+            :rtype: bool
+        """
+        while not self.complete:
+            if self.escape:
+                if pos >= len(text):
+                    return False
+                pos += 1
+                self.escape = False
+            match = (_STRING_END if self.in_string else _STRUCTURE).search(text, pos)
+            if match is None:
+                return False
+            pos = match.end()
+            self._update(match.group())
+        return True
+
+    def _update(self, char):
+        if self.in_string:
+            self.escape = char == '\\'
+            self.in_string = self.escape
+        elif char == '"':
+            self.in_string = True
+        elif char in '[{':
+            self.depth += 1
+        else:
+            self.depth -= 1
+        self.complete = not self.in_string and self.depth == 0
+
+
+class JsonArrayParser():
+    """
+        Incremental parser extracting the items of an array field of a JSON object as the document is received. Only
+        the items not yet returned are kept in memory. Other fields of the object are stored in fields. Chunks of a
+        large value are scanned once to find its end, and the value is decoded when it is complete.
+
+            parser = JsonArrayParser('results')
+            for chunk in chunks:
+                for item in parser.feed(chunk):
+                    process(item)
+            parser.close()
+    """
+
+    def __init__(self, key='results'):
+        """
+            Default constructor
+
+            :param key: Name of the array field to extract
+            :type key: str
+        """
+        self.key = key
+
+        #: Other fields of the object found while parsing -> dict
+        self.fields = {}
+
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._chunks = []
+        self._pos = 0
+        self._eof = False
+        self._state = 'start'
+        self._key = None
+        self._scanner = None
+
+    def feed(self, data):
+        """
+            Parse a new chunk of the document
+
+            :param data: Chunk of the document
+            :type data: bytes | str
+            :return: Items of the array completed with this chunk
+            :rtype: list
+        """
+        if isinstance(data, bytes):
+            data = self._utf8.decode(data)
+        self._chunks.append(data)
+        if self._scanner is not None and not self._scanner.scan(data) and not self._eof:
+            # The value being received is not complete yet
+            return []
+        if self._pos > 0:
+            self._chunks.insert(0, self._buffer[self._pos:])
+        else:
+            self._chunks.insert(0, self._buffer)
+        self._buffer = ''.join(self._chunks)
+        self._chunks = []
+        self._pos = 0
+        return list(self._parse())
+
+    def close(self):
+        """
+            Finish parsing the document
+
+            :return: Items of the array completed at the end of the document
+            :rtype: list
+        """
+        self._eof = True
+        items = self.feed(self._utf8.decode(b'', final=True))
+        if self._state != 'done':
+            raise InternalException('Unexpected end of JSON document')
+        return items
+
+    def _skip_whitespace(self):
+        """
+            Get next non whitespace character
+
+            :return: Next character or None if the buffer is consumed
+            :rtype: str
+        """
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+        if self._pos < len(self._buffer):
+            return self._buffer[self._pos]
+        return None
+
+    def _expect(self, char, accepted):
+        if char not in accepted:
+            raise InternalException('Invalid JSON document: unexpected {}'.format(char))
+        self._pos += 1
+        return char
+
+    def _is_complete(self):
+        """
+            Check if the string, array or object starting at the current position is complete. Other values are
+            short, so they are decoded directly.
+
+            :return: False if more data is needed to decode the value
+            :rtype: bool
+        """
+        if self._scanner is not None:
+            complete = self._scanner.complete
+        elif self._buffer[self._pos] in '"[{':
+            self._scanner = _ValueScanner(self._buffer[self._pos])
+            complete = self._scanner.scan(self._buffer, self._pos + 1)
+        else:
+            return True
+        if complete or self._eof:
+            self._scanner = None
+        return complete or self._eof
+
+    def _decode(self):
+        """
+            Decode next value of the buffer
+
+            :return: Decoded value or _NEED_DATA if the value is not complete
+        """
+        if not self._is_complete():
+            return _NEED_DATA
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except ValueError:
+            if self._eof:
+                raise InternalException('Invalid JSON document')
+            return _NEED_DATA
+        # Numbers and literals are only complete when they are followed by a delimiter, as 1 may continue as 1.5
+        if not self._eof and self._buffer[end - 1] not in '"]}' and (
+                end == len(self._buffer) or self._buffer[end] not in _DELIMITERS):
+            return _NEED_DATA
+        self._pos = end
+        return value
+
+    def _parse(self):
+        """
+            Advance the parser over the buffer
+
+            :return: Completed items of the array
+            :rtype: generator
+        """
+        while True:
+            char = self._skip_whitespace()
+            if char is None:
+                return
+            item = getattr(self, '_parse_' + self._state)(char)
+            if item is _NEED_DATA:
+                return
+            if item is not _NO_ITEM:
+                yield item
+
+    def _parse_start(self, char):
+        self._expect(char, '{')
+        self._state = 'first_key'
+        return _NO_ITEM
+
+    def _parse_first_key(self, char):
+        if char == '}':
+            self._pos += 1
+            self._state = 'done'
+        else:
+            self._state = 'key'
+        return _NO_ITEM
+
+    def _parse_key(self, char):
+        value = self._decode()
+        if value is _NEED_DATA:
+            return _NEED_DATA
+        self._key = value
+        self._state = 'colon'
+        return _NO_ITEM
+
+    def _parse_colon(self, char):
+        self._expect(char, ':')
+        self._state = 'value'
+        return _NO_ITEM
+
+    def _parse_value(self, char):
+        if self._key == self.key and char == '[':
+            self._pos += 1
+            self._state = 'first_item'
+            return _NO_ITEM
+        value = self._decode()
+        if value is _NEED_DATA:
+            return _NEED_DATA
+        self.fields[self._key] = value
+        self._state = 'after_value'
+        return _NO_ITEM
+
+    def _parse_first_item(self, char):
+        if char == ']':
+            self._pos += 1
+            self._state = 'after_value'
+        else:
+            self._state = 'item'
+        return _NO_ITEM
+
+    def _parse_item(self, char):
+        value = self._decode()
+        if value is not _NEED_DATA:
+            self._state = 'after_item'
+        return value
+
+    def _parse_after_item(self, char):
+        self._state = 'item' if self._expect(char, ',]') == ',' else 'after_value'
+        return _NO_ITEM
+
+    def _parse_after_value(self, char):
+        self._state = 'key' if self._expect(char, ',}') == ',' else 'done'
+        return _NO_ITEM
+
+    def _parse_done(self, char):
+        raise InternalException('Invalid JSON document: unexpected data after the end')
+
+
+def iter_json_array(chunks, key='results', fields=None):
+    """
+        Iterate over the items of an array field of a JSON object, decoding the document incrementally
+
+        :param chunks: Chunks of the JSON document
+        :type chunks: iterable
+        :param key: Name of the array field to extract
+        :type key: str
+        :param fields: Dictionary where other fields of the object are stored once the document is consumed
+        :type fields: dict
+        :return: Items of the array
+        :rtype: generator
+    """
+    parser = JsonArrayParser(key)
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.close():
+        yield item
+    if fields is not None:
+        fields.update(parser.fields)
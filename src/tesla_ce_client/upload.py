@@ -0,0 +1,309 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client resumable multipart upload module """
+import asyncio
+import mmap
+import threading
+import time
+from xml.sax.saxutils import escape
+import requests
+from .concurrency import iter_bounded, aiter_bounded
+from .exception import TeslaConfigException, TeslaException, InternalException, UploadException
+from .retry import RetryPolicy
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+def get_complete_upload_body(etags):
+    """
+        Build the body of the request completing a multipart upload, in the format used by S3 compatible storages
+
+        :param etags: ETag of each part, by part number
+        :type etags: dict
+        :return: XML document
+        :rtype: bytes
+    """
+    parts = ''.join('<Part><PartNumber>{}</PartNumber><ETag>{}</ETag></Part>'.format(number, escape(etags[number]))
+                    for number in sorted(etags))
+    return '<CompleteMultipartUpload>{}</CompleteMultipartUpload>'.format(parts).encode('utf-8')
+
+
+def check_complete_upload_response(content):
+    """
+        Check the response to a complete request. S3 compatible storages can report errors with a success status.
+
+        :param content: Content of the response
+        :type content: bytes
+    """
+    if content is not None and b'<Error>' in content:
+        raise InternalException("Multipart upload not completed: {}".format(content))
+
+
+def get_buffers(data):
+    """
+        Get the buffers with the content to upload, without copying buffers and memory mapped files
+
+        :param data: Data to upload
+        :type data: bytes | file | mmap.mmap | list | iterable
+        :return: List of byte buffers
+        :rtype: list
+    """
+    if isinstance(data, (bytes, bytearray, memoryview, mmap.mmap)):
+        return [memoryview(data).cast('B')]
+    if isinstance(data, str):
+        return [memoryview(data.encode('utf-8'))]
+    if isinstance(data, (list, tuple)):
+        buffers = []
+        for item in data:
+            buffers.extend(get_buffers(item))
+        return buffers
+    if hasattr(data, 'read'):
+        try:
+            if data.tell() == 0:
+                return [memoryview(mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ))]
+        except (AttributeError, OSError, ValueError):
+            pass
+        return get_buffers(data.read())
+    return get_buffers(b''.join(chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in data))
+
+
+class MultipartUpload():
+    """
+        Upload of a file in parts to the pre-signed part urls of an S3 compatible storage. Parts are uploaded in
+        parallel and failed parts are retried. When some parts still fail, the UploadException raised contains this
+        upload, which can be resumed later sending only the pending parts.
+    """
+
+    def __init__(self, upload_url, data, workers=4, retry_policy=None):
+        """
+            Default constructor
+
+            :param upload_url: Multipart upload description, with the part_size, the parts with their part_number and
+                url, and the complete_url
+            :type upload_url: dict
+            :param data: Data to upload
+            :type data: bytes | file | mmap.mmap | list | iterable
+            :param workers: Number of parts uploaded in parallel
+            :type workers: int
+            :param retry_policy: Policy to retry failed parts. Default is 3 attempts with exponential backoff.
+            :type retry_policy: RetryPolicy
+        """
+        self.part_size = upload_url['part_size']
+        self.parts = sorted(upload_url['parts'], key=lambda part: part['part_number'])
+        self.complete_url = upload_url['complete_url']
+        self.workers = workers
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.completed = False
+
+        self._buffers = get_buffers(data)
+        self.size = sum(buffer.nbytes for buffer in self._buffers)
+        num_parts = max(1, -(-self.size // self.part_size))
+        if num_parts > len(self.parts):
+            raise TeslaConfigException('{} parts are required to upload {} bytes, but only {} urls are provided'.format(
+                num_parts, self.size, len(self.parts)))
+        self.parts = self.parts[:num_parts]
+        self._offsets = {part['part_number']: idx * self.part_size for idx, part in enumerate(self.parts)}
+
+        # ETag of uploaded parts, by part number
+        self.etags = {}
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'bytes': 0,
+            'seconds': 0.0,
+            'parts': 0,
+            'retries': 0,
+            'failed_parts': 0,
+        }
+
+    @property
+    def pending_parts(self):
+        """
+            Parts not uploaded yet
+            :return: List of parts
+            :rtype: list
+        """
+        return [part for part in self.parts if part['part_number'] not in self.etags]
+
+    @property
+    def stats(self):
+        """
+            Statistics of the upload, including the throughput in bytes per second
+            :return: Statistics
+            :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['throughput'] = stats['bytes'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
+
+    def get_part_data(self, part):
+        """
+            Get the content of a part
+
+            :param part: Part description
+            :type part: dict
+            :return: Content of the part
+            :rtype: bytes
+        """
+        start = self._offsets[part['part_number']]
+        end = min(start + self.part_size, self.size)
+        chunks = []
+        offset = 0
+        for buffer in self._buffers:
+            if offset < end and start < offset + buffer.nbytes:
+                chunks.append(buffer[max(start - offset, 0):end - offset])
+            offset += buffer.nbytes
+        return b''.join(chunks)
+
+    def _record_part(self, part, etag, size, attempts):
+        with self._lock:
+            self.etags[part['part_number']] = etag
+            self._stats['bytes'] += size
+            self._stats['parts'] += 1
+            self._stats['retries'] += attempts - 1
+
+    def _record_failure(self, attempts):
+        with self._lock:
+            self._stats['failed_parts'] += 1
+            self._stats['retries'] += attempts - 1
+
+    def _check_failures(self, failures):
+        """
+            Raise an exception if some parts failed
+        """
+        if len(failures) > 0:
+            raise UploadException('{} of {} parts failed: {}'.format(len(failures), len(self.parts), failures[0]),
+                                  upload=self)
+
+    def _get_retry_delay(self, exc, attempt, start):
+        """
+            Get the delay before retrying a failed part. Connection errors, timeouts and the status codes retried by
+            the retry policy are retried, while client errors, such as an expired url, are raised at once.
+
+            :param exc: Error raised uploading the part
+            :type exc: Exception
+            :param attempt: Number of attempts already done
+            :type attempt: int
+            :param start: Monotonic time of the first attempt
+            :type start: float
+            :return: Seconds to wait, or None if the part must not be retried
+            :rtype: float
+        """
+        status_code = getattr(exc, 'status_code', None)
+        if isinstance(exc, TeslaException) and status_code is None:
+            return None
+        return self.retry_policy.get_delay('put', attempt, time.monotonic() - start, status_code)
+
+    def _upload_part(self, connector, part):
+        """
+            Upload a part, retrying failed attempts
+        """
+        data = self.get_part_data(part)
+        attempt = 0
+        start = time.monotonic()
+        while True:
+            attempt += 1
+            try:
+                etag = connector.upload_part(part['url'], data)
+            except (TeslaException, requests.ConnectionError, requests.Timeout) as exc:
+                delay = self._get_retry_delay(exc, attempt, start)
+                if delay is None:
+                    self._record_failure(attempt)
+                    raise
+                time.sleep(delay)
+            else:
+                self._record_part(part, etag, len(data), attempt)
+                return etag
+
+    def upload(self, connector):
+        """
+            Upload the pending parts and complete the upload
+
+            :param connector: Connector used to send the requests
+            :type connector: Connector
+            :return: Statistics of the upload
+            :rtype: dict
+        """
+        start = time.monotonic()
+        failures = []
+        try:
+            for future in iter_bounded(lambda part: self._upload_part(connector, part), self.pending_parts,
+                                       self.workers, ordered=False):
+                if future.exception() is not None:
+                    failures.append(future.exception())
+        finally:
+            with self._lock:
+                self._stats['seconds'] += time.monotonic() - start
+        self._check_failures(failures)
+        if not self.completed:
+            connector.complete_upload(self.complete_url, self.etags)
+            self.completed = True
+        return self.stats
+
+
+class AsyncMultipartUpload(MultipartUpload):
+    """
+        Multipart upload using an AsyncConnector
+    """
+
+    async def _upload_part(self, connector, part):
+        """
+            Upload a part, retrying failed attempts
+        """
+        data = self.get_part_data(part)
+        attempt = 0
+        start = time.monotonic()
+        while True:
+            attempt += 1
+            try:
+                etag = await connector.upload_part(part['url'], data)
+            except (TeslaException, aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                delay = self._get_retry_delay(exc, attempt, start)
+                if delay is None:
+                    self._record_failure(attempt)
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                self._record_part(part, etag, len(data), attempt)
+                return etag
+
+    async def upload(self, connector):
+        """
+            Upload the pending parts and complete the upload
+
+            :param connector: Connector used to send the requests
+            :type connector: AsyncConnector
+            :return: Statistics of the upload
+            :rtype: dict
+        """
+        start = time.monotonic()
+        failures = []
+        try:
+            async for task in aiter_bounded(lambda part: self._upload_part(connector, part), self.pending_parts,
+                                            self.workers, ordered=False):
+                if task.exception() is not None:
+                    failures.append(task.exception())
+        finally:
+            with self._lock:
+                self._stats['seconds'] += time.monotonic() - start
+        self._check_failures(failures)
+        if not self.completed:
+            await connector.complete_upload(self.complete_url, self.etags)
+            self.completed = True
+        return self.stats
@@ -0,0 +1,84 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" TeSLA CE Client utilities module """
+import inspect
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+async def _async_single_result(result):
+    return single_result(await result)
+
+
+def single_result(result):
+    """
+        Get the element of a filtered list when it contains exactly one element. Awaitable lists are supported, in
+        which case an awaitable is returned.
+
+        :param result: Filtered list of results or awaitable returning it
+        :type result: dict
+        :return: The single element of the list or None if the list is empty or has more than one element
+        :rtype: dict
+    """
+    if inspect.isawaitable(result):
+        return _async_single_result(result)
+    if result['count'] == 1:
+        return result['results'][0]
+    return None
+
+
+def set_url_params(url, **params):
+    """
+        Set query parameters in an url, replacing existing values
+
+        :param url: Url
+        :type url: str
+        :param params: Parameters to set. Parameters with None value are not modified.
+        :type params: dict
+        :return: Url with the new parameters
+        :rtype: str
+    """
+    params = {key: value for key, value in params.items() if value is not None}
+    if len(params) == 0:
+        return url
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(params)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def get_page_urls(page):
+    """
+        Compute the urls of the remaining pages of a paginated list from its first page. Both limit/offset and page
+        number pagination are supported.
+
+        :param page: First page of the list
+        :type page: dict
+        :return: Urls of the remaining pages, or None if they cannot be computed
+        :rtype: list
+    """
+    if page.get('next') is None:
+        return []
+    next_url = page['next']
+    query = dict(parse_qsl(urlsplit(next_url).query))
+    count = page['count']
+    if 'offset' in query:
+        limit = int(query.get('limit', len(page['results'])))
+        if limit <= 0:
+            return None
+        return [set_url_params(next_url, offset=offset) for offset in range(int(query['offset']), count, limit)]
+    if 'page' in query and len(page['results']) > 0:
+        num_pages = -(-count // len(page['results']))
+        return [set_url_params(next_url, page=number) for number in range(int(query['page']), num_pages + 1)]
+    return None
@@ -13,8 +13,9 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Activities cLient package """
-from .client import VleClient
+from .client import VleClient, AsyncVleClient
 
 __all__ = [
     "VleClient",
+    "AsyncVleClient",
 ]
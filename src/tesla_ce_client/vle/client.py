@@ -13,7 +13,7 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE client module """
-from .course import VleCourseClient
+from .course import VleCourseClient, AsyncVleCourseClient
 
 
 class VleClient():
@@ -102,3 +102,21 @@ class VleClient():
         }
 
         return self._connector.post('api/v2/vle/{}/launcher/'.format(vle_id), data)
+
+
+class AsyncVleClient(VleClient):
+    """
+        VLE asynchronous client class. Methods not redefined here are inherited from the synchronous client and return
+        the awaitables provided by the AsyncConnector.
+    """
+
+    @property
+    def course(self):
+        """
+            Access to the VLE course related methods
+            :return: Course controller object
+            :rtype: AsyncVleCourseClient
+        """
+        if self._course is None:
+            self._course = AsyncVleCourseClient(self._connector)
+        return self._course
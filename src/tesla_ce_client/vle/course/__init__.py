@@ -13,8 +13,9 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Client module """
-from .client import VleCourseClient
+from .client import VleCourseClient, AsyncVleCourseClient
 
 __all__=[
     "VleCourseClient",
+    "AsyncVleCourseClient",
 ]
@@ -13,7 +13,8 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Activity client module """
-from .results import VleCourseActivityResultsClient
+from tesla_ce_client.utils import single_result
+from .results import VleCourseActivityResultsClient, AsyncVleCourseActivityResultsClient
 
 
 class VleCourseActivityClient():
@@ -60,6 +61,28 @@ class VleCourseActivityClient():
             vle_id = self._connector.get_vle_id()
         return self._connector.get('api/v2/vle/{}/course/{}/activity/'.format(vle_id, course_id))
 
+    def iter_list(self, course_id, vle_id=None, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over all the activities of a course, requesting the pages lazily
+
+            :param course_id: Identifier of the course.
+            :type course_id: str
+            :param vle_id: Identifier of the vle. If not provided take it from module configuration
+            :type vle_id: int
+            :param page_size: Number of activities requested on each page
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Activities
+            :rtype: generator
+        """
+        if vle_id is None:
+            vle_id = self._connector.get_vle_id()
+        return self._connector.iter_results('api/v2/vle/{}/course/{}/activity/'.format(vle_id, course_id),
+                                            page_size, workers, prefetch)
+
     def get(self, course_id, activity_id, vle_id=None):
         """
             Get an activity
@@ -94,14 +117,11 @@ class VleCourseActivityClient():
         """
         if vle_id is None:
             vle_id = self._connector.get_vle_id()
-        result = self._connector.get('api/v2/vle/{}/course/{}/activity/?vle_activity_type={}&vle_activity_id={}'.format(
-            vle_id, course_id, vle_activity_type, vle_activity_id)
+        result = self._connector.lookup(
+            'api/v2/vle/{}/course/{}/activity/?vle_activity_type={}&vle_activity_id={}'.format(
+                vle_id, course_id, vle_activity_type, vle_activity_id)
         )
-
-        if result['count'] == 1:
-            return result['results'][0]
-
-        return None
+        return single_result(result)
 
     def create(self, course_id, vle_activity_type, vle_activity_id, name, description, enabled=True, start=None,
                end=None, conf=None, vle_id=None):
@@ -302,14 +322,10 @@ class VleCourseActivityClient():
         """
         if vle_id is None:
             vle_id = self._connector.get_vle_id()
-        result = self._connector.get('api/v2/vle/{}/course/{}/activity/{}/instrument/?instrument_id={}'.format(
+        result = self._connector.lookup('api/v2/vle/{}/course/{}/activity/{}/instrument/?instrument_id={}'.format(
             vle_id, course_id, activity_id, instrument_id),
         )
-
-        if result['count'] == 1:
-            return result['results'][0]
-
-        return None
+        return single_result(result)
 
     def add_or_update_instrument(self, course_id, activity_id, instrument_id, active, required, options=None,
                                  alternative_to=None, vle_id=None):
@@ -344,3 +360,55 @@ class VleCourseActivityClient():
             resp = self.update_instrument(course_id, activity_id, assignment['id'], instrument_id, active, required,
                                           options, alternative_to, vle_id)
         return resp
+
+
+class AsyncVleCourseActivityClient(VleCourseActivityClient):
+    """
+        VLE Course Activity asynchronous client class. Methods not redefined here are inherited from the synchronous
+        client and return the awaitables provided by the AsyncConnector.
+    """
+
+    @property
+    def result(self):
+        """
+            Access to the VLE course activity results related methods
+            :return: Activity results controller object
+            :rtype: AsyncVleCourseActivityResultsClient
+        """
+        if self._results is None:
+            self._results = AsyncVleCourseActivityResultsClient(self._connector)
+        return self._results
+
+    async def add_or_update_instrument(self, course_id, activity_id, instrument_id, active, required, options=None,
+                                       alternative_to=None, vle_id=None):
+        """
+            Add a new instrument to the activity or update the information if this instrument already is assigned
+
+            :param course_id: Identifier of the course
+            :type course_id: int
+            :param activity_id: Activity ID
+            :type activity_id: int
+            :param instrument_id: Id of the instrument
+            :type instrument_id: int
+            :param active: Whether this instrument is active
+            :type active: bool
+            :param required: Whether this instrument is required
+            :type required: bool
+            :param options: Options for this instrument
+            :type options: dict
+            :param alternative_to: Instrument assignment this instrument is an alternative to
+            :type alternative_to: int
+            :param vle_id: Identifier of the vle. If not provided take it from module configuration
+            :type vle_id: int
+            :return: Instrument assignment data
+            :rtype: dict
+        """
+        assignment = await self.find_instrument(course_id, activity_id, instrument_id)
+
+        if assignment is None:
+            resp = await self.add_instrument(course_id, activity_id, instrument_id, active, required, options,
+                                             alternative_to, vle_id)
+        else:
+            resp = await self.update_instrument(course_id, activity_id, assignment['id'], instrument_id, active,
+                                                required, options, alternative_to, vle_id)
+        return resp
@@ -13,9 +13,10 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Activities cLient package """
-from .client import VleCourseActivityResultsClient
+from .client import VleCourseActivityResultsClient, AsyncVleCourseActivityResultsClient
 
 __all__ = [
     "VleCourseActivityResultsClient",
+    "AsyncVleCourseActivityResultsClient",
 ]
 
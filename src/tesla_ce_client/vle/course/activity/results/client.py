@@ -48,6 +48,32 @@ class VleCourseActivityResultsClient():
                                                                                         course_id,
                                                                                         activity_id))
 
+    def iter_list(self, course_id, activity_id, vle_id=None, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over all the results for an activity, requesting the pages lazily
+
+            :param course_id: Identifier of the course.
+            :type course_id: str
+            :param activity_id: Identifier of the activity
+            :type activity_id: int
+            :param vle_id: Identifier of the vle. If not provided take it from module configuration
+            :type vle_id: int
+            :param page_size: Number of results requested on each page
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Results for the activity
+            :rtype: generator
+        """
+        if vle_id is None:
+            vle_id = self._connector.get_vle_id()
+        return self._connector.iter_results('api/v2/vle/{}/course/{}/activity/{}/report/'.format(vle_id,
+                                                                                                 course_id,
+                                                                                                 activity_id),
+                                            page_size, workers, prefetch)
+
     def get(self, course_id, activity_id, report_id, vle_id=None):
         """
             Get the detail of a single result
@@ -102,3 +128,45 @@ class VleCourseActivityResultsClient():
             str(learner_id),
             instrument)
         )
+
+    def iter_requests(self, course_id, activity_id, learner_id, instrument=None, vle_id=None, page_size=None,
+                      workers=None, prefetch=False):
+        """
+            Iterate over all the learner requests for an activity, requesting the pages lazily
+
+            :param course_id: Identifier of the course.
+            :type course_id: str
+            :param activity_id: Identifier of the activity
+            :type activity_id: int
+            :param learner_id: Identifier of the learner
+            :type learner_id: str
+            :param instrument: Filter requests for provided instrument
+            :type instrument: int
+            :param vle_id: Identifier of the vle. If not provided take it from module configuration
+            :type vle_id: int
+            :param page_size: Number of requests requested on each page
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Learner requests for the activity
+            :rtype: generator
+        """
+        if vle_id is None:
+            vle_id = self._connector.get_vle_id()
+        url = 'api/v2/vle/{}/course/{}/activity/{}/learner/{}/request/'.format(
+            vle_id,
+            course_id,
+            activity_id,
+            str(learner_id))
+        if instrument is not None:
+            url = '{}?instruments={}'.format(url, instrument)
+        return self._connector.iter_results(url, page_size, workers, prefetch)
+
+
+class AsyncVleCourseActivityResultsClient(VleCourseActivityResultsClient):
+    """
+        VLE Course Activity results asynchronous client class. Methods are inherited from the synchronous client and
+        return the awaitables provided by the AsyncConnector.
+    """
@@ -13,8 +13,9 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Activity client module """
-from .activity import VleCourseActivityClient
-from .learner import VleCourseLearnerClient
+from tesla_ce_client.utils import single_result
+from .activity import VleCourseActivityClient, AsyncVleCourseActivityClient
+from .learner import VleCourseLearnerClient, AsyncVleCourseLearnerClient
 
 
 class VleCourseClient():
@@ -73,10 +74,8 @@ class VleCourseClient():
         """
         if vle_id is None:
             vle_id = self._connector.get_vle_id()
-        result = self._connector.get('api/v2/vle/{}/course/?vle_course_id={}'.format(vle_id, vle_course_id))
-        if result['count'] == 1:
-            return result['results'][0]
-        return None
+        result = self._connector.lookup('api/v2/vle/{}/course/?vle_course_id={}'.format(vle_id, vle_course_id))
+        return single_result(result)
 
     def list(self, vle_id=None):
         """
@@ -91,6 +90,25 @@ class VleCourseClient():
             vle_id = self._connector.get_vle_id()
         return self._connector.get('api/v2/vle/{}/course/'.format(vle_id))
 
+    def iter_list(self, vle_id=None, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over all the courses, requesting the pages lazily
+
+            :param vle_id: Identifier of the vle. If not provided take it from module configuration
+            :type vle_id: int
+            :param page_size: Number of courses requested on each page
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Courses
+            :rtype: generator
+        """
+        if vle_id is None:
+            vle_id = self._connector.get_vle_id()
+        return self._connector.iter_results('api/v2/vle/{}/course/'.format(vle_id), page_size, workers, prefetch)
+
     def create(self, vle_course_id, code, description, start=None, end=None, vle_id=None):
         """
             Create a new course
@@ -120,3 +138,32 @@ class VleCourseClient():
             "start": start,
             "end": end
         })
+
+
+class AsyncVleCourseClient(VleCourseClient):
+    """
+        VLE Course asynchronous client class. Methods not redefined here are inherited from the synchronous client and
+        return the awaitables provided by the AsyncConnector.
+    """
+
+    @property
+    def activity(self):
+        """
+            Access to the VLE course activity related methods
+            :return: Activity controller object
+            :rtype: AsyncVleCourseActivityClient
+        """
+        if self._activity is None:
+            self._activity = AsyncVleCourseActivityClient(self._connector)
+        return self._activity
+
+    @property
+    def learner(self):
+        """
+            Access to the VLE course learner related methods
+            :return: Learner controller object
+            :rtype: AsyncVleCourseLearnerClient
+        """
+        if self._learner is None:
+            self._learner = AsyncVleCourseLearnerClient(self._connector)
+        return self._learner
@@ -13,9 +13,10 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Activities cLient package """
-from .client import VleCourseLearnerClient
+from .client import VleCourseLearnerClient, AsyncVleCourseLearnerClient
 
 __all__ = [
     "VleCourseLearnerClient",
+    "AsyncVleCourseLearnerClient",
 ]
 
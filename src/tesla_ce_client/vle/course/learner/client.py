@@ -13,6 +13,7 @@
 #      You should have received a copy of the GNU Affero General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """ TeSLA CE VLE Course Learner client module """
+from tesla_ce_client.utils import single_result
 
 
 class VleCourseLearnerClient():
@@ -44,6 +45,28 @@ class VleCourseLearnerClient():
             vle_id = self._connector.get_vle_id()
         return self._connector.get('api/v2/vle/{}/course/{}/learner/'.format(vle_id, course_id))
 
+    def iter_list(self, course_id, vle_id=None, page_size=None, workers=None, prefetch=False):
+        """
+            Iterate over all the learners of a course, requesting the pages lazily
+
+            :param course_id: Identifier of the course.
+            :type course_id: str
+            :param vle_id: Identifier of the vle. If not provided take it from module configuration
+            :type vle_id: int
+            :param page_size: Number of learners requested on each page
+            :type page_size: int
+            :param workers: Maximum number of pages requested concurrently
+            :type workers: int
+            :param prefetch: Whether to request next page while current one is consumed
+            :type prefetch: bool
+            :return: Learners
+            :rtype: generator
+        """
+        if vle_id is None:
+            vle_id = self._connector.get_vle_id()
+        return self._connector.iter_results('api/v2/vle/{}/course/{}/learner/'.format(vle_id, course_id),
+                                            page_size, workers, prefetch)
+
     def get(self, course_id, learner_id, vle_id=None):
         """
             Get a learner
@@ -76,14 +99,10 @@ class VleCourseLearnerClient():
         """
         if vle_id is None:
             vle_id = self._connector.get_vle_id()
-        result = self._connector.get('api/v2/vle/{}/course/{}/learner/?uid={}'.format(
+        result = self._connector.lookup('api/v2/vle/{}/course/{}/learner/?uid={}'.format(
             vle_id, course_id, uid)
         )
-
-        if result['count'] == 1:
-            return result['results'][0]
-
-        return None
+        return single_result(result)
 
     def find_by_mail(self, course_id, mail, vle_id=None):
         """
@@ -100,14 +119,10 @@ class VleCourseLearnerClient():
         """
         if vle_id is None:
             vle_id = self._connector.get_vle_id()
-        result = self._connector.get('api/v2/vle/{}/course/{}/learner/?mail={}'.format(
+        result = self._connector.lookup('api/v2/vle/{}/course/{}/learner/?mail={}'.format(
             vle_id, course_id, mail)
         )
-
-        if result['count'] == 1:
-            return result['results'][0]
-
-        return None
+        return single_result(result)
 
     def find_by_lerner_id(self, course_id, learner_id, vle_id=None):
         """
@@ -124,12 +139,14 @@ class VleCourseLearnerClient():
         """
         if vle_id is None:
             vle_id = self._connector.get_vle_id()
-        result = self._connector.get('api/v2/vle/{}/course/{}/learner/?lerner_id={}'.format(
+        result = self._connector.lookup('api/v2/vle/{}/course/{}/learner/?lerner_id={}'.format(
             vle_id, course_id, str(learner_id))
         )
+        return single_result(result)
 
-        if result['count'] == 1:
-            return result['results'][0]
-
-        return None
 
+class AsyncVleCourseLearnerClient(VleCourseLearnerClient):
+    """
+        VLE Course Learner asynchronous client class. Methods are inherited from the synchronous client and return
+        the awaitables provided by the AsyncConnector.
+    """
@@ -0,0 +1,352 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for the asynchronous client """
+import asyncio
+import pytest
+from tesla_ce_client import AsyncClient, Outbox
+from tesla_ce_client.provider.enrolment import SampleValidationStatus
+from tesla_ce_client.provider.verification import RequestResultStatus
+from tests.utils import get_auth_data
+
+web = pytest.importorskip('aiohttp.web')
+
+
+async def _start_api(routes):
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, 'http://127.0.0.1:{}'.format(port)
+
+
+def test_async_client():
+    async def auth(request):
+        return web.json_response(get_auth_data(vle_id=3))
+
+    async def courses(request):
+        assert request.headers['Authorization'].startswith('JWT ')
+        return web.json_response({'count': 1, 'results': [{'id': 5, 'vle_course_id': request.query['vle_course_id']}]})
+
+    async def unlock(request):
+        return web.Response(status=204)
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.get('/api/v2/vle/3/course/', courses),
+            web.post('/api/v2/provider/1/enrolment/learner/unlock/', unlock),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret') as client:
+                results = await asyncio.gather(*[client.vle.course.find_by_vle_id(idx) for idx in range(20)])
+                assert [course['vle_course_id'] for course in results] == [str(idx) for idx in range(20)]
+                assert await client.provider.enrolment.unlock_model(1, 'learner', 'task') is None
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_async_client_sync_context():
+    with pytest.raises(TypeError):
+        with AsyncClient('https://localhost', 'test-role', 'test-secret'):
+            pass
+
+
+def test_async_coalesce_requests():
+    calls = []
+
+    async def auth(request):
+        return web.json_response(get_auth_data(vle_id=3))
+
+    async def instruments(request):
+        calls.append(request.path)
+        await asyncio.sleep(0.1)
+        return web.json_response({'count': 0, 'results': []})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.get('/api/v2/vle/3/course/1/activity/2/instrument/', instruments),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret', coalesce_requests=True) as client:
+                results = await asyncio.gather(*[client.vle.course.activity.get_instruments(1, 2) for _ in range(50)])
+                assert all(result == {'count': 0, 'results': []} for result in results)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_async_coalesce_requests_cancel():
+    calls = []
+
+    async def auth(request):
+        return web.json_response(get_auth_data(vle_id=3))
+
+    async def instruments(request):
+        calls.append(request.path)
+        await asyncio.sleep(0.1)
+        return web.json_response({'count': 0, 'results': []})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.get('/api/v2/vle/3/course/1/activity/2/instrument/', instruments),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret', coalesce_requests=True) as client:
+                leader = asyncio.ensure_future(client.vle.course.activity.get_instruments(1, 2))
+                await asyncio.sleep(0.02)
+                followers = [asyncio.ensure_future(client.vle.course.activity.get_instruments(1, 2))
+                             for _ in range(5)]
+                await asyncio.sleep(0.02)
+
+                # Only the cancelled task fails, and the request is sent again once for the waiting tasks
+                leader.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await leader
+                results = await asyncio.gather(*followers)
+                assert all(result == {'count': 0, 'results': []} for result in results)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_async_iter_samples():
+    async def auth(request):
+        return web.json_response(get_auth_data(provider_id=1))
+
+    async def samples(request):
+        return web.json_response({'count': 4, 'next': None, 'results': [{'id': idx} for idx in range(4)]})
+
+    async def sample(request):
+        await asyncio.sleep(0.01 * (4 - int(request.match_info['sample_id'])))
+        return web.json_response({'id': int(request.match_info['sample_id'])})
+
+    async def validations(request):
+        return web.json_response({'count': 0, 'results': []})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.get('/api/v2/provider/1/enrolment/learner/available_samples/', samples),
+            web.get('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/', sample),
+            web.get('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/validation/', validations),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret') as client:
+                results = [sample async for sample in client.provider.enrolment.iter_samples(1, 'learner', workers=4)]
+                assert sorted(result['id'] for result in results) == list(range(4))
+                assert results[0]['id'] == 3
+                assert all(result['validations'] == {'count': 0, 'results': []} for result in results)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_async_iter_samples_streaming():
+    pages = []
+
+    async def auth(request):
+        return web.json_response(get_auth_data(provider_id=1))
+
+    async def samples(request):
+        page = int(request.query.get('page', 1))
+        pages.append(page)
+        next_url = None
+        if page == 1:
+            next_url = str(request.url.with_query(page=2))
+        return web.json_response({'count': 4, 'next': next_url,
+                                  'results': [{'id': idx} for idx in range(2 * (page - 1), 2 * page)]})
+
+    async def sample(request):
+        return web.json_response({'id': int(request.match_info['sample_id'])})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.get('/api/v2/provider/1/enrolment/learner/available_samples/', samples),
+            web.get('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/', sample),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret') as client:
+                samples_iter = client.provider.enrolment.iter_samples(1, 'learner', workers=1, validations=False,
+                                                                      ordered=True)
+                # The list is read as samples are fetched, not before
+                assert (await samples_iter.__anext__())['id'] == 0
+                assert pages == [1]
+                assert [sample['id'] async for sample in samples_iter] == [1, 2, 3]
+                assert pages == [1, 2]
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_async_result_submitter():
+    calls = []
+
+    async def auth(request):
+        return web.json_response(get_auth_data(provider_id=1))
+
+    async def result(request):
+        await asyncio.sleep(0.01)
+        calls.append(request.path)
+        return web.json_response({'id': int(request.match_info['request_id'])})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.put('/api/v2/provider/1/request/{request_id}/', result),
+            web.post('/api/v2/provider/1/request/{request_id}/status/', result),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret') as client:
+                async with client.provider.verification.submitter(workers=3) as submitter:
+                    futures = []
+                    for request_id in range(6):
+                        futures.append(await submitter.submit_result(1, request_id, {'result': 1}))
+                        futures.append(await submitter.submit_status(1, request_id, RequestResultStatus.PROCESSED))
+                    assert await submitter.flush(timeout=5)
+                    assert (await futures[4]) == {'id': 2}
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert len(calls) == 12
+    for request_id in range(6):
+        assert calls.index('/api/v2/provider/1/request/{}/'.format(request_id)) < calls.index(
+            '/api/v2/provider/1/request/{}/status/'.format(request_id))
+
+
+def test_async_validation_submitter_coalesce():
+    calls = []
+
+    async def auth(request):
+        return web.json_response(get_auth_data(provider_id=1))
+
+    async def validation(request):
+        calls.append((request.path, await request.json()))
+        return web.json_response({})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.put('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/validation/1/', validation),
+            web.post('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/validation/1/status/', validation),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret') as client:
+                async with client.provider.enrolment.submitter(workers=2, coalesce_window=0.05) as submitter:
+                    for sample_id in range(3):
+                        await submitter.submit_validation_status(1, 'learner', sample_id, 1,
+                                                                 SampleValidationStatus.VALIDATING)
+                        await submitter.submit_validation_status(1, 'learner', sample_id, 1,
+                                                                 SampleValidationStatus.WAITING_EXTERNAL_SERVICE)
+                        await submitter.submit_validation(1, 'learner', sample_id, 1, {'status': 1})
+                        await submitter.submit_validation_status(1, 'learner', sample_id, 1,
+                                                                 SampleValidationStatus.VALIDATING)
+                        await submitter.submit_validation_status(1, 'learner', sample_id, 1,
+                                                                 SampleValidationStatus.VALID)
+                    await asyncio.sleep(0.2)
+                    assert submitter.stats['pending'] == 0
+                    assert submitter.stats['coalesced'] == 6
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert len(calls) == 9
+    for sample_id in range(3):
+        url = '/api/v2/provider/1/enrolment/learner/sample/{}/validation/1/'.format(sample_id)
+        assert [call for call in calls if call[0].startswith(url)] == [
+            (url + 'status/', {'status': SampleValidationStatus.WAITING_EXTERNAL_SERVICE.value}),
+            (url, {'status': 1}),
+            (url + 'status/', {'status': SampleValidationStatus.VALID.value}),
+        ]
+
+
+def test_async_set_sample_validations_connection_error():
+    aiohttp = pytest.importorskip('aiohttp')
+
+    async def auth(request):
+        return web.json_response(get_auth_data(provider_id=1))
+
+    async def validation(request):
+        if request.match_info['sample_id'] == '1':
+            request.transport.close()
+        return web.json_response({'url': request.path})
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.put('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/validation/{validation_id}/', validation),
+            web.post('/api/v2/provider/1/enrolment/learner/sample/{sample_id}/validation/{validation_id}/status/',
+                     validation),
+        ])
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret') as client:
+                return await client.provider.enrolment.set_sample_validations(1, [
+                    ('learner', idx, idx * 10, {'valid': True}, SampleValidationStatus.VALID) for idx in range(3)
+                ], workers=2)
+        finally:
+            await runner.cleanup()
+
+    outcomes = asyncio.run(run())
+    assert isinstance(outcomes[1]['error'], aiohttp.ClientError)
+    assert outcomes[1]['result'] is None
+    assert outcomes[0]['error'] is None and outcomes[2]['error'] is None
+
+
+def test_async_outbox(tmp_path):
+    calls = []
+
+    async def auth(request):
+        return web.json_response(get_auth_data(provider_id=1))
+
+    async def result(request):
+        body = await request.json()
+        if len(calls) == 0 and body['result'] == 1:
+            calls.append(None)
+            return web.Response(status=503)
+        calls.append(body)
+        return web.json_response(body)
+
+    async def run():
+        runner, api_url = await _start_api([
+            web.post('/api/v2/auth/approle', auth),
+            web.put('/api/v2/provider/1/request/{request_id}/', result),
+        ])
+        outbox = Outbox(str(tmp_path / 'outbox.db'), replay_interval=0)
+        try:
+            async with AsyncClient(api_url, 'test-role', 'test-secret', outbox=outbox) as client:
+                verification = client.provider.verification
+                assert await verification.set_provider_request_result(1, 1, {'result': 1}) is None
+                assert await verification.set_provider_request_result(1, 1, {'result': 2}) == {'result': 2}
+                assert outbox.stats == {'stored': 1, 'replayed': 1, 'failed': 0, 'pending': 0}
+        finally:
+            outbox.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert calls == [None, {'result': 1}, {'result': 2}]
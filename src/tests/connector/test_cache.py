@@ -0,0 +1,144 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for connector caches """
+import os
+import tempfile
+import mock
+import requests
+from tesla_ce_client import Client, ResponseCache, LookupCache, BlobCache
+from tesla_ce_client.connector import Connector
+from tests.utils import get_auth_data, get_response
+
+
+def test_response_cache():
+    cache = ResponseCache(max_entries=1)
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [
+            get_response(data=get_auth_data(vle_id=1)),
+            get_response(data={'id': 1}, headers={'ETag': '"v1"'}),
+            get_response(304),
+            get_response(data={'id': 2}, headers={'Last-Modified': 'Wed, 21 Oct 2020 07:28:00 GMT'}),
+            get_response(data={'id': 1}, headers={'ETag': '"v2"'}),
+        ]
+        connector = Connector('https://localhost', 'test-role', 'test-secret', http_cache=cache)
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+        assert request_mock.call_args[1]['headers']['If-None-Match'] == '"v1"'
+
+        # Adding a second entry evicts the first one
+        assert connector.get('/api/v2/vle/2/') == {'id': 2}
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+        assert 'If-None-Match' not in request_mock.call_args[1]['headers']
+
+    assert cache.stats == {'hits': 1, 'misses': 3, 'evictions': 2, 'entries': 1}
+
+
+def test_response_cache_invalidated_during_request():
+    cache = ResponseCache()
+
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(vle_id=1))
+        if 'If-None-Match' in kwargs['headers']:
+            # The entry is removed while the server answers
+            cache.invalidate()
+            return get_response(304)
+        return get_response(data={'id': 1}, headers={'ETag': '"v1"'})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=_api):
+        connector = Connector('https://localhost', 'test-role', 'test-secret', http_cache=cache)
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+    assert cache.stats['hits'] == 1
+
+
+def test_lookup_cache():
+    cache = LookupCache(ttl=60)
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [
+            get_response(data=get_auth_data(vle_id=1)),
+            get_response(data={'count': 0, 'results': []}),
+            get_response(data={'id': 3}),
+            get_response(data={'count': 1, 'results': [{'id': 3}]}),
+        ]
+        client = Client('https://localhost', 'test-role', 'test-secret', lookup_cache=cache)
+        assert client.vle.course.find_by_vle_id('C1') is None
+        assert client.vle.course.find_by_vle_id('C1') is None
+        assert request_mock.call_count == 2
+
+        # Creating a course invalidates the lookups on courses
+        client.vle.course.create('C1', 'C1', 'Course 1')
+        assert client.vle.course.find_by_vle_id('C1') == {'id': 3}
+        assert client.vle.course.find_by_vle_id('C1') == {'id': 3}
+        assert request_mock.call_count == 4
+
+    assert cache.stats == {'hits': 2, 'misses': 2, 'evictions': 0, 'invalidations': 1, 'entries': 1}
+
+
+def test_blob_cache():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = BlobCache(cache_dir, max_size=2500, mmap_threshold=1000)
+        assert cache.get('a') is None
+        cache.set('a', b'x' * 1000, '"etag-a"')
+        cache.set('b', b'y' * 10)
+        content, etag = cache.get_entry('a')
+        assert isinstance(content, memoryview)
+        assert content == b'x' * 1000
+        assert etag == '"etag-a"'
+        assert cache.get_entry('b') == (b'y' * 10, None)
+
+        # Least recently used entries are evicted
+        os.utime(cache._get_path('a'), (1, 1))
+        cache.set('c', b'z' * 1500)
+        assert cache.get('a') is None
+        assert cache.get('b') == b'y' * 10
+        assert cache.stats['evictions'] == 1
+
+        # Other cache instances on the same directory share the entries
+        assert BlobCache(cache_dir).get('c') == b'z' * 1500
+        assert BlobCache.get_key('https://storage/models/1?X-Amz-Signature=abc') == 'https://storage/models/1'
+
+
+def test_blob_cache_scan():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Temporary files of interrupted writes are removed when the directory is scanned
+        stale_path = os.path.join(cache_dir, '.tmp-stale')
+        with open(stale_path, 'wb') as stale_file:
+            stale_file.write(b'x' * 100)
+        os.utime(stale_path, (1, 1))
+        cache = BlobCache(cache_dir, max_size=2500)
+        assert not os.path.exists(stale_path)
+        assert cache.stats['scans'] == 1
+
+        # Writes within the maximum size do not scan the directory
+        cache.set('a', b'x' * 1000)
+        cache.set('a', b'x' * 500)
+        cache.set('b', b'y' * 1000)
+        assert cache.stats['scans'] == 1
+        assert cache.stats['size'] == 1502
+        cache.invalidate('b')
+        assert cache.stats['size'] == 501
+
+        cache.set('c', b'z' * 2100)
+        assert cache.stats['scans'] == 2
+        assert cache.stats['size'] <= 2500
+
+        # Files written by other processes are found by the periodic scan
+        cache.rescan_interval = 0
+        BlobCache(cache_dir).set('d', b'w' * 10)
+        cache.set('e', b'v' * 10)
+        assert cache.stats['scans'] == 3
+        assert cache.stats['size'] == sum(os.path.getsize(os.path.join(directory, name))
+                                          for directory, _, files in os.walk(cache_dir) for name in files)
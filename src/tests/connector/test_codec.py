@@ -0,0 +1,112 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for JSON codecs and request compression """
+import gzip
+import mock
+import pytest
+import requests
+from tesla_ce_client import Client
+from tesla_ce_client import exception
+from tesla_ce_client.codec import get_codec, CODECS
+from tesla_ce_client.provider.serializer import get_model_serializer
+from tests.utils import get_auth_data, get_response
+
+
+def _installed_codecs():
+    names = []
+    for name in CODECS:
+        try:
+            get_codec(name)
+        except exception.TeslaConfigException:
+            continue
+        names.append(name)
+    return names
+
+
+@pytest.mark.parametrize('name', _installed_codecs())
+def test_codec_round_trip(name):
+    codec = get_codec(name)
+    assert codec.name == name
+    data = {'id': 1, 'name': 'Çàlid', 'values': [0.5, None, True], 'nested': {'empty': []}}
+    encoded = codec.dumps(data)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == data
+    assert codec.loads(encoded.decode('utf-8')) == data
+
+
+@pytest.mark.parametrize('name', _installed_codecs())
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), -float('inf')])
+def test_codec_non_finite(name, value):
+    codec = get_codec(name)
+    with pytest.raises(ValueError):
+        codec.dumps({'model': {'features': [0.5, value]}}, strict=True)
+    with pytest.raises(ValueError):
+        b''.join(codec.iterdumps([[1, 2], {'value': value}], strict=True))
+    assert codec.loads(codec.dumps([1e308, 1e308], strict=True)) == [1e308, 1e308]
+
+    # Models are always checked
+    with pytest.raises(ValueError):
+        get_model_serializer('json', codec).dumps({'features': [[0.5, value]]})
+
+
+@pytest.mark.parametrize('name', _installed_codecs())
+def test_codec_numpy(name):
+    numpy = pytest.importorskip('numpy')
+    codec = get_codec(name)
+    for value in [numpy.arange(3, dtype=numpy.float32), numpy.int64(1)]:
+        with pytest.raises(TypeError):
+            codec.dumps({'features': [value]})
+    assert codec.loads(codec.dumps({'features': numpy.arange(3).tolist()})) == {'features': [0, 1, 2]}
+
+
+def test_unknown_codec():
+    with pytest.raises(exception.TeslaConfigException):
+        get_codec('unknown')
+
+
+def test_connector_codec():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [get_response(data=get_auth_data(vle_id=1)), get_response(data={'id': 3})]
+        client = Client('https://localhost', 'test-role', 'test-secret', codec='json')
+        assert client._connector.codec.name == 'json'
+        assert client.vle.course.create('c1', 'code', 'Course') == {'id': 3}
+        kwargs = request_mock.call_args_list[1][1]
+        assert kwargs['headers']['Content-Type'] == 'application/json'
+        assert client._connector.codec.loads(kwargs['data']) == {
+            'vle_course_id': 'c1', 'code': 'code', 'description': 'Course', 'start': None, 'end': None
+        }
+
+
+def test_request_compression():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [get_response(data=get_auth_data(vle_id=1))] + [get_response(data={'id': 3})] * 2
+        client = Client('https://localhost', 'test-role', 'test-secret', compression='gzip', compression_threshold=200)
+        client.vle.course.create('c1', 'code', 'Course')
+        headers = request_mock.call_args_list[1][1]['headers']
+        assert 'Content-Encoding' not in headers
+        assert 'Accept-Encoding' not in headers
+
+        client.vle.course.create('c1', 'code', 'x' * 1000)
+        kwargs = request_mock.call_args_list[2][1]
+        assert kwargs['headers']['Content-Encoding'] == 'gzip'
+        assert client._connector.codec.loads(gzip.decompress(kwargs['data']))['description'] == 'x' * 1000
+
+
+def test_disable_compressed_responses():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [get_response(data=get_auth_data(vle_id=1)), get_response(data={'id': 3})]
+        client = Client('https://localhost', 'test-role', 'test-secret', accept_compressed=False)
+        client.vle.course.list()
+        assert request_mock.call_args_list[1][1]['headers']['Accept-Encoding'] == 'identity'
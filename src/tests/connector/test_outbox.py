@@ -0,0 +1,160 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for the durable outbox """
+import datetime
+import json
+import os
+import tempfile
+import mock
+import pytest
+import requests
+from tesla_ce_client import Client, Outbox
+from tesla_ce_client import exception
+from tesla_ce_client.provider.enrolment import SampleValidationStatus
+from tests.utils import get_auth_data, get_response
+
+
+class _FakeApi():
+    """
+        Fake API that can be unreachable, storing the received writes
+    """
+    def __init__(self):
+        self.available = False
+        self.calls = []
+
+    def __call__(self, method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        if not self.available:
+            raise requests.ConnectionError('API unreachable')
+        body = json.loads(kwargs['data'])
+        self.calls.append((method, url, body))
+        if body.get('invalid'):
+            return get_response(400)
+        if body.get('broken'):
+            return get_response(500)
+        return get_response(data=body)
+
+
+def test_outbox():
+    api = _FakeApi()
+    with tempfile.TemporaryDirectory() as path:
+        db_path = os.path.join(path, 'outbox.db')
+        with mock.patch.object(requests.Session, 'request', side_effect=api):
+            client = Client('https://localhost', 'test-role', 'test-secret', outbox=Outbox(db_path, replay_interval=0))
+            verification = client.provider.verification
+            assert verification.set_provider_request_result(1, 10, {'result': 0.1}) is None
+            assert verification.set_provider_request_result(1, 10, {'result': 0.2}) is None
+            assert verification.set_provider_request_result(1, 11, {'invalid': True}) is None
+            assert client.provider.enrolment.set_sample_validation(1, 'learner', 5, 2, {'status': 1}) is None
+            assert client.provider.notification.update_or_create(1, 'key', datetime.datetime(2020, 1, 1)) is None
+            assert len(client._connector.outbox) == 5
+            client._connector.outbox.close()
+
+            # Stored writes are kept until the API is back
+            outbox = Outbox(db_path, replay_interval=0)
+            client = Client('https://localhost', 'test-role', 'test-secret', outbox=outbox)
+            assert len(outbox) == 5
+            api.available = True
+
+            # Stored writes are sent before new ones, in order
+            verification = client.provider.verification
+            assert verification.set_provider_request_result(1, 10, {'result': 0.3}) == {'result': 0.3}
+            assert [body for method, url, body in api.calls if url.endswith('/request/10/')] == [
+                {'result': 0.1}, {'result': 0.2}, {'result': 0.3}]
+            assert len(api.calls) == 6
+            assert outbox.stats == {'stored': 0, 'replayed': 4, 'failed': 1, 'pending': 0}
+
+            # Writes rejected by the API are kept apart
+            failed = outbox.get_failed()
+            assert [(write['url'], json.loads(write['body'])) for write in failed] == [
+                ('https://localhost/api/v2/provider/1/request/11/', {'invalid': True})]
+            outbox.remove_failed()
+            assert outbox.get_failed() == []
+
+            # Errors that are not related to the API availability are raised
+            with pytest.raises(exception.BadRequestException):
+                verification.set_provider_request_result(1, 11, {'invalid': True})
+            outbox.close()
+
+
+def test_outbox_order():
+    api = _FakeApi()
+    with tempfile.TemporaryDirectory() as path:
+        with mock.patch.object(requests.Session, 'request', side_effect=api):
+            outbox = Outbox(os.path.join(path, 'outbox.db'), replay_interval=3600)
+            client = Client('https://localhost', 'test-role', 'test-secret', outbox=outbox)
+            enrolment = client.provider.enrolment
+            assert enrolment.set_sample_validation(1, 'learner', 5, 2, {'valid': True}) is None
+            assert client._connector.replay_outbox() == 0
+            api.available = True
+
+            # The status is stored after the pending result of the same sample, while other samples are sent
+            assert enrolment.set_sample_validation_status(1, 'learner', 5, 2, SampleValidationStatus.VALID) is None
+            assert enrolment.set_sample_validation_status(1, 'learner', 6, 2, SampleValidationStatus.VALID) == {
+                'status': SampleValidationStatus.VALID.value}
+            assert len(outbox) == 2
+
+            # Stored bodies are serialized with the connector codec
+            assert outbox.get_batch()[0][0][3] == client._connector.codec.dumps({'valid': True})
+
+            assert client._connector.replay_outbox() == 2
+            sample_url = 'https://localhost/api/v2/provider/1/enrolment/learner/sample/5/validation/2/'
+            assert [(url, body) for method, url, body in api.calls][1:] == [
+                (sample_url, {'valid': True}),
+                (sample_url + 'status/', {'status': SampleValidationStatus.VALID.value}),
+            ]
+            outbox.close()
+
+
+def test_outbox_max_attempts():
+    api = _FakeApi()
+    with tempfile.TemporaryDirectory() as path:
+        with mock.patch.object(requests.Session, 'request', side_effect=api):
+            outbox = Outbox(os.path.join(path, 'outbox.db'), replay_interval=3600, max_attempts=2)
+            client = Client('https://localhost', 'test-role', 'test-secret', outbox=outbox)
+            verification = client.provider.verification
+            assert verification.set_provider_request_result(1, 10, {'broken': True}) is None
+            assert verification.set_provider_request_result(1, 10, {'result': 0.1}) is None
+            api.available = True
+
+            # A write answered with server errors is failed after the maximum attempts, unblocking its resource
+            assert client._connector.replay_outbox() == 0
+            assert len(outbox) == 2
+            assert client._connector.replay_outbox() == 0
+            assert len(outbox) == 1
+            assert client._connector.replay_outbox() == 1
+            assert [body for method, url, body in api.calls] == [{'broken': True}, {'broken': True}, {'result': 0.1}]
+            failed = outbox.get_failed()
+            assert [(write['attempts'], json.loads(write['body'])) for write in failed] == [(2, {'broken': True})]
+            assert outbox.stats == {'stored': 2, 'replayed': 1, 'failed': 1, 'pending': 0}
+            outbox.close()
+
+
+def test_outbox_shared():
+    with tempfile.TemporaryDirectory() as path:
+        db_path = os.path.join(path, 'outbox.db')
+        outbox = Outbox(db_path, replay_interval=0)
+        other_outbox = Outbox(db_path, replay_interval=0)
+        assert not other_outbox.has_pending('https://localhost/request/1/')
+        assert not other_outbox.replay_due()
+
+        # Writes stored by other processes are seen
+        outbox.add('put', 'https://localhost/request/1/', b'{}')
+        assert other_outbox.has_pending('https://localhost/request/1/')
+        assert other_outbox.replay_due()
+        assert len(other_outbox) == 1
+        outbox.close()
+        other_outbox.close()
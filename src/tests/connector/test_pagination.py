@@ -0,0 +1,122 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for paginated lists """
+import json
+from urllib.parse import urlsplit, parse_qs
+import mock
+import pytest
+import requests
+from tesla_ce_client import Client
+from tesla_ce_client.streaming import JsonArrayParser
+from tests.utils import get_auth_data, get_response
+
+NUM_LEARNERS = 23
+
+
+def _paginated_api(method, url, **kwargs):
+    """
+        Fake API with a paginated list of learners using limit and offset parameters
+    """
+    if url.endswith('/api/v2/auth/approle'):
+        return get_response(data=get_auth_data(vle_id=1))
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    limit = int(query.get('limit', [10])[0])
+    offset = int(query.get('offset', [0])[0])
+    next_url = None
+    if offset + limit < NUM_LEARNERS:
+        next_url = 'https://localhost{}?limit={}&offset={}'.format(parts.path, limit, offset + limit)
+    return get_response(data={
+        'count': NUM_LEARNERS,
+        'next': next_url,
+        'previous': None,
+        'results': [{'id': idx} for idx in range(offset, min(offset + limit, NUM_LEARNERS))]
+    })
+
+
+def test_iter_list():
+    with mock.patch.object(requests.Session, 'request', side_effect=_paginated_api) as request_mock:
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        learners = client.vle.course.learner.iter_list(5, page_size=5)
+        assert next(learners) == {'id': 0}
+        assert request_mock.call_count == 2
+        assert [learner['id'] for learner in learners] == list(range(1, NUM_LEARNERS))
+        assert request_mock.call_count == 6
+        assert request_mock.call_args_list[1][1]['url'] == 'https://localhost/api/v2/vle/1/course/5/learner/?limit=5'
+
+
+def test_iter_list_concurrent():
+    with mock.patch.object(requests.Session, 'request', side_effect=_paginated_api) as request_mock:
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        learners = client.vle.course.learner.iter_list(5, page_size=4, workers=3)
+        assert [learner['id'] for learner in learners] == list(range(NUM_LEARNERS))
+        assert request_mock.call_count == 7
+
+        learners = client.vle.course.learner.iter_list(5, page_size=4, prefetch=True)
+        assert [learner['id'] for learner in learners] == list(range(NUM_LEARNERS))
+        assert request_mock.call_count == 13
+
+
+def _streamed_api(method, url, **kwargs):
+    """
+        Fake API returning the paginated list in small chunks when streaming is requested
+    """
+    resp = _paginated_api(method, url, **kwargs)
+    content = resp.content
+    resp.iter_content.side_effect = lambda chunk_size: (content[pos:pos + 7] for pos in range(0, len(content), 7))
+    return resp
+
+
+def test_stream_results():
+    with mock.patch.object(requests.Session, 'request', side_effect=_streamed_api) as request_mock:
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        learners = client._connector.stream_results('/api/v2/vle/1/course/5/learner/', page_size=10)
+        assert [learner['id'] for learner in learners] == list(range(NUM_LEARNERS))
+        assert request_mock.call_count == 4
+        assert request_mock.call_args_list[1][1]['stream'] is True
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 100000])
+def test_json_array_parser(chunk_size):
+    document = {
+        'count': 5,
+        'next': None,
+        'note': 'quoted \\" [braces} and \u00e7\u00e0',
+        'results': [{'id': 1, 'name': 'a "b" \\', 'tags': ['[', '{']}, None, 12.5e3, 'txt \u20ac',
+                    {'model': [[idx * 0.5, -idx] for idx in range(200)]}],
+        'last': True,
+    }
+    data = json.dumps(document, ensure_ascii=False).encode('utf-8')
+    parser = JsonArrayParser()
+    items = []
+    for pos in range(0, len(data), chunk_size):
+        items.extend(parser.feed(data[pos:pos + chunk_size]))
+    items.extend(parser.close())
+    assert items == document['results']
+    assert parser.fields == {key: value for key, value in document.items() if key != 'results'}
+
+
+def test_json_array_parser_large_item():
+    data = json.dumps({'results': [{'model': [[0.5] * 100 for _ in range(1000)]}]}).encode('utf-8')
+    parser = JsonArrayParser()
+    with mock.patch.object(parser, '_decoder', wraps=parser._decoder) as decoder_mock:
+        items = []
+        for pos in range(0, len(data), 1000):
+            items.extend(parser.feed(data[pos:pos + 1000]))
+        items.extend(parser.close())
+
+    # Large items are decoded once they are complete, not for every chunk
+    assert len(items) == 1
+    assert decoder_mock.raw_decode.call_count == 2
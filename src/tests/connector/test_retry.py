@@ -0,0 +1,120 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for connector retry policy and circuit breaker """
+import time
+import pytest
+import mock
+import requests
+from tesla_ce_client import RetryPolicy, CircuitBreaker
+from tesla_ce_client.connector import Connector
+from tesla_ce_client.exception import InternalException, CircuitOpenException
+from tests.utils import get_auth_data, get_response
+
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(max_attempts=3, backoff_factor=1, jitter=False, total_timeout=10)
+    assert policy.get_delay('get', 1, 0, 503) == 1
+    assert policy.get_delay('get', 2, 0, 502) == 2
+    assert policy.get_delay('get', 3, 0, 502) is None
+    assert policy.get_delay('post', 1, 0, 503) is None
+    assert policy.get_delay('post', 1, 0) is None
+    assert policy.get_delay('post', 1, 0, 429, '5') == 5
+    assert policy.get_delay('get', 1, 8, 503, '5') is None
+    assert policy.get_delay('get', 1, 0, 404) is None
+    assert policy.stats == {'retries': 3, 'retried_requests': 2, 'exhausted': 2}
+
+
+def test_connector_retry():
+    policy = RetryPolicy(max_attempts=3, backoff_factor=0, jitter=False)
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [
+            get_response(data=get_auth_data()),
+            requests.ConnectionError(),
+            get_response(503, headers={'Retry-After': '0'}),
+            get_response(data={'id': 1}),
+            get_response(503),
+            get_response(503),
+            get_response(503),
+        ]
+        connector = Connector('https://localhost/api', 'test-role', 'test-secret', retry_policy=policy)
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+        with pytest.raises(InternalException):
+            connector.get('/api/v2/vle/1/')
+
+    assert connector.retry_policy.stats == {'retries': 4, 'retried_requests': 2, 'exhausted': 1}
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.1)
+    assert breaker.get_endpoint_family('https://tesla/api/v2/provider/3/enrolment/'
+                                       '0f4c5a0e-7d1b-4d3c-9a4e-2b1f0e6c8d7a/sample/12/') == \
+        '/api/v2/provider/{}/enrolment/{}/sample/{}/'
+
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [
+            get_response(data=get_auth_data()),
+            get_response(503),
+            requests.ConnectionError(),
+            get_response(data={'id': 1}),
+            get_response(data={'id': 2}),
+        ]
+        connector = Connector('https://localhost', 'test-role', 'test-secret', circuit_breaker=breaker)
+        with pytest.raises(InternalException):
+            connector.get('/api/v2/provider/1/enrolment/')
+        with pytest.raises(requests.ConnectionError):
+            connector.get('/api/v2/provider/2/enrolment/')
+        assert breaker.get_state('/api/v2/provider/{}/enrolment/') == CircuitBreaker.OPEN
+
+        # Other endpoints are not affected
+        assert connector.get('/api/v2/provider/1/') == {'id': 1}
+        with pytest.raises(CircuitOpenException):
+            connector.get('/api/v2/provider/1/enrolment/')
+
+        # After the recovery timeout a probe is allowed and closes the circuit
+        time.sleep(0.1)
+        assert connector.get('/api/v2/provider/1/enrolment/') == {'id': 2}
+        assert breaker.get_state() == {
+            '/api/v2/provider/{}/enrolment/': CircuitBreaker.CLOSED,
+            '/api/v2/provider/{}/': CircuitBreaker.CLOSED,
+        }
+
+
+def test_circuit_breaker_probe_error():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [
+            get_response(data=get_auth_data()),
+            get_response(503),
+            requests.exceptions.ChunkedEncodingError(),
+            KeyboardInterrupt(),
+            get_response(data={'id': 1}),
+        ]
+        connector = Connector('https://localhost', 'test-role', 'test-secret', circuit_breaker=breaker)
+        with pytest.raises(InternalException):
+            connector.get('/api/v2/provider/1/')
+
+        # A probe failing with an unexpected error opens the circuit again
+        time.sleep(0.05)
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            connector.get('/api/v2/provider/1/')
+        assert breaker.get_state('/api/v2/provider/{}/') == CircuitBreaker.OPEN
+
+        # An interrupted probe is released without a result
+        time.sleep(0.05)
+        with pytest.raises(KeyboardInterrupt):
+            connector.get('/api/v2/provider/1/')
+        assert breaker.get_state('/api/v2/provider/{}/') == CircuitBreaker.HALF_OPEN
+        assert connector.get('/api/v2/provider/1/') == {'id': 1}
+        assert breaker.get_state('/api/v2/provider/{}/') == CircuitBreaker.CLOSED
@@ -0,0 +1,69 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for connector HTTP session management """
+import concurrent.futures
+import time
+import pytest
+import mock
+import requests
+from tesla_ce_client.connector import Connector
+from tesla_ce_client.exception import TeslaConfigException
+from tests.utils import get_auth_data, get_response
+
+
+def test_connector_session_reuse():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [
+            get_response(data=get_auth_data(vle_id=1)),
+            get_response(data={'id': 1}),
+            get_response(data={'id': 2}),
+        ]
+        connector = Connector('https://localhost/api/', 'test-role', 'test-secret', pool_maxsize=4)
+        session = connector.session
+        assert connector.get('/api/v2/vle/1/') == {'id': 1}
+        assert connector.get('/api/v2/vle/2/') == {'id': 2}
+        assert connector.session is session
+        assert request_mock.call_count == 3
+        assert session.adapters['https://']._pool_maxsize == 4
+
+        connector.close()
+        with pytest.raises(TeslaConfigException):
+            connector.get('/api/v2/vle/1/')
+
+
+def test_connector_keepalive_timeout():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.return_value = get_response(data=get_auth_data())
+        with Connector('https://localhost/api', 'test-role', 'test-secret', keepalive_timeout=0) as connector:
+            with mock.patch.object(connector._session.adapters['https://'], 'close') as close_mock:
+                connector.session
+                assert close_mock.called
+
+
+def test_connector_coalesce_requests():
+    def request(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data())
+        time.sleep(0.2)
+        return get_response(data={'url': url})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=request) as request_mock:
+        connector = Connector('https://localhost', 'test-role', 'test-secret', coalesce_requests=True)
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(connector.get, ['/api/v2/vle/1/'] * 8 + ['/api/v2/vle/2/'] * 8))
+        connector.close()
+
+    assert results == [{'url': 'https://localhost/api/v2/vle/1/'}] * 8 + [{'url': 'https://localhost/api/v2/vle/2/'}] * 8
+    assert request_mock.call_count == 3
@@ -0,0 +1,66 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for connector token management """
+import threading
+import time
+import mock
+import requests
+from tesla_ce_client.connector import Connector
+from tests.utils import get_auth_data, get_response
+
+
+def test_token_refresh_single_flight():
+    refresh_calls = []
+
+    def request(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            # Token expiring in one minute, inside the refresh window
+            return get_response(data=get_auth_data(ttl=60))
+        if url.endswith('/api/v2/auth/token/refresh'):
+            refresh_calls.append(url)
+            time.sleep(0.1)
+            return get_response(data=get_auth_data())
+        return get_response(data={'id': 1})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=request):
+        connector = Connector('https://localhost/api', 'test-role', 'test-secret')
+        threads = [threading.Thread(target=connector.get, args=('/api/v2/vle/1/',)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        connector.close()
+
+    assert len(refresh_calls) == 1
+
+
+def test_token_background_renewal():
+    refreshed = threading.Event()
+
+    def request(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(ttl=2))
+        if url.endswith('/api/v2/auth/token/refresh'):
+            refreshed.set()
+            return get_response(data=get_auth_data())
+        return get_response(data={'id': 1})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=request):
+        connector = Connector('https://localhost/api', 'test-role', 'test-secret', token_renewal=True)
+        assert refreshed.wait(5)
+        renewal = connector._token_renewal
+        connector.close()
+        assert not renewal.is_alive()
+        assert not connector._token_needs_refresh()
@@ -0,0 +1,361 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for streaming uploads """
+import email.parser
+import hashlib
+import email.policy
+import http.server
+import asyncio
+import mmap
+import re
+import tempfile
+import threading
+import mock
+import pytest
+import requests
+from tesla_ce_client import AsyncClient, Client, RetryPolicy, BlobCache
+from tesla_ce_client import exception
+from tesla_ce_client.codec import get_codec
+from tesla_ce_client.multipart import MultipartEncoder
+from tesla_ce_client.upload import MultipartUpload, AsyncMultipartUpload
+from tests.utils import get_auth_data, get_response
+
+
+class _StorageHandler(http.server.BaseHTTPRequestHandler):
+    """
+        Fake storage accepting form POST uploads, which returns the last uploaded file on GET requests
+    """
+    protocol_version = 'HTTP/1.1'
+    uploads = []
+    downloads = []
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding') != 'chunked':
+            return self.rfile.read(int(self.headers['Content-Length']))
+        body = b''
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            if size == 0:
+                return body
+
+    def do_POST(self):
+        body = self._read_body()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+        self.uploads.append({
+            'headers': dict(self.headers),
+            'parts': {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                      for part in message.iter_parts()},
+        })
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        content = self.uploads[-1]['parts']['file']
+        etag = '"{}"'.format(hashlib.md5(content).hexdigest())
+        self.downloads.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == etag:
+            content = b''
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class _S3Handler(http.server.BaseHTTPRequestHandler):
+    """
+        Fake S3 compatible storage accepting multipart uploads to part urls. Requests to the parts in failures are
+        rejected the given number of times, with failure_status.
+    """
+    protocol_version = 'HTTP/1.1'
+    parts = {}
+    failures = {}
+    failure_status = 503
+    objects = {}
+
+    def _send(self, status, content=b'', headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        number = int(self.path.rsplit('/', 1)[1])
+        if self.failures.get(number, 0) > 0:
+            self.failures[number] -= 1
+            return self._send(self.failure_status)
+        self.parts[number] = body
+        return self._send(200, headers={'ETag': '"{}"'.format(hashlib.md5(body).hexdigest())})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        numbers = [int(number) for number in re.findall(r'<PartNumber>(\d+)</PartNumber>', body)]
+        etags = re.findall(r'<ETag>([^<]+)</ETag>', body)
+        for number, etag in zip(numbers, etags):
+            if etag != '"{}"'.format(hashlib.md5(self.parts[number]).hexdigest()):
+                return self._send(200, b'<Error><Code>InvalidPart</Code></Error>')
+        self.objects['model'] = b''.join(self.parts[number] for number in numbers)
+        return self._send(200, b'<CompleteMultipartUploadResult></CompleteMultipartUploadResult>')
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(handler):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def storage():
+    server = _start_server(_StorageHandler)
+    _StorageHandler.uploads = []
+    _StorageHandler.downloads = []
+    yield 'http://127.0.0.1:{}/'.format(server.server_port), _StorageHandler.uploads
+    server.shutdown()
+    server.server_close()
+
+
+def _get_model(url):
+    return {
+        'model_upload_url': {'url': url, 'fields': {'key': 'models/1', 'policy': 'abc'}},
+        'model': {'features': [0.5] * 1000},
+        'percentage': 1.0,
+        'can_analyse': True,
+        'used_samples': [1, 2],
+    }
+
+
+def _get_client(storage_url, **options):
+    """
+        Create a client with a fake API, which sends upload requests to the fake storage
+    """
+    send = requests.Session.request
+
+    def _api(session, method, url, **kwargs):
+        if url.startswith(storage_url):
+            return send(session, method, url, **kwargs)
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        return get_response(data={'id': 1})
+
+    patcher = mock.patch.object(requests.Session, 'request', autospec=True, side_effect=_api)
+    patcher.start()
+    return Client('https://localhost', 'test-role', 'test-secret', **options), patcher
+
+
+def test_save_model(storage):
+    url, uploads = storage
+    client, patcher = _get_client(url)
+    try:
+        model = _get_model(url)
+        assert client.provider.enrolment.save_model(1, 'learner', 'task', model) == {'id': 1}
+        assert uploads[0]['headers']['Content-Length'] is not None
+        assert uploads[0]['parts']['key'] == b'models/1'
+        assert client._connector.codec.loads(uploads[0]['parts']['file']) == model['model']
+
+        # Stream the serialization of the model
+        codec = get_codec('json')
+        client.provider.enrolment.save_model(1, 'learner', 'task', model, data=codec.iterdumps(model['model'], 1000))
+        assert uploads[1]['headers']['Transfer-Encoding'] == 'chunked'
+        assert codec.loads(uploads[1]['parts']['file']) == model['model']
+
+        # Upload a memory mapped file without copying it
+        with tempfile.TemporaryFile() as model_file:
+            model_file.write(b'\x00\x01' * 100000)
+            model_file.flush()
+            with mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                client.provider.enrolment.save_model(1, 'learner', 'task', model, data=data)
+            assert int(uploads[2]['headers']['Content-Length']) > 200000
+            assert uploads[2]['parts']['file'] == b'\x00\x01' * 100000
+
+            model_file.seek(0)
+            client.provider.enrolment.save_model(1, 'learner', 'task', model, data=model_file)
+            assert uploads[3]['parts']['file'] == b'\x00\x01' * 100000
+    finally:
+        patcher.stop()
+
+
+def test_multipart_encoder_async():
+    async def _read(encoder):
+        loop = asyncio.get_running_loop()
+        with mock.patch.object(loop, 'run_in_executor', wraps=loop.run_in_executor) as run_in_executor:
+            body = b''.join([bytes(chunk) async for chunk in encoder])
+        return body, run_in_executor.call_count
+
+    with tempfile.TemporaryFile() as model_file:
+        model_file.write(b'\x00\x01' * 100000)
+        files = {'file': [b'head', model_file, ['tail']]}
+        model_file.seek(0)
+        expected = b''.join(bytes(chunk) for chunk in MultipartEncoder({'key': 'models/1'}, files, 65536, 'b'))
+
+        # File reads are done in the executor, including the final empty read
+        model_file.seek(0)
+        body, reads = asyncio.run(_read(MultipartEncoder({'key': 'models/1'}, files, 65536, 'b')))
+        assert body == expected
+        assert reads == 5
+
+
+@pytest.mark.parametrize('serializer', ['json', 'msgpack', 'numpy'])
+def test_model_serializers(storage, serializer):
+    numpy = pytest.importorskip('numpy')
+    if serializer == 'msgpack':
+        pytest.importorskip('msgpack')
+    url, uploads = storage
+    client, patcher = _get_client(url)
+    try:
+        model = _get_model(url)
+        content = numpy.arange(12, dtype=numpy.float32).reshape(3, 4)
+        model['model'] = content if serializer == 'numpy' else {'features': content.tolist()}
+        client.provider.enrolment.save_model(1, 'learner', 'task', model, serializer=serializer)
+        if serializer == 'numpy':
+            assert int(uploads[0]['headers']['Content-Length']) > content.nbytes
+
+        loaded = client.provider.enrolment.load_model({'model': url}, serializer=serializer)
+        if serializer == 'numpy':
+            assert loaded.dtype == numpy.float32
+            assert (loaded == content).all()
+        else:
+            assert loaded == model['model']
+        assert client.provider.enrolment.load_model({'model': {'features': []}}) == {'features': []}
+    finally:
+        patcher.stop()
+
+
+@pytest.fixture
+def s3_storage():
+    server = _start_server(_S3Handler)
+    _S3Handler.parts = {}
+    _S3Handler.failures = {}
+    _S3Handler.failure_status = 503
+    _S3Handler.objects = {}
+    url = 'http://127.0.0.1:{}/upload/'.format(server.server_port)
+    yield url, {
+        'part_size': 100000,
+        'parts': [{'part_number': number, 'url': '{}part/{}'.format(url, number)} for number in range(1, 21)],
+        'complete_url': url + 'complete',
+    }
+    server.shutdown()
+    server.server_close()
+
+
+def test_multipart_upload(s3_storage):
+    url, multipart = s3_storage
+    client, patcher = _get_client(url)
+    try:
+        data = bytes(range(256)) * 4000
+        _S3Handler.failures = {3: 1, 5: 4}
+        upload = MultipartUpload(multipart, data, workers=4, retry_policy=RetryPolicy(backoff_factor=0.01))
+        assert len(upload.parts) == 11
+        with pytest.raises(exception.UploadException) as exc_info:
+            upload.upload(client._connector)
+        assert exc_info.value.upload is upload
+        assert [part['part_number'] for part in upload.pending_parts] == [5]
+        assert upload.stats['retries'] == 3
+        assert 'model' not in _S3Handler.objects
+
+        # Resume sending only the failed part
+        model = _get_model(url)
+        model['model_upload_url']['multipart'] = multipart
+        client.provider.enrolment.save_model(1, 'learner', 'task', model, data=upload)
+        assert _S3Handler.objects['model'] == data
+        assert upload.stats['parts'] == 11
+        assert upload.stats['bytes'] == len(data)
+        assert upload.stats['throughput'] > 0
+
+        # Serialized models are split in parts
+        client.provider.enrolment.save_model(1, 'learner', 'task', model)
+        assert client._connector.codec.loads(_S3Handler.objects['model']) == model['model']
+    finally:
+        patcher.stop()
+
+
+def test_multipart_upload_client_error(s3_storage):
+    url, multipart = s3_storage
+    client, patcher = _get_client(url)
+    try:
+        # Client errors, such as an expired url, are not retried
+        _S3Handler.failures = {2: 1}
+        _S3Handler.failure_status = 403
+        upload = MultipartUpload(multipart, bytes(300000), retry_policy=RetryPolicy(backoff_factor=0.01))
+        with pytest.raises(exception.UploadException):
+            upload.upload(client._connector)
+        assert [part['part_number'] for part in upload.pending_parts] == [2]
+        assert upload.stats['retries'] == 0
+        assert upload.retry_policy.stats['retries'] == 0
+    finally:
+        patcher.stop()
+
+
+def test_save_model_upload_type(s3_storage):
+    url, multipart = s3_storage
+    model = _get_model(url)
+    model['model_upload_url']['multipart'] = multipart
+    client, patcher = _get_client(url)
+    try:
+        with pytest.raises(exception.TeslaConfigException):
+            client.provider.enrolment.save_model(1, 'learner', 'task', model,
+                                                 data=AsyncMultipartUpload(multipart, b'data'))
+    finally:
+        patcher.stop()
+
+    async_client = AsyncClient(url, 'test-role', 'test-secret')
+    with pytest.raises(exception.TeslaConfigException):
+        asyncio.run(async_client.provider.enrolment.save_model(1, 'learner', 'task', model,
+                                                               data=MultipartUpload(multipart, b'data')))
+    assert 'model' not in _S3Handler.objects
+
+
+def test_download_cache(storage):
+    url, uploads = storage
+    with tempfile.TemporaryDirectory() as cache_dir:
+        blob_cache = BlobCache(cache_dir, mmap_threshold=1000)
+        client, patcher = _get_client(url, blob_cache=blob_cache)
+        try:
+            model = _get_model(url)
+            client.provider.enrolment.save_model(1, 'learner', 'task', model)
+            enrolment = client.provider.enrolment
+            assert enrolment.load_model({'model': url + '?X-Amz-Signature=1'}) == model['model']
+            assert enrolment.load_model({'model': url + '?X-Amz-Signature=2'}) == model['model']
+            assert _StorageHandler.downloads[0] is None
+            assert _StorageHandler.downloads[1] is not None
+            assert isinstance(blob_cache.get(BlobCache.get_key(url)), memoryview)
+
+            # Updated models are downloaded again
+            model['model'] = {'features': [1.0]}
+            client.provider.enrolment.save_model(1, 'learner', 'task', model)
+            assert enrolment.load_model({'model': url}) == model['model']
+
+            # Samples are not revalidated
+            assert enrolment.load_sample({'data': url + 'sample/1'}) == model['model']
+            assert enrolment.load_sample({'data': url + 'sample/1'}) == model['model']
+            assert len(_StorageHandler.downloads) == 4
+            assert blob_cache.stats['hits'] == 4
+        finally:
+            patcher.stop()
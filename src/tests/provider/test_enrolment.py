@@ -0,0 +1,148 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for the provider enrolment client """
+import threading
+import mock
+import pytest
+import requests
+from tesla_ce_client import Client
+from tesla_ce_client import exception
+from tesla_ce_client.provider.enrolment import SampleValidationStatus
+from tests.utils import get_auth_data, get_response
+
+
+def _locked_response():
+    resp = get_response(400)
+    resp.content = b'Model is locked'
+    return resp
+
+
+def test_model_lock():
+    responses = [_locked_response(), _locked_response()]
+
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        if url.endswith('/unlock/'):
+            return get_response(204)
+        if len(responses) > 0:
+            return responses.pop(0)
+        return get_response(data={'learner_id': 'learner', 'model': None})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=_api) as request_mock, \
+            mock.patch('tesla_ce_client.provider.lock.time.sleep') as sleep_mock:
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        with client.provider.enrolment.model_lock(1, 'learner', 'task', renew_interval=0.01) as lock:
+            assert lock.model == {'learner_id': 'learner', 'model': None}
+            assert lock.attempts == 3
+            assert sleep_mock.call_count == 2
+            assert lock.wait_time is not None
+            threading.Event().wait(0.1)
+        assert request_mock.call_count > 5
+        assert lock.renewal_error is None
+        assert request_mock.call_args[1]['url'] == 'https://localhost/api/v2/provider/1/enrolment/learner/unlock/'
+
+
+def test_model_lock_timeout():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [get_response(data=get_auth_data(provider_id=1))] + [_locked_response()] * 10
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        with pytest.raises(exception.LockedResourceException):
+            with client.provider.enrolment.model_lock(1, 'learner', 'task', timeout=0.05):
+                pass
+        assert 'unlock' not in request_mock.call_args[1]['url']
+
+
+def test_model_lock_bad_request():
+    with mock.patch.object(requests.Session, 'request') as request_mock:
+        request_mock.side_effect = [get_response(data=get_auth_data(provider_id=1)), get_response(400)]
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        with pytest.raises(exception.BadRequestException):
+            with client.provider.enrolment.model_lock(1, 'learner', 'task'):
+                pass
+        assert request_mock.call_count == 2
+
+
+def _samples_api(method, url, **kwargs):
+    """
+        Fake API with the samples of a learner
+    """
+    if url.endswith('/api/v2/auth/approle'):
+        return get_response(data=get_auth_data(provider_id=1))
+    path = url.split('/api/v2/provider/1/enrolment/learner/')[1]
+    if path.startswith('available_samples/'):
+        return get_response(data={'count': 5, 'next': None, 'results': [{'id': idx} for idx in range(5)]})
+    sample_id = int(path.split('/')[1])
+    if path.endswith('/validation/'):
+        return get_response(data={'count': 1, 'results': [{'id': sample_id * 10, 'status': 1}]})
+    return get_response(data={'id': sample_id, 'data': {'sample': sample_id}})
+
+
+def test_iter_samples():
+    with mock.patch.object(requests.Session, 'request', side_effect=_samples_api) as request_mock:
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        samples = client.provider.enrolment.iter_samples(1, 'learner', workers=3, load=True, ordered=True)
+        samples = list(samples)
+        assert [sample['id'] for sample in samples] == list(range(5))
+        assert samples[2]['validations']['results'] == [{'id': 20, 'status': 1}]
+        assert samples[2]['content'] == {'sample': 2}
+        assert request_mock.call_count == 12
+
+
+def test_set_sample_validations():
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        if '/sample/3/' in url:
+            return get_response(500)
+        return get_response(data={'url': url})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=_api) as request_mock:
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        outcomes = client.provider.enrolment.set_sample_validations(1, [
+            ('learner', idx, idx * 10, {'valid': True}, SampleValidationStatus.VALID) for idx in range(6)
+        ], workers=3)
+        assert [outcome['sample_id'] for outcome in outcomes] == list(range(6))
+        assert isinstance(outcomes[3]['error'], exception.InternalException)
+        assert outcomes[3]['status'] is None
+        assert outcomes[2]['error'] is None
+        assert outcomes[2]['status']['url'].endswith('/sample/2/validation/20/status/')
+        assert request_mock.call_count == 1 + 5 * 2 + 1
+
+        # The result of each sample is stored before its status
+        urls = [call[1]['url'] for call in request_mock.call_args_list[1:]]
+        for idx in range(6):
+            if idx != 3:
+                validation_url = 'https://localhost/api/v2/provider/1/enrolment/learner/sample/{}/validation/{}/'
+                validation_url = validation_url.format(idx, idx * 10)
+                assert urls.index(validation_url) < urls.index(validation_url + 'status/')
+
+
+def test_set_sample_validations_connection_error():
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        if '/sample/1/' in url:
+            raise requests.ConnectionError('connection reset')
+        return get_response(data={'url': url})
+
+    with mock.patch.object(requests.Session, 'request', side_effect=_api):
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        outcomes = client.provider.enrolment.set_sample_validations(1, [
+            ('learner', idx, idx * 10, {'valid': True}, SampleValidationStatus.VALID) for idx in range(3)
+        ], workers=2)
+        assert isinstance(outcomes[1]['error'], requests.ConnectionError)
+        assert outcomes[1]['result'] is None
+        assert outcomes[0]['error'] is None and outcomes[2]['error'] is None
@@ -0,0 +1,121 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for the provider verification client """
+import json
+import threading
+import time
+import mock
+import pytest
+import requests
+from tesla_ce_client import Client
+from tesla_ce_client import exception
+from tesla_ce_client.provider.verification import RequestResultStatus
+from tests.utils import get_auth_data, get_response
+
+
+def _get_api(calls, delay=0.01):
+    """
+        Fake API storing the urls of the received requests
+    """
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        time.sleep(delay)
+        calls.append(url)
+        if '/request/13/' in url:
+            return get_response(500)
+        return get_response(data={'url': url})
+    return _api
+
+
+def test_result_submitter():
+    calls = []
+    with mock.patch.object(requests.Session, 'request', side_effect=_get_api(calls)):
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        with client.provider.verification.submitter(workers=4) as submitter:
+            start = time.monotonic()
+            futures = []
+            for request_id in range(10, 20):
+                futures.append(submitter.submit_result(1, request_id, {'result': 0.5}))
+                futures.append(submitter.submit_status(1, request_id, RequestResultStatus.PROCESSED))
+            assert time.monotonic() - start < 0.1
+            assert submitter.flush(timeout=5)
+            assert futures[0].result() == {'url': 'https://localhost/api/v2/provider/1/request/10/'}
+            assert isinstance(futures[6].exception(), exception.InternalException)
+            assert submitter.stats == {'submitted': 20, 'completed': 20, 'failed': 2, 'coalesced': 0, 'pending': 0}
+        with pytest.raises(exception.TeslaConfigException):
+            submitter.submit_result(1, 10, {'result': 0.5})
+
+    # Results are sent before the status of the same request
+    for request_id in range(10, 20):
+        result_url = 'https://localhost/api/v2/provider/1/request/{}/'.format(request_id)
+        assert calls.index(result_url) < calls.index(result_url + 'status/')
+
+
+def test_result_submitter_backpressure():
+    calls = []
+    with mock.patch.object(requests.Session, 'request', side_effect=_get_api(calls, delay=0.05)):
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        submitter = client.provider.verification.submitter(workers=1, max_queue=1)
+        submitted = []
+        thread = threading.Thread(target=lambda: submitted.extend(
+            submitter.submit_status(1, request_id, RequestResultStatus.PROCESSING) for request_id in range(4)))
+        thread.start()
+        thread.join(0.02)
+        assert thread.is_alive()
+        thread.join()
+        submitter.close()
+        assert len(calls) == 4
+        assert all(future.done() for future in submitted)
+
+
+def test_result_submitter_coalesce():
+    calls = []
+
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        body = json.loads(kwargs['data'])
+        calls.append((url, body))
+        return get_response(data=body)
+
+    with mock.patch.object(requests.Session, 'request', side_effect=_api):
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        with client.provider.verification.submitter(workers=2, coalesce_window=0.2) as submitter:
+            processing = submitter.submit_status(1, 10, RequestResultStatus.PROCESSING)
+            waiting = submitter.submit_status(1, 10, RequestResultStatus.WAITING_EXTERNAL_SERVICE)
+            submitter.submit_result(1, 10, {'result': 0.5})
+            submitter.submit_status(1, 10, RequestResultStatus.PROCESSED)
+            submitter.submit_status(1, 10, RequestResultStatus.ERROR)
+            submitter.submit_status(1, 11, RequestResultStatus.PROCESSING)
+            timeout = submitter.submit_status(1, 11, RequestResultStatus.TIMEOUT)
+            assert processing.result(timeout=5) == {'status': RequestResultStatus.WAITING_EXTERNAL_SERVICE.value}
+            assert processing.result() is waiting.result()
+            assert timeout.result(timeout=5) == {'status': RequestResultStatus.TIMEOUT.value}
+            assert submitter.flush(timeout=5)
+            assert submitter.stats == {'submitted': 7, 'completed': 7, 'failed': 0, 'coalesced': 2, 'pending': 0}
+
+    status_url = 'https://localhost/api/v2/provider/1/request/{}/status/'
+    # Only the latest status is sent, and terminal status are never replaced
+    assert [body for url, body in calls if url == status_url.format(10)] == [
+        {'status': RequestResultStatus.WAITING_EXTERNAL_SERVICE.value},
+        {'status': RequestResultStatus.PROCESSED.value},
+        {'status': RequestResultStatus.ERROR.value},
+    ]
+    assert [body for url, body in calls if url == status_url.format(11)] == [
+        {'status': RequestResultStatus.TIMEOUT.value}]
+    # The held status is sent before the result submitted after it
+    assert [url for url, body in calls][:2] == [status_url.format(10),
+                                                'https://localhost/api/v2/provider/1/request/10/']
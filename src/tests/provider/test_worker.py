@@ -0,0 +1,113 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test module for the provider worker runtime """
+import json
+import mock
+import pytest
+import requests
+from tesla_ce_client import Client
+from tesla_ce_client.exception import TeslaConfigException
+from tesla_ce_client.provider import VerificationWorker, ValidationWorker
+from tesla_ce_client.provider.worker import BaseWorker
+from tesla_ce_client.provider.enrolment import SampleValidationStatus
+from tesla_ce_client.provider.verification import RequestResultStatus
+from tests.utils import get_auth_data, get_response
+
+
+def _analyse(data):
+    """
+        Handler failing with the request 13, defined at module level to run in other processes
+    """
+    if data['id'] == 13:
+        raise ValueError('Invalid request')
+    return {'result': data['id'] / 100}
+
+
+def _get_api(calls):
+    def _api(method, url, **kwargs):
+        if url.endswith('/api/v2/auth/approle'):
+            return get_response(data=get_auth_data(provider_id=1))
+        if method.upper() == 'GET':
+            if '/request/99/' in url:
+                return get_response(404)
+            return get_response(data={'id': int(url.rstrip('/').split('/')[-1]), 'data': {'value': 1}})
+        calls.append((url, json.loads(kwargs['data'])))
+        if '/request/15/' in url and not url.endswith('status/'):
+            return get_response(400)
+        return get_response(data={})
+    return _api
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_verification_worker(executor):
+    calls = []
+    with mock.patch.object(requests.Session, 'request', side_effect=_get_api(calls)):
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        worker = VerificationWorker(client.provider, _analyse, workers=2, executor=executor)
+        stats = worker.run(list(range(10, 20)) + [99])
+
+    assert stats['fetched'] == 10
+    assert stats['fetch_errors'] == 1
+    assert stats['processed'] == 9
+    assert stats['failed'] == 1
+    assert stats['submit_errors'] == 1
+    assert stats['throughput'] > 0
+    assert isinstance(worker.last_error, ValueError)
+    url = 'https://localhost/api/v2/provider/1/request/{}/'
+    assert [body for call_url, body in calls if call_url.startswith(url.format(12))] == [
+        {'status': RequestResultStatus.PROCESSING.value},
+        {'result': 0.12},
+        {'status': RequestResultStatus.PROCESSED.value},
+    ]
+    assert [body for call_url, body in calls if call_url.startswith(url.format(13))] == [
+        {'status': RequestResultStatus.PROCESSING.value},
+        {'status': RequestResultStatus.ERROR.value},
+    ]
+
+    # Tasks that cannot be fetched are marked as failed
+    assert [body for call_url, body in calls if call_url.startswith(url.format(99))] == [
+        {'status': RequestResultStatus.ERROR.value},
+    ]
+
+
+def test_validation_worker():
+    calls = []
+    with mock.patch.object(requests.Session, 'request', side_effect=_get_api(calls)):
+        client = Client('https://localhost', 'test-role', 'test-secret')
+        worker = ValidationWorker(client.provider, lambda sample: {'valid': sample['content'] == {'value': 1}},
+                                  provider_id=1, workers=2)
+        stats = worker.run([('learner', sample_id, 1) for sample_id in range(5)])
+
+    assert stats['processed'] == 5
+    url = 'https://localhost/api/v2/provider/1/enrolment/learner/sample/3/validation/1/'
+    assert [call for call in calls if call[0].startswith(url)] == [
+        (url + 'status/', {'status': SampleValidationStatus.VALIDATING.value}),
+        (url, {'valid': True}),
+        (url + 'status/', {'status': SampleValidationStatus.VALID.value}),
+    ]
+
+
+def test_worker_executor():
+    with pytest.raises(TeslaConfigException):
+        VerificationWorker(None, _analyse, executor='gpu')
+
+
+def test_worker_abstract():
+    class _Worker(BaseWorker):
+        def _fetch(self, key):
+            return key
+
+    with pytest.raises(TypeError):
+        _Worker(None, _analyse)
@@ -0,0 +1,47 @@
+#  Copyright (c) 2020 Xavier Baró
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as
+#      published by the Free Software Foundation, either version 3 of the
+#      License, or (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+""" Test utilities module """
+import base64
+import json
+import time
+import mock
+
+
+def get_jwt(ttl=3600):
+    """
+        Build a fake JWT token expiring after given seconds
+    """
+    payload = base64.b64encode(json.dumps({'exp': int(time.time()) + ttl}).encode()).decode()
+    return 'header.{}.signature'.format(payload)
+
+
+def get_auth_data(ttl=3600, **module):
+    """
+        Build a fake authentication response body
+    """
+    module['token'] = {'access_token': get_jwt(ttl), 'refresh_token': get_jwt(ttl * 2)}
+    return module
+
+
+def get_response(status_code=200, data=None, headers=None):
+    """
+        Build a fake HTTP response
+    """
+    resp = mock.MagicMock()
+    resp.status_code = status_code
+    resp.headers = headers or {}
+    resp.json.return_value = data
+    resp.content = json.dumps(data).encode() if data is not None else b''
+    return resp